@@ -0,0 +1,673 @@
+// RobotCore.h
+// Inti firmware controller A/B tanpa dependensi Arduino (header-only, tanpa heap)
+// - Ring / CommandQueue     : ring buffer ukuran tetap
+// - CommandParser           : state machine char demi char untuk "#<ch>P<pos>T<t>D<d>", "!S", "?"
+// - FrameParser             : frame binary opsional (SOF, length, seq, type, payload, CRC-16)
+// - OkMatcher               : deteksi "OK" dari servo controller tanpa String
+// - Engine                  : antrian command + tracking ack non-blocking + estimasi posisi
+//
+// Dipakai oleh controller_A.ino / controller_B.ino, dan bisa di-compile di Linux:
+//   g++ -std=c++11 -Wall -I arduino/RobotCore arduino/RobotCore/extras/host_main.cpp
+
+#ifndef ROBOT_CORE_H
+#define ROBOT_CORE_H
+
+#include <stdint.h>
+#include <stddef.h>
+#include <stdio.h>
+
+namespace robot {
+
+static const uint16_t MIN_POSITION = 500;
+static const uint16_t MAX_POSITION = 2500;
+static const uint16_t CENTER_POSITION = 1500;
+static const uint32_t MARGIN_MS = 300;      // Batas tunggu OK = T + D + MARGIN_MS
+static const uint8_t MAX_LINE = 128;        // Sama dengan batas inbuf firmware lama
+
+// Protocol frame (harus sama dengan python/frame_protocol.py)
+static const uint8_t FRAME_SOF = 0xA5;
+static const uint8_t FRAME_MAX_PAYLOAD = 64;
+static const uint8_t FRAME_MOVE_SIZE = 7;   // channel u8, posisi u16, T u16, D u16 (LE)
+static const uint32_t FRAME_GAP_MS = 10;    // Jeda antar byte lebih dari ini = frame terpotong
+
+enum FrameKind : uint8_t {
+  FRAME_MOVES = 0x01,
+  FRAME_STOP = 0x02,
+  FRAME_QUERY = 0x03,
+  FRAME_RESEND = 0x04,
+  FRAME_ACK = 0x81,
+  FRAME_NAK = 0x82,
+  FRAME_DONE = 0x83,     // Payload: status (0 = OK, 1 = tanpa OK servo controller)
+  FRAME_STOPPED = 0x84,
+  FRAME_POS = 0x85,      // Payload: millis u32 + posisi u16 per channel
+  FRAME_ERROR = 0x86,    // Payload: FrameError
+};
+
+enum FrameError : uint8_t {
+  FRAME_ERR_QUEUE_FULL = 1,
+  FRAME_ERR_POSITION = 2,
+  FRAME_ERR_CHANNEL = 3,
+  FRAME_ERR_INVALID = 4,
+};
+
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), bitwise tanpa tabel
+inline uint16_t crc16(const uint8_t* data, uint8_t length, uint16_t crc = 0xFFFF) {
+  for (uint8_t i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (uint16_t)((crc << 1) ^ 0x1021) : (uint16_t)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+// ---------- Ring buffer ----------
+template <typename T, uint8_t N>
+class Ring {
+ public:
+  Ring() : head_(0), count_(0) {}
+
+  bool push(const T& item) {
+    if (count_ == N) return false;
+    items_[(head_ + count_) % N] = item;
+    count_++;
+    return true;
+  }
+
+  bool pop(T& item) {
+    if (count_ == 0) return false;
+    item = items_[head_];
+    head_ = (head_ + 1) % N;
+    count_--;
+    return true;
+  }
+
+  void clear() { head_ = count_ = 0; }
+  uint8_t size() const { return count_; }
+  bool empty() const { return count_ == 0; }
+  bool full() const { return count_ == N; }
+
+ private:
+  T items_[N];
+  uint8_t head_;
+  uint8_t count_;
+};
+
+// ---------- Command ----------
+enum CommandKind : uint8_t { CMD_MOVE, CMD_STOP, CMD_QUERY };
+
+enum CommandFlags : uint8_t {
+  CMD_BINARY = 0x01,  // Datang sebagai frame: jawaban berupa frame
+  CMD_LAST = 0x02,    // Gerakan terakhir frame: FRAME_DONE dikirim setelah OK
+};
+
+struct Command {
+  CommandKind kind;
+  uint8_t channel;
+  uint16_t position;
+  uint16_t time;
+  uint16_t delay;
+  uint8_t seq;
+  uint8_t flags;
+};
+
+template <uint8_t N>
+class CommandQueue : public Ring<Command, N> {};
+
+enum ParseError : uint8_t {
+  PARSE_OK,
+  PARSE_BAD_START,       // "ERROR: Command must start with #"
+  PARSE_BAD_FORMAT,      // "ERROR: Invalid command format"
+  PARSE_TOO_LONG,        // "ERROR: Command too long"
+  PARSE_POSITION_RANGE,  // "ERROR: Position must be 500-2500"
+};
+
+enum ParseResult : uint8_t { PARSE_NONE, PARSE_COMMAND, PARSE_ERROR };
+
+// Parser state machine: feed() satu karakter; baris selesai di '\r' atau '\n'.
+// Spasi di awal/akhir baris diabaikan (seperti String::trim di firmware lama).
+class CommandParser {
+ public:
+  CommandParser() : lastError_(PARSE_OK) { reset(); }
+
+  void reset() {
+    state_ = S_START;
+    length_ = 0;
+    field_ = 0;
+    value_ = 0;
+    digits_ = 0;
+    error_ = PARSE_OK;
+    for (uint8_t i = 0; i < 4; i++) values_[i] = 0;
+  }
+
+  // Penyebab PARSE_ERROR terakhir
+  ParseError error() const { return lastError_; }
+
+  // Tidak di tengah baris: byte SOF di sini adalah awal frame binary
+  bool idle() const { return state_ == S_START; }
+
+  ParseResult feed(char c, Command& out) {
+    if (c == '\r' || c == '\n') {
+      ParseResult result = finish(out);
+      lastError_ = error_;
+      reset();
+      return result;
+    }
+
+    if (state_ == S_SKIP) return PARSE_NONE;
+
+    if (++length_ > MAX_LINE) {
+      // Sisa baris dibuang sampai newline berikutnya
+      error_ = lastError_ = PARSE_TOO_LONG;
+      state_ = S_SKIP;
+      return PARSE_ERROR;
+    }
+
+    switch (state_) {
+      case S_START:
+        if (c == ' ' || c == '\t') {
+          length_--;
+        } else if (c == '#') {
+          state_ = S_FIELD;
+        } else if (c == '!') {
+          state_ = S_BANG;
+        } else if (c == '?') {
+          state_ = S_QUERY;
+        } else {
+          fail(PARSE_BAD_START);
+        }
+        break;
+
+      case S_FIELD:
+        if (c >= '0' && c <= '9') {
+          value_ = value_ * 10 + (c - '0');
+          if (value_ > 65535UL) value_ = 65535UL;
+          digits_++;
+        } else if (field_ < 3 && c == "PTD"[field_] && digits_ > 0) {
+          values_[field_++] = (uint16_t)value_;
+          value_ = 0;
+          digits_ = 0;
+        } else if (c == ' ' || c == '\t') {
+          state_ = S_TRAILING;
+        } else {
+          fail(PARSE_BAD_FORMAT);
+        }
+        break;
+
+      case S_BANG:
+        if (c == 'S') {
+          state_ = S_STOP;
+        } else {
+          fail(PARSE_BAD_START);
+        }
+        break;
+
+      case S_STOP:
+      case S_QUERY:
+        if (c != ' ' && c != '\t') fail(PARSE_BAD_START);
+        break;
+
+      case S_TRAILING:
+        if (c != ' ' && c != '\t') fail(PARSE_BAD_FORMAT);
+        break;
+
+      default:
+        break;
+    }
+    return PARSE_NONE;
+  }
+
+ private:
+  enum State : uint8_t { S_START, S_FIELD, S_BANG, S_STOP, S_QUERY, S_TRAILING, S_BAD, S_SKIP };
+
+  void fail(ParseError error) {
+    if (error_ == PARSE_OK) error_ = error;
+    state_ = S_BAD;
+  }
+
+  ParseResult finish(Command& out) {
+    if (state_ == S_SKIP) return PARSE_NONE;  // Error TOO_LONG sudah dilaporkan
+    if (error_ != PARSE_OK) return PARSE_ERROR;
+
+    switch (state_) {
+      case S_START:
+        return PARSE_NONE;  // Baris kosong
+
+      case S_STOP:
+        out.kind = CMD_STOP;
+        return PARSE_COMMAND;
+
+      case S_QUERY:
+        out.kind = CMD_QUERY;
+        return PARSE_COMMAND;
+
+      case S_FIELD:
+      case S_TRAILING:
+        if (field_ != 3 || digits_ == 0) {
+          error_ = PARSE_BAD_FORMAT;
+          return PARSE_ERROR;
+        }
+        values_[3] = (uint16_t)value_;
+        if (values_[1] < MIN_POSITION || values_[1] > MAX_POSITION) {
+          error_ = PARSE_POSITION_RANGE;
+          return PARSE_ERROR;
+        }
+        out.kind = CMD_MOVE;
+        out.channel = values_[0] > 255 ? 255 : (uint8_t)values_[0];
+        out.position = values_[1];
+        out.time = values_[2];
+        out.delay = values_[3];
+        out.seq = 0;
+        out.flags = 0;
+        return PARSE_COMMAND;
+
+      default:
+        // "!" tanpa "S" di akhir baris
+        error_ = PARSE_BAD_START;
+        return PARSE_ERROR;
+    }
+  }
+
+  State state_;
+  uint8_t length_;
+  uint8_t field_;
+  uint8_t digits_;
+  uint32_t value_;
+  uint16_t values_[4];
+  ParseError error_;
+  ParseError lastError_;
+};
+
+// ---------- Frame binary ----------
+// SOF | length | seq | type | payload[length] | CRC-16 LE (atas length..payload)
+enum FrameResult : uint8_t { FRAME_NONE, FRAME_READY, FRAME_BAD };
+
+class FrameParser {
+ public:
+  FrameParser() : count_(0), last_(0) {}
+
+  // Sedang menerima frame; frame yang berhenti lebih dari FRAME_GAP_MS dibuang
+  bool active(uint32_t now) {
+    if (count_ && (uint32_t)(now - last_) > FRAME_GAP_MS) count_ = 0;
+    return count_ > 0;
+  }
+
+  // FRAME_BAD: CRC salah atau length tidak valid (seq() dari header, bisa ikut rusak)
+  FrameResult feed(uint8_t b, uint32_t now) {
+    last_ = now;
+    if (count_ == 0 && b != FRAME_SOF) return FRAME_NONE;
+    buffer_[count_++] = b;
+
+    if (count_ == 2 && buffer_[1] > FRAME_MAX_PAYLOAD) {
+      count_ = 0;
+      return FRAME_BAD;
+    }
+    if (count_ < 6 || count_ < (uint8_t)(6 + buffer_[1])) return FRAME_NONE;
+
+    count_ = 0;
+    uint8_t end = 4 + buffer_[1];
+    uint16_t crc = (uint16_t)buffer_[end] | ((uint16_t)buffer_[end + 1] << 8);
+    return crc == crc16(buffer_ + 1, end - 1) ? FRAME_READY : FRAME_BAD;
+  }
+
+  uint8_t seq() const { return buffer_[2]; }
+  uint8_t kind() const { return buffer_[3]; }
+  uint8_t length() const { return buffer_[1]; }
+  const uint8_t* payload() const { return buffer_ + 4; }
+
+ private:
+  uint8_t buffer_[6 + FRAME_MAX_PAYLOAD];
+  uint8_t count_;
+  uint32_t last_;
+};
+
+inline uint16_t readU16(const uint8_t* p) { return (uint16_t)p[0] | ((uint16_t)p[1] << 8); }
+
+// ---------- Ack dari servo controller ----------
+class OkMatcher {
+ public:
+  OkMatcher() : last_(0) {}
+  void reset() { last_ = 0; }
+
+  bool feed(char c) {
+    bool matched = (last_ == 'O' && c == 'K');
+    last_ = c;
+    return matched;
+  }
+
+ private:
+  char last_;
+};
+
+// ---------- Output ----------
+// Satu baris tanpa terminator; implementasi menambahkan CRLF (USB) atau LF (servo)
+class LineOutput {
+ public:
+  virtual void line(const char* text) = 0;
+  // Byte mentah (frame binary); output tanpa dukungan frame mengabaikannya
+  virtual void bytes(const uint8_t* data, uint8_t length) {
+    (void)data;
+    (void)length;
+  }
+};
+
+// ---------- Engine ----------
+// Tidak pernah blocking: loop() firmware memanggil hostByte/servoByte untuk
+// setiap byte yang masuk lalu update(millis()). Command baru masuk antrian
+// selagi servo bergerak; command berikutnya dikirim setelah OK (atau timeout).
+template <uint8_t MAX_SERVOS, uint8_t QUEUE = 8>
+class Engine {
+ public:
+  Engine(char name, LineOutput& host, LineOutput& servo)
+      : name_(name), host_(host), servo_(servo), active_(false), deadline_(0),
+        haveLastSeq_(false), lastSeq_(0), nextReply_(0) {
+    current_.flags = 0;
+    for (uint8_t i = 0; i < REPLY_CACHE; i++) replies_[i].valid = false;
+    for (uint8_t ch = 0; ch <= MAX_SERVOS; ch++) {
+      from_[ch] = to_[ch] = CENTER_POSITION;
+      start_[ch] = 0;
+      duration_[ch] = 0;
+    }
+  }
+
+  // Byte dari Python (USB): baris ASCII, atau frame jika SOF datang di awal baris
+  void hostByte(char c, uint32_t now) {
+    uint8_t b = (uint8_t)c;
+    if (frames_.active(now) || (b == FRAME_SOF && parser_.idle())) {
+      FrameResult frame = frames_.feed(b, now);
+      if (frame == FRAME_READY) {
+        handleFrame(now);
+      } else if (frame == FRAME_BAD) {
+        sendFrame(frames_.seq(), FRAME_NAK, 0, 0);
+      }
+      return;
+    }
+
+    Command cmd;
+    ParseResult result = parser_.feed(c, cmd);
+    if (result == PARSE_ERROR) {
+      reportParseError(parser_.error());
+    } else if (result == PARSE_COMMAND) {
+      handle(cmd, now);
+    }
+  }
+
+  // Byte dari servo controller (Serial1)
+  // Returns false jika tidak ada transaksi aktif (firmware meneruskan byte ke USB)
+  bool servoByte(char c) {
+    if (!active_) return false;
+    if (ok_.feed(c)) {
+      if (!(current_.flags & CMD_BINARY)) reply("OK received");
+      finishMove(0);
+    }
+    return true;
+  }
+
+  void update(uint32_t now) {
+    if (active_ && (int32_t)(now - deadline_) >= 0) {
+      if (!(current_.flags & CMD_BINARY)) reply("WARNING: No OK response");
+      finishMove(1);
+    }
+    if (!active_) startNext(now);
+  }
+
+  bool busy() const { return active_ || !queue_.empty(); }
+  uint8_t queued() const { return queue_.size(); }
+
+  // Estimasi posisi: interpolasi linear command terakhir (servo controller tanpa readback)
+  uint16_t position(uint8_t ch, uint32_t now) const {
+    uint32_t elapsed = now - start_[ch];
+    if (elapsed >= duration_[ch]) return to_[ch];
+    int32_t delta = (int32_t)to_[ch] - (int32_t)from_[ch];
+    return (uint16_t)(from_[ch] + delta * (int32_t)elapsed / (int32_t)duration_[ch]);
+  }
+
+ private:
+  void handle(const Command& cmd, uint32_t now) {
+    switch (cmd.kind) {
+      case CMD_STOP:
+        stopAll();
+        reply("STOPPED");
+        break;
+
+      case CMD_QUERY:
+        sendPositions(now);
+        break;
+
+      case CMD_MOVE:
+        if (!queue_.push(cmd)) reply("ERROR: Queue full");
+        break;
+    }
+  }
+
+  // Servo controller tetap menyelesaikan interpolasi yang berjalan;
+  // yang dibatalkan adalah antrian dan tunggu OK
+  void stopAll() {
+    queue_.clear();
+    active_ = false;
+    ok_.reset();
+  }
+
+  void handleFrame(uint32_t now) {
+    uint8_t seq = frames_.seq();
+    const uint8_t* payload = frames_.payload();
+    uint8_t length = frames_.length();
+
+    switch (frames_.kind()) {
+      case FRAME_MOVES: {
+        if (haveLastSeq_ && seq == lastSeq_) {
+          // Frame dikirim ulang karena ACK hilang: jangan gerak dua kali
+          sendFrame(seq, FRAME_ACK, 0, 0);
+          return;
+        }
+        uint8_t count = length / FRAME_MOVE_SIZE;
+        if (count == 0 || length % FRAME_MOVE_SIZE) {
+          replyFrame(seq, FRAME_ERROR, FRAME_ERR_INVALID);
+          return;
+        }
+        if (count > QUEUE - queue_.size()) {
+          replyFrame(seq, FRAME_ERROR, FRAME_ERR_QUEUE_FULL);
+          return;
+        }
+        for (uint8_t i = 0; i < count; i++) {
+          const uint8_t* move = payload + i * FRAME_MOVE_SIZE;
+          uint16_t position = readU16(move + 1);
+          if (position < MIN_POSITION || position > MAX_POSITION) {
+            replyFrame(seq, FRAME_ERROR, FRAME_ERR_POSITION);
+            return;
+          }
+          if (move[0] < 1 || move[0] > MAX_SERVOS) {
+            replyFrame(seq, FRAME_ERROR, FRAME_ERR_CHANNEL);
+            return;
+          }
+        }
+
+        haveLastSeq_ = true;
+        lastSeq_ = seq;
+        sendFrame(seq, FRAME_ACK, 0, 0);
+        for (uint8_t i = 0; i < count; i++) {
+          const uint8_t* move = payload + i * FRAME_MOVE_SIZE;
+          Command cmd;
+          cmd.kind = CMD_MOVE;
+          cmd.channel = move[0];
+          cmd.position = readU16(move + 1);
+          cmd.time = readU16(move + 3);
+          cmd.delay = readU16(move + 5);
+          cmd.seq = seq;
+          cmd.flags = CMD_BINARY | (i + 1 == count ? CMD_LAST : 0);
+          queue_.push(cmd);
+        }
+        break;
+      }
+
+      case FRAME_STOP:
+        stopAll();
+        replyFrame(seq, FRAME_STOPPED, -1);
+        break;
+
+      case FRAME_QUERY: {
+        uint8_t data[4 + 2 * MAX_SERVOS];
+        for (uint8_t i = 0; i < 4; i++) data[i] = (uint8_t)(now >> (8 * i));
+        for (uint8_t ch = 1; ch <= MAX_SERVOS; ch++) {
+          uint16_t value = position(ch, now);
+          data[2 + 2 * ch] = (uint8_t)value;
+          data[3 + 2 * ch] = (uint8_t)(value >> 8);
+        }
+        sendFrame(seq, FRAME_POS, data, sizeof(data));
+        break;
+      }
+
+      case FRAME_RESEND:
+        // Jawaban akhir yang rusak di jalan; belum ada = belum selesai, host tanya lagi
+        for (uint8_t i = 0; i < REPLY_CACHE; i++) {
+          const CachedReply& cached = replies_[i];
+          if (cached.valid && cached.seq == seq) {
+            sendFrame(seq, cached.kind, &cached.status, cached.statusLength);
+            break;
+          }
+        }
+        break;
+
+      default:
+        replyFrame(seq, FRAME_ERROR, FRAME_ERR_INVALID);
+        break;
+    }
+  }
+
+  void sendFrame(uint8_t seq, uint8_t kind, const uint8_t* payload, uint8_t length) {
+    frameOut_[0] = FRAME_SOF;
+    frameOut_[1] = length;
+    frameOut_[2] = seq;
+    frameOut_[3] = kind;
+    for (uint8_t i = 0; i < length; i++) frameOut_[4 + i] = payload[i];
+    uint16_t crc = crc16(frameOut_ + 1, 3 + length);
+    frameOut_[4 + length] = (uint8_t)crc;
+    frameOut_[5 + length] = (uint8_t)(crc >> 8);
+    host_.bytes(frameOut_, 6 + length);
+  }
+
+  // Jawaban akhir sebuah seq (payload 0/1 byte; status < 0 = tanpa payload),
+  // disimpan untuk FRAME_RESEND
+  void replyFrame(uint8_t seq, uint8_t kind, int16_t status) {
+    CachedReply& cached = replies_[nextReply_];
+    nextReply_ = (nextReply_ + 1) % REPLY_CACHE;
+    cached.valid = true;
+    cached.seq = seq;
+    cached.kind = kind;
+    cached.status = status < 0 ? 0 : (uint8_t)status;
+    cached.statusLength = status < 0 ? 0 : 1;
+    sendFrame(seq, kind, &cached.status, cached.statusLength);
+  }
+
+  void startNext(uint32_t now) {
+    Command cmd;
+    while (queue_.pop(cmd)) {
+      if (cmd.channel < 1 || cmd.channel > MAX_SERVOS) {
+        // Sama dengan firmware lama: error tanpa prefix lalu DONE
+        snprintf(buffer_, sizeof(buffer_), "ERROR: Channel out of range (1-%d)", MAX_SERVOS);
+        host_.line(buffer_);
+        reply("DONE");
+        continue;
+      }
+
+      char body[32];
+      snprintf(body, sizeof(body), "#%uP%uT%uD%u", cmd.channel, cmd.position, cmd.time, cmd.delay);
+      if (!(cmd.flags & CMD_BINARY)) {
+        snprintf(buffer_, sizeof(buffer_), "[%c] TX: %s", name_, body);
+        host_.line(buffer_);
+      }
+      servo_.line(body);
+
+      from_[cmd.channel] = position(cmd.channel, now);
+      to_[cmd.channel] = cmd.position;
+      start_[cmd.channel] = now;
+      duration_[cmd.channel] = cmd.time;
+
+      current_ = cmd;
+      active_ = true;
+      ok_.reset();
+      deadline_ = now + cmd.time + cmd.delay + MARGIN_MS;
+      return;
+    }
+  }
+
+  // status: 0 = OK diterima, 1 = timeout (hanya untuk frame)
+  void finishMove(uint8_t status) {
+    active_ = false;
+    if (!(current_.flags & CMD_BINARY)) {
+      reply("DONE");
+    } else if (current_.flags & CMD_LAST) {
+      replyFrame(current_.seq, FRAME_DONE, status);
+    }
+  }
+
+  // Satu frame untuk semua channel: 3 digit hex per channel (500-2500 = 0x1F4-0x9C4)
+  void sendPositions(uint32_t now) {
+    int offset = snprintf(buffer_, sizeof(buffer_), "[%c] POS %lu ", name_, (unsigned long)now);
+    for (uint8_t ch = 1; ch <= MAX_SERVOS && offset + 4 < (int)sizeof(buffer_); ch++) {
+      offset += snprintf(buffer_ + offset, sizeof(buffer_) - offset, "%03X", position(ch, now));
+    }
+    host_.line(buffer_);
+  }
+
+  void reportParseError(ParseError error) {
+    switch (error) {
+      case PARSE_BAD_START:
+        reply("ERROR: Command must start with #");
+        break;
+      case PARSE_POSITION_RANGE:
+        reply("ERROR: Position must be 500-2500");
+        break;
+      case PARSE_TOO_LONG:
+        reply("ERROR: Command too long");
+        break;
+      default:
+        reply("ERROR: Invalid command format");
+        break;
+    }
+  }
+
+  void reply(const char* text) {
+    snprintf(buffer_, sizeof(buffer_), "[%c] %s", name_, text);
+    host_.line(buffer_);
+  }
+
+  static const uint8_t REPLY_CACHE = 4;
+
+  struct CachedReply {
+    bool valid;
+    uint8_t seq;
+    uint8_t kind;
+    uint8_t status;
+    uint8_t statusLength;
+  };
+
+  char name_;
+  LineOutput& host_;
+  LineOutput& servo_;
+
+  CommandParser parser_;
+  CommandQueue<QUEUE> queue_;
+  OkMatcher ok_;
+  bool active_;
+  uint32_t deadline_;
+  Command current_;
+
+  FrameParser frames_;
+  bool haveLastSeq_;
+  uint8_t lastSeq_;
+  CachedReply replies_[REPLY_CACHE];
+  uint8_t nextReply_;
+  uint8_t frameOut_[6 + FRAME_MAX_PAYLOAD];
+
+  uint16_t from_[MAX_SERVOS + 1];
+  uint16_t to_[MAX_SERVOS + 1];
+  uint32_t start_[MAX_SERVOS + 1];
+  uint16_t duration_[MAX_SERVOS + 1];
+
+  char buffer_[48 + 3 * MAX_SERVOS];
+};
+
+}  // namespace robot
+
+#endif  // ROBOT_CORE_H
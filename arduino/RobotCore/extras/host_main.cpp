@@ -0,0 +1,96 @@
+// host_main.cpp
+// Menjalankan RobotCore di Linux tanpa board ATX2: command dari stdin,
+// response ke stdout, servo controller ditiru (jawab "OK" setelah T+D ms).
+//
+// Build:
+//   g++ -std=c++11 -Wall -I arduino/RobotCore arduino/RobotCore/extras/host_main.cpp -o robot_core_host
+// Contoh:
+//   printf '#1P1800T300D100\n?\n#2P700T200D0\n' | ./robot_core_host A
+// Frame binary (lihat python/frame_protocol.py) bisa dicampur dengan baris ASCII
+
+#include <poll.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <unistd.h>
+
+#include "RobotCore.h"
+
+static uint32_t millisNow() {
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return (uint32_t)(ts.tv_sec * 1000UL + ts.tv_nsec / 1000000UL);
+}
+
+class StdoutLine : public robot::LineOutput {
+ public:
+  void line(const char* text) override {
+    fputs(text, stdout);
+    fputs("\r\n", stdout);
+    fflush(stdout);
+  }
+
+  void bytes(const uint8_t* data, uint8_t length) override {
+    fwrite(data, 1, length, stdout);
+    fflush(stdout);
+  }
+};
+
+// Servo controller tiruan: satu gerakan pada satu waktu, "OK" setelah T+D
+class FakeServoController : public robot::LineOutput {
+ public:
+  FakeServoController() : pending_(false), due_(0) {}
+
+  void line(const char* text) override {
+    unsigned ch, pos, t, d;
+    if (sscanf(text, "#%uP%uT%uD%u", &ch, &pos, &t, &d) == 4) {
+      pending_ = true;
+      due_ = millisNow() + t + d;
+    }
+  }
+
+  // Byte "OK\n" jika gerakan sudah selesai, NULL jika belum
+  const char* poll(uint32_t now) {
+    if (!pending_ || (int32_t)(now - due_) < 0) return NULL;
+    pending_ = false;
+    return "OK\n";
+  }
+
+  bool pending() const { return pending_; }
+
+ private:
+  bool pending_;
+  uint32_t due_;
+};
+
+int main(int argc, char** argv) {
+  char name = (argc > 1) ? argv[1][0] : 'A';
+
+  StdoutLine host;
+  FakeServoController servo;
+  robot::Engine<24> engine(name, host, servo);
+
+  bool open = true;
+  while (open || engine.busy() || servo.pending()) {
+    struct pollfd fd = {STDIN_FILENO, POLLIN, 0};
+    if (open && poll(&fd, 1, 1) > 0) {
+      char data[256];
+      ssize_t count = read(STDIN_FILENO, data, sizeof(data));
+      if (count <= 0) {
+        open = false;
+      } else {
+        for (ssize_t i = 0; i < count; i++) engine.hostByte(data[i], millisNow());
+      }
+    } else if (!open) {
+      usleep(1000);
+    }
+
+    uint32_t now = millisNow();
+    const char* reply = servo.poll(now);
+    if (reply != NULL) {
+      for (const char* c = reply; *c; c++) engine.servoByte(*c);
+    }
+    engine.update(now);
+  }
+  return 0;
+}
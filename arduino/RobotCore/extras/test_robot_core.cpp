@@ -0,0 +1,261 @@
+// test_robot_core.cpp
+// Unit test RobotCore di Linux: parser, antrian, OkMatcher, timeout OK,
+// "!S", dan protocol frame (NAK, buang duplikat seq, RESEND).
+//
+// Build dan jalankan (assert aktif, jangan pakai -DNDEBUG):
+//   g++ -std=c++11 -Wall -I arduino/RobotCore arduino/RobotCore/extras/test_robot_core.cpp -o test_robot_core
+//   ./test_robot_core
+
+#include <assert.h>
+
+#include <string>
+#include <vector>
+
+#include "RobotCore.h"
+
+// Output yang menyimpan semua baris dan frame untuk diperiksa
+class RecordingOutput : public robot::LineOutput {
+ public:
+  void line(const char* text) override { lines.push_back(text); }
+
+  void bytes(const uint8_t* data, uint8_t length) override {
+    frames.push_back(std::vector<uint8_t>(data, data + length));
+  }
+
+  void clear() {
+    lines.clear();
+    frames.clear();
+  }
+
+  std::vector<std::string> lines;
+  std::vector<std::vector<uint8_t> > frames;
+};
+
+typedef robot::Engine<24> TestEngine;
+
+static void feedLine(TestEngine& engine, const char* text, uint32_t now) {
+  for (const char* c = text; *c; c++) engine.hostByte(*c, now);
+  engine.hostByte('\n', now);
+}
+
+static void feedBytes(TestEngine& engine, const std::vector<uint8_t>& data, uint32_t now) {
+  for (size_t i = 0; i < data.size(); i++) engine.hostByte((char)data[i], now);
+}
+
+static void sendOk(TestEngine& engine) {
+  engine.servoByte('O');
+  engine.servoByte('K');
+  engine.servoByte('\n');
+}
+
+static std::vector<uint8_t> makeFrame(uint8_t seq, uint8_t kind, const std::vector<uint8_t>& payload) {
+  std::vector<uint8_t> frame;
+  frame.push_back(robot::FRAME_SOF);
+  frame.push_back((uint8_t)payload.size());
+  frame.push_back(seq);
+  frame.push_back(kind);
+  frame.insert(frame.end(), payload.begin(), payload.end());
+  uint16_t crc = robot::crc16(&frame[1], (uint8_t)(frame.size() - 1));
+  frame.push_back((uint8_t)crc);
+  frame.push_back((uint8_t)(crc >> 8));
+  return frame;
+}
+
+static void addMove(std::vector<uint8_t>& payload, uint8_t ch, uint16_t pos, uint16_t t, uint16_t d) {
+  const uint16_t values[3] = {pos, t, d};
+  payload.push_back(ch);
+  for (int i = 0; i < 3; i++) {
+    payload.push_back((uint8_t)values[i]);
+    payload.push_back((uint8_t)(values[i] >> 8));
+  }
+}
+
+// Frame valid dengan seq dan type tertentu?
+static bool isFrame(const std::vector<uint8_t>& frame, uint8_t seq, uint8_t kind) {
+  if (frame.size() < 6 || frame[0] != robot::FRAME_SOF) return false;
+  uint16_t crc = (uint16_t)frame[frame.size() - 2] | ((uint16_t)frame[frame.size() - 1] << 8);
+  return crc == robot::crc16(&frame[1], (uint8_t)(frame.size() - 3)) &&
+         frame[2] == seq && frame[3] == kind;
+}
+
+static robot::ParseError lastParseError = robot::PARSE_OK;
+
+static robot::ParseResult parse(const char* text, robot::Command& cmd) {
+  robot::CommandParser parser;
+  robot::ParseResult result = robot::PARSE_NONE;
+  for (const char* c = text; *c; c++) {
+    robot::ParseResult r = parser.feed(*c, cmd);
+    if (r != robot::PARSE_NONE) result = r;
+  }
+  robot::ParseResult r = parser.feed('\n', cmd);
+  if (r != robot::PARSE_NONE) result = r;
+  if (result == robot::PARSE_ERROR) lastParseError = parser.error();
+  return result;
+}
+
+static void testParser() {
+  robot::Command cmd;
+
+  assert(parse("  #12P2000T800D300  ", cmd) == robot::PARSE_COMMAND);
+  assert(cmd.kind == robot::CMD_MOVE && cmd.channel == 12 && cmd.position == 2000);
+  assert(cmd.time == 800 && cmd.delay == 300 && cmd.flags == 0);
+  assert(parse("!S", cmd) == robot::PARSE_COMMAND && cmd.kind == robot::CMD_STOP);
+  assert(parse("?", cmd) == robot::PARSE_COMMAND && cmd.kind == robot::CMD_QUERY);
+  assert(parse("", cmd) == robot::PARSE_NONE);
+
+  assert(parse("X1P1500T100D0", cmd) == robot::PARSE_ERROR);
+  assert(lastParseError == robot::PARSE_BAD_START);
+  assert(parse("!X", cmd) == robot::PARSE_ERROR && lastParseError == robot::PARSE_BAD_START);
+  assert(parse("!", cmd) == robot::PARSE_ERROR && lastParseError == robot::PARSE_BAD_START);
+  assert(parse("#1P1500T100", cmd) == robot::PARSE_ERROR);
+  assert(lastParseError == robot::PARSE_BAD_FORMAT);
+  assert(parse("#1Q1500T100D0", cmd) == robot::PARSE_ERROR);
+  assert(lastParseError == robot::PARSE_BAD_FORMAT);
+  assert(parse("#1P1500T100D0 x", cmd) == robot::PARSE_ERROR);
+  assert(lastParseError == robot::PARSE_BAD_FORMAT);
+  assert(parse("#1P3000T100D0", cmd) == robot::PARSE_ERROR);
+  assert(lastParseError == robot::PARSE_POSITION_RANGE);
+
+  std::string tooLong = "#1P1500T100D" + std::string(robot::MAX_LINE, '0');
+  assert(parse(tooLong.c_str(), cmd) == robot::PARSE_ERROR);
+  assert(lastParseError == robot::PARSE_TOO_LONG);
+}
+
+static void testOkMatcher() {
+  robot::OkMatcher ok;
+  assert(!ok.feed('x') && !ok.feed('O') && ok.feed('K'));
+  assert(!ok.feed('O') && !ok.feed('x') && !ok.feed('K'));
+  ok.feed('O');
+  ok.reset();
+  assert(!ok.feed('K'));
+}
+
+static void testQueueFull() {
+  RecordingOutput host, servo;
+  TestEngine engine('A', host, servo);
+
+  for (int i = 0; i < 8; i++) feedLine(engine, "#1P1500T100D0", 0);
+  assert(host.lines.empty() && engine.queued() == 8);
+  feedLine(engine, "#1P1500T100D0", 0);
+  assert(host.lines.size() == 1 && host.lines[0] == "[A] ERROR: Queue full");
+  assert(engine.queued() == 8);
+}
+
+static void testOkAndTimeout() {
+  RecordingOutput host, servo;
+  TestEngine engine('A', host, servo);
+
+  feedLine(engine, "#3P1800T100D0", 0);
+  feedLine(engine, "#4P1200T100D0", 0);
+  engine.update(0);
+  assert(servo.lines.size() == 1 && servo.lines[0] == "#3P1800T100D0");
+  assert(host.lines.back() == "[A] TX: #3P1800T100D0");
+
+  // OK dari servo controller: DONE lalu command berikutnya dikirim
+  sendOk(engine);
+  assert(host.lines.back() == "[A] DONE");
+  engine.update(50);
+  assert(servo.lines.size() == 2 && servo.lines[1] == "#4P1200T100D0");
+
+  // Tanpa OK: timeout di T + D + MARGIN_MS
+  host.clear();
+  engine.update(50 + 100 + robot::MARGIN_MS - 1);
+  assert(host.lines.empty());
+  engine.update(50 + 100 + robot::MARGIN_MS);
+  assert(host.lines.size() == 2);
+  assert(host.lines[0] == "[A] WARNING: No OK response" && host.lines[1] == "[A] DONE");
+  assert(!engine.busy());
+}
+
+static void testStopClearsQueue() {
+  RecordingOutput host, servo;
+  TestEngine engine('A', host, servo);
+
+  for (int i = 0; i < 3; i++) feedLine(engine, "#1P1500T500D0", 0);
+  engine.update(0);
+  assert(engine.busy() && engine.queued() == 2);
+
+  host.clear();
+  feedLine(engine, "!S", 10);
+  assert(host.lines.size() == 1 && host.lines[0] == "[A] STOPPED");
+  assert(!engine.busy() && engine.queued() == 0);
+  // OK yang datang terlambat bukan milik transaksi mana pun
+  assert(!engine.servoByte('O'));
+  engine.update(2000);
+  assert(servo.lines.size() == 1);
+}
+
+static void testFrames() {
+  RecordingOutput host, servo;
+  TestEngine engine('A', host, servo);
+
+  std::vector<uint8_t> payload;
+  addMove(payload, 1, 1800, 100, 0);
+  addMove(payload, 2, 700, 100, 0);
+  std::vector<uint8_t> moves = makeFrame(5, robot::FRAME_MOVES, payload);
+
+  // Frame utuh: ACK, kedua gerakan masuk antrian
+  feedBytes(engine, moves, 0);
+  assert(host.frames.size() == 1 && isFrame(host.frames[0], 5, robot::FRAME_ACK));
+  assert(engine.queued() == 2);
+
+  // Frame yang sama dikirim ulang (ACK hilang): ACK lagi, tidak diantrikan lagi
+  feedBytes(engine, moves, 1);
+  assert(host.frames.size() == 2 && isFrame(host.frames[1], 5, robot::FRAME_ACK));
+  assert(engine.queued() == 2);
+
+  // CRC rusak: NAK
+  std::vector<uint8_t> bad = makeFrame(6, robot::FRAME_MOVES, payload);
+  bad[5] ^= 0x04;
+  feedBytes(engine, bad, 2);
+  assert(host.frames.size() == 3 && isFrame(host.frames[2], 6, robot::FRAME_NAK));
+  assert(engine.queued() == 2);
+
+  // RESEND sebelum selesai: belum ada jawaban
+  feedBytes(engine, makeFrame(5, robot::FRAME_RESEND, std::vector<uint8_t>()), 3);
+  assert(host.frames.size() == 3);
+
+  // DONE hanya setelah gerakan terakhir frame, tanpa baris debug ASCII
+  engine.update(10);
+  sendOk(engine);
+  assert(host.frames.size() == 3);
+  engine.update(20);
+  sendOk(engine);
+  assert(host.frames.size() == 4 && isFrame(host.frames[3], 5, robot::FRAME_DONE));
+  assert(host.frames[3][4] == 0);
+  assert(host.lines.empty() && servo.lines.size() == 2);
+
+  // RESEND: jawaban akhir dikirim ulang tanpa menggerakkan servo lagi
+  feedBytes(engine, makeFrame(5, robot::FRAME_RESEND, std::vector<uint8_t>()), 30);
+  assert(host.frames.size() == 5 && host.frames[4] == host.frames[3]);
+  assert(!engine.busy() && servo.lines.size() == 2);
+
+  // Validasi: channel dan posisi
+  std::vector<uint8_t> wrong;
+  addMove(wrong, 30, 1500, 100, 0);
+  feedBytes(engine, makeFrame(7, robot::FRAME_MOVES, wrong), 40);
+  assert(isFrame(host.frames.back(), 7, robot::FRAME_ERROR));
+  assert(host.frames.back()[4] == robot::FRAME_ERR_CHANNEL);
+
+  // Frame terpotong direset setelah FRAME_GAP_MS; baris ASCII tetap jalan
+  std::vector<uint8_t> half(moves.begin(), moves.begin() + 5);
+  feedBytes(engine, half, 100);
+  feedLine(engine, "?", 100 + robot::FRAME_GAP_MS + 1);
+  assert(host.lines.size() == 1 && host.lines[0].compare(0, 8, "[A] POS ") == 0);
+
+  // STOP frame: antrian kosong, jawaban STOPPED
+  feedBytes(engine, makeFrame(8, robot::FRAME_STOP, std::vector<uint8_t>()), 200);
+  assert(isFrame(host.frames.back(), 8, robot::FRAME_STOPPED));
+  assert(!engine.busy());
+}
+
+int main() {
+  testParser();
+  testOkMatcher();
+  testQueueFull();
+  testOkAndTimeout();
+  testStopClearsQueue();
+  testFrames();
+  printf("RobotCore: semua test lulus\n");
+  return 0;
+}
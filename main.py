@@ -4,57 +4,195 @@ Program utama untuk mengontrol robot humanoid
 Integrasi: Serial Control + Ollama TTS + Movements
 """
 
+import argparse
+import asyncio
+import functools
+import os
 import time
 import sys
 from python.serial_controller import HumanoidController
-from python.tts_ollama import RobotSpeaker
+from python.tts_ollama import RobotSpeaker, ConversationSession
+from python.tts_engine import SpeechEngine
 from python.movement import RobotMovements
-from typing import Optional
+from python.pose_blend import PoseBlender, estimate_intensity
+from python.speech_sync import keyframe_cues
+from python.turn_pipeline import TurnPipeline
+from python.speculative_motion import SpeculativeMotion
+from python.control_server import ControlServer, DEFAULT_HOST, DEFAULT_PORT
+from python.startup import Startup
+from python.script_annotator import annotate_file, is_annotated, load_script
+from python.command_runner import add_arguments, run_script
+from python import teleop, tracing
+from typing import Callable, Dict, List, Optional
 
 class HumanoidRobot:
     """Main class untuk robot humanoid dengan speech dan movement"""
+    
+    # Command gerakan -> (nama gesture di RobotMovements, kwargs)
+    GESTURE_COMMANDS = {
+        '/nod': ('nod_head', {'times': 2}),
+        '/shake': ('shake_head', {'times': 2}),
+        '/wave': ('wave_hand', {'hand': 'right', 'times': 3}),
+        '/point_left': ('point_at', {'direction': 'left'}),
+        '/point_right': ('point_at', {'direction': 'right'}),
+        '/think': ('thinking_gesture', {}),
+        '/celebrate': ('celebrate', {}),
+    }
      
-    def __init__(self, ollama_model: str = "llama2"):
+    def __init__(self, ollama_model: str = "llama2",
+                 ollama_url: str = "http://localhost:11434",
+                 simulate: bool = False,
+                 speech_engine: Optional[SpeechEngine] = None,
+                 motion_process: bool = False):
         print("=" * 50)
         print("🤖 HUMANOID ROBOT CONTROL SYSTEM")
         print("=" * 50)
         
-        # Initialize components
-        print("\n📡 Menghubungkan ke Arduino...")
-        self.controller = HumanoidController()
-        
-        print("\n🎤 Menginisialisasi Speech System...")
-        self.speaker = RobotSpeaker(model=ollama_model)
-        
-        print("\n🦾 Menginisialisasi Movement Library...")
-        self.movements = RobotMovements(self.controller)
-        
+        # Subsystem di-init paralel; atribut di bawah (controller, speaker, ...)
+        # menunggu future masing-masing, jadi mode yang tidak memakai speech
+        # tidak pernah menunggu probe Ollama
+        self.startup = Startup()
+        
+        def connect():
+            print("\n📡 Menghubungkan ke Arduino...")
+            return HumanoidController(simulate=simulate, motion_process=motion_process)
+        
+        def init_speaker():
+            print("\n🎤 Menginisialisasi Speech System...")
+            speaker = RobotSpeaker(model=ollama_model, ollama_url=ollama_url,
+                                   engine=speech_engine)
+            # Pre-render kalimat demo ke cache TTS di background
+            speaker.tts.prerender([demo['speech'] for demo in self.demo_script()])
+            return speaker
+        
+        def go_home(controller: HumanoidController):
+            print("\n🏠 Moving to home position...")
+            return controller.go_home()
+        
+        self.startup.task('controller', connect)
+        self.startup.task('speaker', init_speaker)
+        self.startup.task('movements', RobotMovements, 'controller')
+        self.startup.task('blender', lambda controller: PoseBlender(controller.config),
+                          'controller')
+        # Home pose jalan bersamaan dengan init speech
+        self.startup.task('home', go_home, 'controller')
+        # Gerakan spekulatif selama Ollama generate
+        self.startup.task('speculation',
+                          lambda controller, speaker, movements: SpeculativeMotion(
+                              controller, speaker.emotion_to_pose,
+                              arbiter=movements.arbiter),
+                          'controller', 'speaker', 'movements')
+        
+        # Sesi percakapan aktif (dibuat oleh interactive_mode)
+        self.session: Optional[ConversationSession] = None
+        
+        # Tabel dispatch command khusus: nama -> handler(arg, background)
+        self._commands: Dict[str, Callable[[str, bool], bool]] = {
+            command: functools.partial(self._cmd_gesture, gesture, kwargs)
+            for command, (gesture, kwargs) in self.GESTURE_COMMANDS.items()
+        }
+        self._commands.update({
+            '/home': self._cmd_home,
+            '/stop': self._cmd_stop,
+            '/pose': self._cmd_pose,
+            '/list_poses': self._cmd_list_poses,
+            '/teach': self._cmd_teach,
+            '/reset': self._cmd_reset,
+            '/teleop': self._cmd_teleop,
+        })
+    
+    @property
+    def controller(self) -> HumanoidController:
+        return self.startup.get('controller')
+    
+    @property
+    def speaker(self) -> RobotSpeaker:
+        return self.startup.get('speaker')
+    
+    @property
+    def movements(self) -> RobotMovements:
+        return self.startup.get('movements')
+    
+    @property
+    def blender(self) -> PoseBlender:
+        return self.startup.get('blender')
+    
+    @property
+    def speculation(self) -> SpeculativeMotion:
+        return self.startup.get('speculation')
+    
+    def wait_ready(self, *subsystems: str):
+        """Tunggu subsystem tertentu siap lalu cetak timeline startup"""
+        for name in subsystems:
+            self.startup.get(name)
+        self.startup.report()
         print("\n✓ Sistem siap!\n")
     
+    def _wait_home(self):
+        """Gerakan baru menunggu home pose startup (servo yang sama) selesai"""
+        self.startup.wait('home')
+    
     def speak_and_move(self, text: str, pose_name: Optional[str] = None,
-                       auto_emotion: bool = True):
+                       auto_emotion: bool = True, emotion: Optional[str] = None):
         """
         Berbicara dan bergerak secara bersamaan
         
+        Speech diputar di background sejak awal; keyframe pose disinkronkan
+        ke batas kalimat/kata dalam ucapan.
+        
         Args:
             text: Text yang akan diucapkan
             pose_name: Nama pose spesifik (None = auto detect dari emotion)
             auto_emotion: Otomatis detect emotion
+            emotion: Emotion yang sudah diketahui (script teranotasi), tanpa LLM
         """
         print(f"\n💬 Robot akan berbicara: '{text}'")
-        
-        # Detect emotion dan dapatkan suggested pose
-        if auto_emotion and not pose_name:
-            _, suggested_pose = self.speaker.speak_with_emotion(text, auto_detect_emotion=True)
+        start = time.time()
+        
+        # Speech tidak bergantung pada emotion, jadi langsung dimulai
+        speech, duration = self.speaker.tts.speak_async(text)
+        
+        # Detect emotion sambil robot berbicara
+        blend = None
+        if emotion is None and auto_emotion and not pose_name:
+            emotion = self.speaker.detect_emotion(text)
+        if emotion is not None:
+            emotion_pose = self.speaker.emotion_to_pose.get(emotion, 'attention')
+            suggested_pose = pose_name or emotion_pose
+            if suggested_pose == emotion_pose:
+                blend = self.speaker.emotion_blends.get(emotion)
         else:
-            self.speaker.tts.speak(text, use_system_tts=True)
             suggested_pose = pose_name if pose_name else 'attention'
         
-        # Execute pose
+        self._wait_home()
+        
+        # Jika pose spekulatif sudah benar, gerakan sudah berjalan sejak tadi
+        if suggested_pose and self.speculation.active:
+            if self.speculation.resolve(suggested_pose):
+                suggested_pose = None
+        
+        # Pose single-step: campuran pose emosi, diskalakan intensitas ucapan
+        if suggested_pose and blend and self.controller.pose_keyframes(suggested_pose) == 1:
+            intensity = estimate_intensity(text)
+            print(f"🦾 Blend pose: {blend} x {intensity:.2f}")
+            arbiter = self.movements.arbiter
+            arbiter.submit(f"blend:{emotion}",
+                           arbiter.groups_for_parts(self.blender.active_parts(blend)),
+                           self.blender.execute, self.controller, blend, intensity,
+                           check=arbiter.check).wait()
+            suggested_pose = None
+        
+        # Execute pose dengan cue yang mengikuti ucapan
         if suggested_pose:
             print(f"🦾 Executing pose: {suggested_pose}")
-            time.sleep(0.5)  # Small delay before movement
-            self.controller.execute_pose(suggested_pose)
+            elapsed = time.time() - start
+            keyframes = self.controller.pose_keyframes(suggested_pose)
+            cues = [max(0.0, cue - elapsed)
+                    for cue in keyframe_cues(text, duration, keyframes)]
+            self.movements.start_pose(suggested_pose, cue_times=cues).wait()
+        
+        speech.result()
+        print(f"⏱ Speak + move: {time.time() - start:.2f}s (audio {duration:.2f}s)")
     
     def interactive_mode(self):
         """Mode interaktif - user input text, robot respond"""
@@ -65,6 +203,9 @@ class HumanoidRobot:
         print("Ketik 'quit' untuk keluar")
         print("Ketik 'commands' untuk melihat command khusus\n")
         
+        # Satu sesi untuk seluruh mode interaktif, context Ollama dipakai ulang
+        self.session = self.speaker.new_session()
+        
         while True:
             try:
                 user_input = input("You: ").strip()
@@ -85,11 +226,136 @@ class HumanoidRobot:
                     continue
                 
                 # Normal speech + movement
-                self.speak_and_move(user_input)
+                reply = None
+                if self.speaker.tts.available:
+                    # Mulai bergerak ke pose tebakan selagi menunggu Ollama
+                    self.speculation.start(user_input)
+                    start = time.time()
+                    reply = self.session.ask(user_input)
+                    if reply:
+                        print(f"⏱ Ollama: {time.time() - start:.2f}s "
+                              f"({self.session.last_prompt_tokens} token prompt)")
+                
+                self.speak_and_move(reply if reply else user_input)
                 
             except KeyboardInterrupt:
+                self.emergency_stop()
                 print("\n\n👋 Program dihentikan")
                 break
+        
+        self.speculation.cancel()
+        self.speculation.report()
+    
+    def pipeline_mode(self):
+        """Mode interaktif async - input baru memotong turn yang sedang berjalan"""
+        print("\n" + "=" * 50)
+        print("⚡ MODE PIPELINE")
+        print("=" * 50)
+        print("\nKetik text kapan saja; input baru menghentikan respon sebelumnya")
+        print("Ketik 'quit' untuk keluar")
+        print("Ketik 'commands' untuk melihat command khusus\n")
+        
+        self.session = self.speaker.new_session()
+        
+        try:
+            asyncio.run(TurnPipeline(self).run())
+        except KeyboardInterrupt:
+            self.emergency_stop()
+            print("\n\n👋 Program dihentikan")
+    
+    def script_mode(self, path: Optional[str] = None):
+        """Putar script show teranotasi (emotion + pose per baris) tanpa LLM"""
+        print("\n" + "=" * 50)
+        print("📜 MODE SCRIPT")
+        print("=" * 50)
+        
+        path = path or input("File script (.txt / .json): ").strip()
+        lines = load_script(path)
+        if not lines:
+            print("✗ Script kosong")
+            return
+        
+        # Script mentah dianotasi sekali di sini (batch + concurrent)
+        if not is_annotated(lines):
+            _, lines = annotate_file(path, self.speaker.tts, self.speaker.emotion_to_pose)
+        
+        self.speaker.tts.prerender([line['speech'] for line in lines])
+        
+        try:
+            for i, line in enumerate(lines, 1):
+                print(f"\n[{i}/{len(lines)}] {line['emotion']} → {line['pose']}")
+                self.speak_and_move(line['speech'], pose_name=line['pose'],
+                                    emotion=line['emotion'])
+        except KeyboardInterrupt:
+            self.emergency_stop()
+            print("\n\n👋 Script dihentikan")
+            return
+        
+        print("\n✓ Script selesai!")
+    
+    def server_mode(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """Kontrol robot lewat jaringan (UI, script behaviour, console operator)"""
+        print("\n" + "=" * 50)
+        print("🌐 MODE SERVER")
+        print("=" * 50)
+        print("\nProtocol: JSON per baris, contoh:")
+        print('  {"id": 1, "op": "pose", "name": "greeting"}')
+        print("Tekan Ctrl+C untuk berhenti\n")
+        
+        server = ControlServer(self.controller, self.movements, host=host, port=port)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            self.emergency_stop()
+            print("\n\n👋 Server dihentikan")
+    
+    def emergency_stop(self):
+        """Hentikan semua gerakan dan suara secepatnya"""
+        self.movements.arbiter.cancel_all()
+        if self.startup.ready('speaker'):
+            self.speaker.tts.stop_speaking()
+        self.controller.emergency_stop()
+        if self.startup.ready('speculation'):
+            self.speculation.cancel()
+        
+        # Gesture yang dibatalkan melepas grup servo-nya sebelum gerakan diizinkan lagi
+        self.movements.arbiter.wait_idle(timeout=2)
+        self.controller.resume_motion()
+    
+    def teach_pose(self, pose_name: str, seconds: Optional[str] = None) -> bool:
+        """
+        Simpan pose dari telemetry posisi (single-step, atau sequence N detik terakhir)
+        
+        Returns:
+            True jika pose tersimpan
+        
+        Raises:
+            ValueError: `seconds` bukan angka, atau telemetry belum cukup
+        """
+        duration = float(seconds) if seconds else None
+        if duration is not None and duration <= 0:
+            raise ValueError(f"Durasi teach harus > 0 detik: {seconds}")
+        telemetry = self.controller.telemetry
+        if telemetry is None:
+            telemetry = self.controller.enable_telemetry()
+            if telemetry is None:
+                return False
+            if duration:
+                print("⚠ Telemetry baru aktif, belum ada rekaman gerakan")
+                return False
+            time.sleep(0.2)  # Tunggu frame posisi pertama
+        
+        if duration:
+            pose = telemetry.teach_sequence(pose_name, duration)
+            if not pose['sequence']:
+                print("⚠ Tidak ada gerakan terekam")
+                return False
+        else:
+            pose = telemetry.teach_pose(pose_name)
+            if not pose['servos']:
+                print("✗ Belum ada posisi dari telemetry, pose tidak disimpan")
+                return False
+        return True
     
     def show_commands(self):
         """Tampilkan command khusus"""
@@ -104,10 +370,16 @@ class HumanoidRobot:
         print("  /point_right  - Tunjuk kanan")
         print("  /think        - Pose berpikir")
         print("  /celebrate    - Pose merayakan")
-        print("  /home         - Kembali ke home position")
+        print("  /home         - Stop lalu langsung ke home position")
+        print("  /stop         - Emergency stop semua gerakan")
+        print("  <gerakan> &   - Jalan di background (contoh: /wave & lalu /nod)")
         print("\nPoses:")
         print("  /pose <name>  - Execute pose tertentu")
         print("  /list_poses   - Tampilkan semua poses")
+        print("  /teach <name> [detik] - Simpan posisi saat ini (atau gerakan N detik terakhir)")
+        print("  /teleop [gamepad|file.jsonl] - Kendalikan kepala/lengan live (default keyboard)")
+        print("\nPercakapan:")
+        print("  /reset        - Mulai percakapan baru")
         print("\nOther:")
         print("  commands      - Tampilkan menu ini")
         print("  quit          - Keluar dari program")
@@ -120,68 +392,116 @@ class HumanoidRobot:
         Returns:
             True jika command dihandle, False jika bukan special command
         """
-        command = command.lower().strip()
-        
-        # Movement commands
-        if command == '/nod':
-            self.movements.nod_head(times=2)
-            return True
-        
-        elif command == '/shake':
-            self.movements.shake_head(times=2)
-            return True
-        
-        elif command == '/wave':
-            self.movements.wave_hand(hand="right", times=3)
-            return True
-        
-        elif command == '/point_left':
-            self.movements.point_at("left")
-            return True
-        
-        elif command == '/point_right':
-            self.movements.point_at("right")
-            return True
-        
-        elif command == '/think':
-            self.movements.thinking_gesture()
-            return True
-        
-        elif command == '/celebrate':
-            self.movements.celebrate()
-            return True
-        
-        elif command == '/home':
-            self.controller.go_home()
-            return True
-        
-        # Pose commands
-        elif command.startswith('/pose '):
-            pose_name = command.split(' ', 1)[1].strip()
-            success = self.controller.execute_pose(pose_name)
-            if not success:
-                print(f"✗ Pose '{pose_name}' tidak ditemukan")
-            return True
-        
-        elif command == '/list_poses':
-            poses = self.controller.config.list_poses()
-            print("\n📋 Available Poses:")
-            for pose_name in poses:
-                pose_data = self.controller.config.get_pose(pose_name)
-                # print(f"  - {pose_name}: {pose_data['description']}")
-                print(f"  - {pose_name}")
-            print()
-            return True
-        
-        return False
+        return self.run_command(command) is not None
     
-    def demo_mode(self):
-        """Mode demo - showcase berbagai kemampuan robot"""
-        print("\n" + "=" * 50)
-        print("🎬 MODE DEMO")
-        print("=" * 50)
+    def command_names(self) -> List[str]:
+        return sorted(self._commands)
+    
+    def run_command(self, command: str) -> Optional[bool]:
+        """
+        Jalankan satu command khusus lewat tabel dispatch
+        
+        Akhiran '&' = gesture jalan di background, bisa paralel dengan
+        gesture lain yang memakai grup servo berbeda (contoh: /wave & lalu /nod)
         
-        demos = [
+        Returns:
+            None jika bukan command khusus, selain itu True/False (sukses)
+        """
+        command = command.strip()
+        
+        background = command.endswith('&')
+        if background:
+            command = command[:-1].strip()
+        
+        # Hanya nama command yang case-insensitive; argumen (path, nama pose) apa adanya
+        name, _, arg = command.partition(' ')
+        name = name.lower()
+        handler = self._commands.get(name)
+        if handler is None:
+            return None
+        if name != '/stop':
+            self._wait_home()
+        return handler(arg.strip(), background)
+    
+    def _cmd_gesture(self, gesture: str, kwargs: Dict, arg: str, background: bool) -> bool:
+        handle = self.movements.start(gesture, **kwargs)
+        return True if background else handle.wait()
+    
+    def _cmd_home(self, arg: str, background: bool) -> bool:
+        self.movements.arbiter.cancel_all()
+        return self.controller.home_now()
+    
+    def _cmd_stop(self, arg: str, background: bool) -> bool:
+        self.emergency_stop()
+        return True
+    
+    def _cmd_pose(self, pose_name: str, background: bool) -> bool:
+        config = self.controller.config
+        if not config.get_pose(pose_name) and config.get_pose(pose_name.lower()):
+            pose_name = pose_name.lower()
+        if not pose_name or not config.get_pose(pose_name):
+            print(f"✗ Pose '{pose_name}' tidak ditemukan")
+            return False
+        handle = self.movements.start_pose(pose_name)
+        return True if background else handle.wait() and bool(handle.result)
+    
+    def _cmd_list_poses(self, arg: str, background: bool) -> bool:
+        poses = self.controller.config.list_poses()
+        print("\n📋 Available Poses:")
+        for pose_name in poses:
+            print(f"  - {pose_name}")
+        print()
+        return True
+    
+    def _cmd_teach(self, arg: str, background: bool) -> bool:
+        if not arg:
+            print("✗ Format: /teach <name> [detik]")
+            return False
+        try:
+            return self.teach_pose(*arg.split()[:2])
+        except ValueError as e:
+            print(f"✗ Teach gagal: {e}")
+            return False
+    
+    def _cmd_reset(self, arg: str, background: bool) -> bool:
+        if self.session:
+            self.session.reset()
+        print("✓ Percakapan di-reset")
+        return True
+    
+    def _cmd_teleop(self, arg: str, background: bool) -> bool:
+        config = self.controller.config
+        if not arg:
+            if not teleop.keyboard_available():
+                print("✗ Teleop keyboard butuh terminal (stdin bukan tty)")
+                return False
+            print("⌨ a/d w/s = kepala, i/k j/l u/o = lengan kanan, "
+                  "t/g f/h r/y = lengan kiri, spasi = center, q = selesai")
+            source = teleop.keyboard_source(config)
+        elif arg.lower() == 'gamepad':
+            if not os.path.exists(teleop.GAMEPAD_DEVICE):
+                print(f"✗ Gamepad tidak ditemukan: {teleop.GAMEPAD_DEVICE}")
+                return False
+            source = teleop.gamepad_source(config)
+        elif os.path.exists(arg):
+            source = teleop.replay_source(arg)
+        else:
+            print(f"✗ File event tidak ditemukan: {arg}")
+            return False
+        
+        self.movements.arbiter.cancel_all()
+        session = teleop.Teleop(self.controller)
+        try:
+            session.run(source)
+        except (OSError, ValueError) as e:
+            print(f"✗ Teleop berhenti: {e}")
+            return False
+        session.report()
+        return session.stats.failed == 0
+    
+    def demo_script(self) -> list:
+        """Daftar langkah demo (speech + pose/action)"""
+        return [
             {
                 'name': 'Perkenalan',
                 'speech': 'Halo! Nama saya Robot Humanoid. Senang bertemu dengan Anda!',
@@ -213,6 +533,14 @@ class HumanoidRobot:
                 'action': lambda: self.movements.celebrate()
             }
         ]
+    
+    def demo_mode(self):
+        """Mode demo - showcase berbagai kemampuan robot"""
+        print("\n" + "=" * 50)
+        print("🎬 MODE DEMO")
+        print("=" * 50)
+        
+        demos = self.demo_script()
         
         for i, demo in enumerate(demos, 1):
             print(f"\n{i}. {demo['name']}")
@@ -224,7 +552,7 @@ class HumanoidRobot:
             
             # Movement
             if 'pose' in demo:
-                self.controller.execute_pose(demo['pose'])
+                self.movements.start_pose(demo['pose']).wait()
             elif 'action' in demo:
                 demo['action']()
             
@@ -266,44 +594,91 @@ class HumanoidRobot:
         print("\n🔄 Cleaning up...")
         self.controller.go_home()
         time.sleep(1)
+        self.controller.serial.stop_latency_report()
         self.controller.close()
+        # Speech yang belum selesai init ditutup begitu siap
+        self.startup.when_ready('speaker', lambda speaker: speaker.tts.engine.close())
+        self.startup.shutdown()
         print("✓ Cleanup complete")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Humanoid robot control system")
+    parser.add_argument("--run", metavar="SCRIPT",
+                        help="Jalankan script command tanpa menu ('-' = stdin), "
+                             "lihat python/command_runner.py")
+    parser.add_argument("--simulate", action="store_true", help="Controller simulasi")
+    parser.add_argument("--motion-process", action="store_true",
+                        help="Port serial di process terpisah")
+    parser.add_argument("--model", default="llama2", help="Model Ollama")
+    parser.add_argument("--ollama-url", default="http://localhost:11434")
+    add_arguments(parser)
+    return parser.parse_args()
+
+
+def run_headless(args) -> bool:
+    """Mode tanpa operator: jalankan script command lalu laporan"""
+    robot = HumanoidRobot(ollama_model=args.model, ollama_url=args.ollama_url,
+                          simulate=args.simulate, motion_process=args.motion_process)
+    try:
+        robot.wait_ready('movements', 'home')
+        passed = run_script(robot, args.run, args.stop_on_fail, args.report)
+        # Gesture background ('&') diselesaikan sebelum cleanup
+        robot.movements.arbiter.wait_idle(timeout=30)
+        return passed
+    finally:
+        robot.cleanup()
+
+
 def main():
     """Main function"""
+    args = parse_args()
+    
+    # ROBOT_TRACE / ROBOT_METRICS_PORT / ROBOT_LOG_LEVEL
+    tracing.configure_from_env()
+    
+    if args.run:
+        sys.exit(0 if run_headless(args) else 1)
+    
     print("\n" + "=" * 60)
     print("       🤖 HUMANOID ROBOT CONTROL SYSTEM 🤖")
     print("=" * 60)
     print("\nPilih mode:")
     print("  1. Interactive Mode  - Kontrol robot dengan input text")
-    print("  2. Demo Mode         - Showcase kemampuan robot")
-    print("  3. Test Mode         - Test fungsi dasar")
-    print("  4. Quit              - Keluar")
+    print("  2. Pipeline Mode     - Interaktif async dengan barge-in")
+    print("  3. Demo Mode         - Showcase kemampuan robot")
+    print("  4. Test Mode         - Test fungsi dasar")
+    print("  5. Server Mode       - Kontrol lewat jaringan (TCP)")
+    print("  6. Script Mode       - Putar script show teranotasi")
+    print("  7. Quit              - Keluar")
     print()
     
+    robot = None
     try:
-        choice = input("Pilihan (1-4): ").strip()
+        choice = input("Pilihan (1-7): ").strip()
         
-        if choice == '4':
+        if choice == '7':
             print("\n👋 Sampai jumpa!")
             return
         
-        # Initialize robot
-        robot = HumanoidRobot(ollama_model="llama2")
-        
-        # Go to home position first
-        print("\n🏠 Moving to home position...")
-        robot.controller.go_home()
-        time.sleep(2)
+        # Initialize robot; home pose berjalan selama subsystem lain init
+        robot = HumanoidRobot(ollama_model=args.model, ollama_url=args.ollama_url,
+                              simulate=args.simulate, motion_process=args.motion_process)
+        robot.wait_ready('movements', 'home')
         
         # Execute selected mode
         if choice == '1':
             robot.interactive_mode()
         elif choice == '2':
-            robot.demo_mode()
+            robot.pipeline_mode()
         elif choice == '3':
+            robot.demo_mode()
+        elif choice == '4':
             robot.test_mode()
+        elif choice == '5':
+            robot.server_mode()
+        elif choice == '6':
+            robot.script_mode()
         else:
             print("\n✗ Pilihan tidak valid")
         
@@ -311,6 +686,8 @@ def main():
         robot.cleanup()
         
     except KeyboardInterrupt:
+        if robot:
+            robot.emergency_stop()
         print("\n\n⚠ Program dihentikan oleh user")
     except Exception as e:
         print(f"\n✗ Error: {e}")
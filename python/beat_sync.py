@@ -0,0 +1,409 @@
+"""
+beat_sync.py
+Koreografi mengikuti musik: onset dan beat dideteksi dari file WAV secara
+streaming (FFT NumPy per blok frame), lalu step movement di-time-warp ke beat
+dan dijadwalkan lebih awal untuk mengompensasi latency serial
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import wave
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from python.keyframes import KeyframePlayer, KeyframeTrack
+from python.servo_config import ServoConfig
+
+FRAME_SIZE = 1024
+HOP_SIZE = 512
+CHUNK_FRAMES = 16384       # Sampel per blok baca WAV
+BANDS = 24
+BAND_LOW_HZ = 30
+
+MIN_BPM = 60
+MAX_BPM = 200
+PRIOR_BPM = 120            # Pusat prior tempo (mengurangi salah oktaf)
+TIGHTNESS = 100            # Penalti beat yang menyimpang dari periode tempo
+
+# Command dikirim lebih awal: ~20 byte @ 9600 baud ke servo controller + USB + scheduler
+SERIAL_LEAD_MS = 30
+MIN_TIME_MS = 20
+
+
+def read_wav_chunks(path: str, chunk_frames: int = CHUNK_FRAMES) -> Tuple[int, Iterator[np.ndarray]]:
+    """
+    Buka WAV PCM (8/16/32 bit) sebagai stream blok mono float32
+
+    Returns:
+        (sample rate, iterator blok)
+    """
+    wav = wave.open(path, 'rb')
+    width = wav.getsampwidth()
+    if width not in (1, 2, 4):
+        wav.close()
+        raise ValueError(f"WAV {width * 8} bit tidak didukung: {path}")
+    channels = wav.getnchannels()
+
+    def chunks():
+        try:
+            while True:
+                data = wav.readframes(chunk_frames)
+                if not data:
+                    break
+                if width == 1:
+                    samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+                else:
+                    dtype = np.int16 if width == 2 else np.int32
+                    samples = np.frombuffer(data, dtype=dtype).astype(np.float32)
+                    samples /= float(np.iinfo(dtype).max)
+                yield samples.reshape(-1, channels).mean(axis=1)
+        finally:
+            wav.close()
+
+    return wav.getframerate(), chunks()
+
+
+class OnsetDetector:
+    """
+    Onset envelope (spectral flux) dari blok audio berurutan
+
+    Tiap blok dipotong menjadi frame overlap (FRAME_SIZE/HOP_SIZE) tanpa copy,
+    semua frame blok itu di-FFT sekaligus, dan flux dihitung per band
+    log-spaced (bukan per bin). Sisa sampel dan spektrum frame terakhir
+    dibawa ke blok berikutnya, jadi hasilnya sama dengan memproses seluruh
+    file sekaligus.
+    """
+
+    def __init__(self, sample_rate: int, frame_size: int = FRAME_SIZE, hop_size: int = HOP_SIZE):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.window = np.hanning(frame_size).astype(np.float32)
+
+        # Band log-spaced: noise frekuensi tinggi tidak mendominasi flux
+        edges = np.geomspace(BAND_LOW_HZ, sample_rate / 2, BANDS + 1) * frame_size / sample_rate
+        self.band_starts = np.unique(np.clip(edges[:-1].astype(int), 0, frame_size // 2))
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._previous: Optional[np.ndarray] = None
+        self._envelope: List[np.ndarray] = []
+        self.samples = 0
+
+    @property
+    def frame_rate(self) -> float:
+        """Nilai envelope per detik"""
+        return self.sample_rate / self.hop_size
+
+    def feed(self, samples: np.ndarray):
+        self.samples += len(samples)
+        buffer = np.concatenate([self._pending, samples])
+        if len(buffer) < self.frame_size:
+            self._pending = buffer
+            return
+
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, self.frame_size)[::self.hop_size]
+        magnitude = np.abs(np.fft.rfft(frames * self.window, axis=1))
+        spectrum = np.log1p(100 * np.add.reduceat(magnitude, self.band_starts, axis=1))
+
+        previous = spectrum[:1] if self._previous is None else self._previous[None]
+        flux = np.diff(np.vstack([previous, spectrum]), axis=0)
+        self._envelope.append(np.maximum(flux, 0).sum(axis=1))
+
+        self._previous = spectrum[-1]
+        self._pending = buffer[len(frames) * self.hop_size:]
+
+    def envelope(self) -> np.ndarray:
+        """Envelope onset sejauh ini, dinormalisasi (mean 0, std 1)"""
+        if not self._envelope:
+            return np.zeros(0, dtype=np.float32)
+        envelope = np.concatenate(self._envelope)
+        std = envelope.std()
+        return (envelope - envelope.mean()) / std if std > 0 else envelope * 0
+
+    def frame_times(self, count: int) -> np.ndarray:
+        """Waktu (detik) tiap nilai envelope = pusat frame"""
+        return (np.arange(count) * self.hop_size + self.frame_size / 2) / self.sample_rate
+
+
+def estimate_tempo(envelope: np.ndarray, frame_rate: float) -> float:
+    """Periode beat (dalam frame envelope) dari autokorelasi envelope"""
+    n = len(envelope)
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    spectrum = np.fft.rfft(envelope, size)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+
+    low = int(frame_rate * 60 / MAX_BPM)
+    high = min(n - 2, int(np.ceil(frame_rate * 60 / MIN_BPM)))
+    if high <= low:
+        raise ValueError("Audio terlalu pendek untuk estimasi tempo")
+
+    lags = np.arange(low, high + 1)
+    bpm = 60 * frame_rate / lags
+    prior = np.exp(-0.5 * (np.log2(bpm / PRIOR_BPM)) ** 2)
+    best = int(lags[np.argmax(autocorr[low:high + 1] * prior)])
+
+    # Interpolasi parabola untuk periode di antara frame
+    a, b, c = autocorr[best - 1:best + 2]
+    denominator = a - 2 * b + c
+    return best + (0.5 * (a - c) / denominator if denominator else 0.0)
+
+
+def track_beats(envelope: np.ndarray, period: float) -> np.ndarray:
+    """
+    Index frame beat dengan dynamic programming (Ellis 2007)
+
+    score[t] = envelope[t] + max(score[p] - TIGHTNESS * log((t - p) / period)^2)
+    untuk p di [t - 2*period, t - period/2]; beat = backtrace dari skor
+    tertinggi di periode terakhir.
+    """
+    n = len(envelope)
+    offsets = np.arange(int(round(2 * period)), int(round(period / 2)) - 1, -1)
+    penalty = -TIGHTNESS * np.log(offsets / period) ** 2
+
+    score = envelope.astype(np.float64).copy()
+    backlink = np.full(n, -1)
+    for t in range(int(offsets[-1]), n):
+        candidates = t - offsets
+        valid = candidates >= 0
+        total = score[candidates[valid]] + penalty[valid]
+        best = int(np.argmax(total))
+        if total[best] > 0:
+            score[t] += total[best]
+            backlink[t] = candidates[valid][best]
+
+    tail = max(0, n - int(round(period)))
+    beat = tail + int(np.argmax(score[tail:]))
+    beats = []
+    while beat >= 0:
+        beats.append(beat)
+        beat = backlink[beat]
+    return np.array(beats[::-1], dtype=np.int64)
+
+
+class BeatAnalysis:
+    """Hasil analisa satu file: beat (detik), tempo, dan kecepatan analisa"""
+
+    def __init__(self, beats: np.ndarray, bpm: float, duration: float, elapsed: float):
+        self.beats = beats
+        self.bpm = bpm
+        self.duration = duration
+        self.elapsed = elapsed
+
+    @property
+    def period(self) -> float:
+        return 60 / self.bpm
+
+    @property
+    def realtime_factor(self) -> float:
+        return self.duration / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def beat_at(self, index: int) -> float:
+        """Waktu beat ke-index; di luar hasil deteksi diekstrapolasi dengan periode tempo"""
+        if index < len(self.beats):
+            return float(self.beats[index])
+        return float(self.beats[-1]) + (index - len(self.beats) + 1) * self.period
+
+
+def analyze_file(path: str, chunk_frames: int = CHUNK_FRAMES) -> BeatAnalysis:
+    """Deteksi beat file WAV secara streaming"""
+    start = time.perf_counter()
+    sample_rate, chunks = read_wav_chunks(path, chunk_frames)
+    detector = OnsetDetector(sample_rate)
+    for chunk in chunks:
+        detector.feed(chunk)
+
+    envelope = detector.envelope()
+    period = estimate_tempo(envelope, detector.frame_rate)
+    beats = track_beats(envelope, period)
+    times = detector.frame_times(len(envelope))[beats]
+
+    return BeatAnalysis(times, 60 * detector.frame_rate / period,
+                        detector.samples / sample_rate, time.perf_counter() - start)
+
+
+def warp_movement(movement: Dict, analysis: BeatAnalysis, config: ServoConfig,
+                  loop: bool = False, lead_ms: int = SERIAL_LEAD_MS,
+                  beats_per_step: Optional[int] = None) -> KeyframeTrack:
+    """
+    Movement JSON -> KeyframeTrack yang step-nya jatuh tepat di beat
+
+    Tiap step mendapat round(time / periode beat) beat (minimal 1), atau
+    beats_per_step jika diberikan. Step dimulai di beat-nya dan time/delay
+    servo diskalakan supaya gerakan selesai di beat step berikutnya. Keyframe
+    dijadwalkan lead_ms lebih awal (latency kirim serial). Dengan loop, step
+    diulang sampai beat habis.
+    """
+    steps = movement['steps']
+    rows = []
+    beat = 0
+
+    while True:
+        for step in steps:
+            if beat >= len(analysis.beats):
+                break
+            count = beats_per_step or max(1, int(round(step['time'] / 1000 / analysis.period)))
+            start = analysis.beat_at(beat)
+            scale = (analysis.beat_at(beat + count) - start) * 1000 / step['time']
+            t_ms = max(0, int(round(start * 1000)) - lead_ms)
+
+            for servo in step['servos']:
+                time_ms = int(np.clip(servo.get('time', step['time']) * scale, MIN_TIME_MS, 65535))
+                delay_ms = int(min(servo.get('delay', 0) * scale, 65535))
+                rows.append((t_ms, servo['part'], servo['position'], time_ms, delay_ms))
+            beat += count
+
+        if not loop or beat >= len(analysis.beats):
+            break
+
+    name = f"{movement.get('name', '')} @ {analysis.bpm:.0f} BPM"
+    return KeyframeTrack.from_rows(name, rows, config)
+
+
+def load_movement(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['movement']
+
+
+def play_with_music(robot, wav_path: str, track: KeyframeTrack) -> Dict[str, int]:
+    """Putar audio dan track bersamaan (t=0 track = 50 ms setelah play, lihat KeyframePlayer)"""
+    from python.tts_engine import AudioPlayer
+
+    player = AudioPlayer()
+    with open(wav_path, 'rb') as f:
+        audio = f.read()
+
+    def start_music():
+        time.sleep(0.05)
+        player.play(audio, wav_path)
+
+    music = None
+    if player.available():
+        music = threading.Thread(target=start_music, daemon=True)
+        music.start()
+    else:
+        print("⚠ Audio player tidak tersedia, hanya gerakan yang diputar")
+
+    try:
+        return KeyframePlayer(robot.serial).play(track)
+    finally:
+        if music:
+            player.stop()
+
+
+# ---------- Self test ----------
+def synthesize_clicks(path: str, bpm: float, seconds: float = 20, offset: float = 0.37,
+                      sample_rate: int = 22050, seed: int = 0) -> np.ndarray:
+    """Tulis WAV click track (kick + noise + hi-hat off-beat); mengembalikan waktu click"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = 0.05 * rng.standard_normal(len(t))
+
+    clicks = np.arange(offset, seconds - 0.2, 60 / bpm)
+    kick_t = np.arange(int(0.15 * sample_rate)) / sample_rate
+    kick = np.sin(2 * np.pi * 60 * kick_t * (1 + 2 * np.exp(-kick_t * 40))) * np.exp(-kick_t * 25)
+    hat = rng.standard_normal(int(0.03 * sample_rate)) * np.exp(-np.arange(int(0.03 * sample_rate)) / 100)
+
+    for i, click in enumerate(clicks):
+        start = int(click * sample_rate)
+        audio[start:start + len(kick)] += kick[:len(audio) - start]
+        off = int((click + 30 / bpm) * sample_rate)
+        if off < len(audio):
+            audio[off:off + len(hat)] += 0.2 * hat[:len(audio) - off]
+
+    pcm = np.clip(audio / np.abs(audio).max() * 0.9 * 32767, -32768, 32767).astype(np.int16)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return clicks
+
+
+def run_self_test(config: ServoConfig, movement_path: str = "data/movement/simple_dance.json") -> bool:
+    """Click track sintetis -> tempo, posisi beat, warp movement, dan kecepatan analisa"""
+    ok = True
+    movement = load_movement(movement_path)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for bpm in (96, 128, 150):
+            path = os.path.join(directory, f"clicks_{bpm}.wav")
+            clicks = synthesize_clicks(path, bpm)
+            analysis = analyze_file(path, chunk_frames=4096)
+
+            errors = np.abs(analysis.beats[:, None] - clicks[None]).min(axis=1)
+            tempo_ok = abs(analysis.bpm - bpm) < 1.5
+            beats_ok = np.median(errors) < 0.025 and len(analysis.beats) >= 0.9 * len(clicks)
+            speed_ok = analysis.realtime_factor > 1
+
+            track = warp_movement(movement, analysis, config)
+            starts = np.unique(track.keyframes['t_ms']) + SERIAL_LEAD_MS
+            warp_ok = np.isin(starts, np.round(analysis.beats * 1000).astype(int)).all()
+
+            passed = tempo_ok and beats_ok and speed_ok and warp_ok
+            ok &= bool(passed)
+            print(f"   {'✓' if passed else '✗'} {bpm} BPM: terdeteksi {analysis.bpm:.1f} BPM, "
+                  f"{len(analysis.beats)}/{len(clicks)} beat, error median "
+                  f"{np.median(errors) * 1000:.1f} ms, {analysis.realtime_factor:.0f}x realtime, "
+                  f"{len(np.unique(track.keyframes['t_ms']))} step di beat")
+
+    print("✓ Self test lulus" if ok else "✗ Self test gagal")
+    return ok
+
+
+# Command line
+if __name__ == "__main__":
+    from python.serial_controller import HumanoidController
+
+    parser = argparse.ArgumentParser(description="Koreografi mengikuti beat musik")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    analyze = sub.add_parser("analyze", help="Tempo dan beat file WAV")
+    analyze.add_argument("wav")
+
+    for name, help_text in (("warp", "Movement JSON -> .rkf di beat"),
+                            ("play", "Putar musik + movement ke controller")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("wav")
+        command.add_argument("movement", help="data/movement/*.json")
+        command.add_argument("--loop", action="store_true", help="Ulang step sampai musik habis")
+        command.add_argument("--lead-ms", type=int, default=SERIAL_LEAD_MS)
+        command.add_argument("--beats-per-step", type=int)
+        if name == "warp":
+            command.add_argument("out", help="File .rkf")
+        else:
+            command.add_argument("--simulate", action="store_true")
+            command.add_argument("--motion-process", action="store_true")
+
+    sub.add_parser("selftest", help="Uji dengan click track sintetis")
+
+    args = parser.parse_args()
+    config = ServoConfig()
+
+    if args.command == "selftest":
+        raise SystemExit(0 if run_self_test(config) else 1)
+
+    analysis = analyze_file(args.wav)
+    print(f"🎵 {args.wav}: {analysis.bpm:.1f} BPM, {len(analysis.beats)} beat, "
+          f"{analysis.duration:.1f}s dianalisa dalam {analysis.elapsed * 1000:.0f} ms "
+          f"({analysis.realtime_factor:.0f}x realtime)")
+
+    if args.command == "analyze":
+        print("   Beat: " + " ".join(f"{beat:.2f}" for beat in analysis.beats[:16])
+              + (" ..." if len(analysis.beats) > 16 else ""))
+    else:
+        track = warp_movement(load_movement(args.movement), analysis, config,
+                              args.loop, args.lead_ms, args.beats_per_step)
+        print(f"💃 {track.name}: {len(track)} keyframe, {track.duration_ms / 1000:.1f}s")
+        if args.command == "warp":
+            track.save(args.out)
+            print(f"✓ Disimpan: {args.out}")
+        else:
+            robot = HumanoidController(simulate=args.simulate, motion_process=args.motion_process)
+            try:
+                play_with_music(robot, args.wav, track)
+            finally:
+                robot.close()
@@ -0,0 +1,117 @@
+"""
+bench_speech.py
+Benchmark pipeline speech tanpa Ollama, speaker, atau Arduino
+Mock Ollama + null audio sink + controller simulasi
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from typing import Dict, List
+
+from main import HumanoidRobot
+from python.mock_ollama import MockOllamaServer
+from python.tts_engine import NullAudioSink, SilentRenderer, SpeechEngine
+from python.turn_pipeline import StageMetrics
+
+PROMPTS = [
+    "Halo robot, siapa namamu?",
+    "Bisakah kamu melambaikan tangan?",
+    "Hore, kita berhasil menyelesaikan proyek ini!",
+    "Hmm, menurutmu apa yang harus kita lakukan besok?",
+    "Terima kasih atas bantuanmu hari ini.",
+]
+
+
+def run_benchmark(turns: int = 5,
+                  token_rate: float = 30.0,
+                  cold_start: float = 2.0,
+                  error_rate: float = 0.0,
+                  realtime_audio: bool = True) -> Dict[str, List[float]]:
+    """
+    Jalankan benchmark dan kembalikan sample latency per metrik (detik)
+
+    Metrik turn penuh (session.ask + speak_and_move):
+        ttft      : input -> token pertama dari Ollama
+        ttfa      : input -> audio mulai diputar
+        turn      : input -> speech dan gerakan selesai
+    Metrik per fungsi:
+        analyze_emotion, speak_with_emotion, generate_and_speak
+    """
+    metrics = StageMetrics()
+
+    with MockOllamaServer(token_rate=token_rate, cold_start=cold_start,
+                          error_rate=error_rate, seed=1) as server, \
+            tempfile.TemporaryDirectory() as cache_dir:
+
+        sink = NullAudioSink(realtime=realtime_audio)
+        engine = SpeechEngine(cache_dir=cache_dir, renderer=SilentRenderer(), player=sink)
+        robot = HumanoidRobot(ollama_url=server.url, simulate=True, speech_engine=engine)
+        # Turn pertama tidak boleh berjalan bersamaan dengan home pose startup
+        robot.wait_ready('movements', 'home')
+        speaker = robot.speaker
+        session = speaker.new_session()
+
+        for i in range(turns):
+            prompt = PROMPTS[i % len(PROMPTS)]
+            print(f"\n🧪 Turn {i + 1}/{turns}: {prompt}")
+
+            # Turn penuh seperti interactive_mode
+            first_token: List[float] = []
+            plays_before = len(sink.play_times)
+            start = time.time()
+
+            reply = session.ask(prompt, on_token=lambda _: first_token or
+                                first_token.append(time.time()))
+            robot.speak_and_move(reply or prompt)
+            end = time.time()
+
+            if first_token:
+                metrics.record("ttft", first_token[0] - start)
+            if len(sink.play_times) > plays_before:
+                metrics.record("ttfa", sink.play_times[plays_before] - start)
+            metrics.record("turn", end - start)
+
+            # Fungsi individual
+            t = time.time()
+            speaker.tts.analyze_emotion(prompt)
+            metrics.record("analyze_emotion", time.time() - t)
+
+            t = time.time()
+            speaker.speak_with_emotion(prompt)
+            metrics.record("speak_with_emotion", time.time() - t)
+
+            t = time.time()
+            speaker.generate_and_speak(prompt)
+            metrics.record("generate_and_speak", time.time() - t)
+
+        robot.controller.close()
+        engine.close()
+
+    metrics.report()
+    return metrics.samples
+
+
+# Test program
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark speech pipeline (offline)")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--token-rate", type=float, default=30.0)
+    parser.add_argument("--cold-start", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--fast-audio", action="store_true",
+                        help="Null sink tidak menunggu durasi audio")
+    parser.add_argument("--json", help="Simpan sample mentah ke file JSON")
+    args = parser.parse_args()
+
+    samples = run_benchmark(turns=args.turns,
+                            token_rate=args.token_rate,
+                            cold_start=args.cold_start,
+                            error_rate=args.error_rate,
+                            realtime_audio=not args.fast_audio)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(samples, f, indent=2)
+        print(f"\n✓ Hasil disimpan ke {args.json}")
@@ -0,0 +1,275 @@
+"""
+command_runner.py
+Runner non-interaktif: jalankan script command (/nod, /pose greeting, ...)
+dari file atau stdin, dengan repeat, assertion durasi, dan laporan ringkas
+untuk soak test tanpa operator
+
+Format script (satu command per baris, '#' di awal baris = komentar):
+    /nod
+    /pose greeting *5       -> ulang 5 kali
+    /wave <3000             -> gagal jika lebih dari 3000 ms
+    /pose home *10 <2500    -> keduanya
+    say Halo semuanya!      -> speak_and_move (butuh speech)
+    sleep 500               -> jeda 500 ms
+    repeat 100              -> blok sampai 'end' diulang 100 kali (boleh bersarang)
+      /nod
+    end
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Callable, Dict, IO, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+OPTION = re.compile(r'^(\*(\d+)|<(\d+)(ms)?)$')
+
+
+class ScriptError(ValueError):
+    """Baris script tidak valid"""
+
+
+class Step(NamedTuple):
+    command: str
+    repeat: int = 1
+    limit_ms: Optional[int] = None
+    line: int = 0
+
+
+class CommandStats:
+    """Durasi dan hasil satu jenis command"""
+
+    def __init__(self):
+        self.durations: List[float] = []
+        self.failed = 0
+        self.too_slow = 0
+
+    def record(self, duration: float, ok: bool, slow: bool):
+        self.durations.append(duration)
+        self.failed += not ok
+        self.too_slow += slow
+
+    def summary(self) -> Dict[str, float]:
+        ms = np.array(self.durations) * 1000
+        return {
+            'count': len(ms),
+            'failed': self.failed,
+            'too_slow': self.too_slow,
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'max_ms': float(ms.max()),
+        }
+
+
+def parse_step(text: str, line: int = 0) -> Step:
+    """'/pose home *10 <2500' -> Step('/pose home', 10, 2500)"""
+    tokens = text.split()
+    repeat, limit_ms = 1, None
+    while len(tokens) > 1:
+        match = OPTION.match(tokens[-1])
+        if not match:
+            break
+        if match.group(2):
+            repeat = int(match.group(2))
+        else:
+            limit_ms = int(match.group(3))
+        tokens.pop()
+    return Step(" ".join(tokens), repeat, limit_ms, line)
+
+
+def parse_script(lines: Iterator[str]) -> Iterator[Step]:
+    """
+    Ubah baris script menjadi Step secara streaming
+
+    Baris di luar blok repeat langsung di-yield (stdin bisa dipakai sebagai
+    stream tanpa menunggu EOF); isi blok repeat dikumpulkan sampai 'end'.
+    """
+    stack: List[tuple] = []   # (jumlah ulang, step di dalam blok)
+
+    for number, raw in enumerate(lines, 1):
+        text = raw.strip()
+        if not text or text.startswith('#'):
+            continue
+
+        keyword, _, rest = text.partition(' ')
+        if keyword == 'repeat':
+            if not rest.strip().isdigit():
+                raise ScriptError(f"Baris {number}: format 'repeat <jumlah>'")
+            stack.append((int(rest), []))
+            continue
+
+        if keyword == 'end':
+            if not stack:
+                raise ScriptError(f"Baris {number}: 'end' tanpa 'repeat'")
+            count, body = stack.pop()
+            steps = body * count
+            if stack:
+                stack[-1][1].extend(steps)
+            else:
+                yield from steps
+            continue
+
+        step = parse_step(text, number)
+        if stack:
+            stack[-1][1].append(step)
+        else:
+            yield step
+
+    if stack:
+        raise ScriptError("Blok 'repeat' tidak ditutup 'end'")
+
+
+class CommandRunner:
+    """
+    Eksekusi Step ke HumanoidRobot.run_command (tabel dispatch main.py)
+
+    Command tidak dikenal dan command yang gagal dicatat, tidak menghentikan
+    run kecuali stop_on_fail.
+    """
+
+    def __init__(self, robot, stop_on_fail: bool = False):
+        self.robot = robot
+        self.stop_on_fail = stop_on_fail
+        self.stats: Dict[str, CommandStats] = {}
+        self.unknown: Dict[str, int] = {}
+        self.executed = 0
+        self.elapsed = 0.0
+
+        # Command bawaan runner (selain command khusus robot)
+        self.builtins: Dict[str, Callable[[str], bool]] = {
+            'sleep': self._sleep,
+            'say': self._say,
+        }
+
+    def _sleep(self, arg: str) -> bool:
+        time.sleep(int(arg) / 1000)
+        return True
+
+    def _say(self, arg: str) -> bool:
+        self.robot.speak_and_move(arg)
+        return True
+
+    def _execute(self, command: str) -> Optional[bool]:
+        keyword, _, arg = command.partition(' ')
+        builtin = self.builtins.get(keyword)
+        if builtin is not None:
+            return builtin(arg.strip())
+        return self.robot.run_command(command)
+
+    def run(self, steps: Iterator[Step]) -> bool:
+        """Jalankan semua step; True jika tidak ada kegagalan"""
+        start = time.monotonic()
+        try:
+            for step in steps:
+                for _ in range(step.repeat):
+                    t0 = time.monotonic()
+                    try:
+                        ok = self._execute(step.command)
+                    except Exception as e:
+                        print(f"✗ Baris {step.line} '{step.command}': {e}")
+                        ok = False
+                    duration = time.monotonic() - t0
+
+                    if ok is None:
+                        self.unknown[step.command] = self.unknown.get(step.command, 0) + 1
+                        print(f"✗ Baris {step.line}: command tidak dikenal '{step.command}'")
+                        if self.stop_on_fail:
+                            return False
+                        break
+
+                    slow = step.limit_ms is not None and duration * 1000 > step.limit_ms
+                    if slow:
+                        print(f"⚠ Baris {step.line} '{step.command}': {duration * 1000:.0f} ms "
+                              f"> {step.limit_ms} ms")
+                    self.stats.setdefault(step.command, CommandStats()).record(duration, bool(ok), slow)
+                    self.executed += 1
+
+                    if self.stop_on_fail and (not ok or slow):
+                        return False
+        except KeyboardInterrupt:
+            print("\n⏹ Run dihentikan")
+            return False
+        finally:
+            self.elapsed = time.monotonic() - start
+
+        return self.passed
+
+    @property
+    def passed(self) -> bool:
+        return not self.unknown and all(
+            stats.failed == 0 and stats.too_slow == 0 for stats in self.stats.values())
+
+    def summary(self) -> Dict:
+        return {
+            'executed': self.executed,
+            'elapsed_s': round(self.elapsed, 3),
+            'passed': self.passed,
+            'unknown': self.unknown,
+            'commands': {command: stats.summary() for command, stats in self.stats.items()},
+        }
+
+    def report(self):
+        print("\n" + "=" * 78)
+        print(f"📋 Command runner: {self.executed} command dalam {self.elapsed:.1f}s")
+        print("=" * 78)
+        print(f"{'command':<28} {'n':>6} {'gagal':>6} {'lambat':>6} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for command, stats in self.stats.items():
+            row = stats.summary()
+            print(f"{command[:28]:<28} {row['count']:>6} {row['failed']:>6} {row['too_slow']:>6} "
+                  f"{row['p50_ms']:>8.0f} {row['p95_ms']:>8.0f} {row['max_ms']:>8.0f}")
+        for command, count in self.unknown.items():
+            print(f"{command[:28]:<28} {count:>6} tidak dikenal")
+        print("\n" + ("✓ PASS" if self.passed else "✗ FAIL"))
+
+
+def open_script(path: str) -> IO[str]:
+    """'-' = stdin"""
+    return sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Opsi runner, dipakai juga oleh main.py --run"""
+    parser.add_argument("--stop-on-fail", action="store_true",
+                        help="Berhenti di kegagalan/assertion pertama")
+    parser.add_argument("--report", help="Simpan ringkasan JSON ke file ini")
+
+
+def run_script(robot, path: str, stop_on_fail: bool = False,
+               report_path: Optional[str] = None) -> bool:
+    """Jalankan script command lalu cetak (dan simpan) laporan"""
+    runner = CommandRunner(robot, stop_on_fail=stop_on_fail)
+    source = open_script(path)
+    try:
+        runner.run(parse_script(source))
+    except ScriptError as e:
+        print(f"✗ Script tidak valid: {e}")
+        return False
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    runner.report()
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(runner.summary(), f, indent=2)
+        print(f"📝 Laporan disimpan: {report_path}")
+    return runner.passed
+
+
+# Test program: parsing saja (eksekusi lewat main.py --run)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tampilkan step hasil parsing script command")
+    parser.add_argument("script", help="File script atau '-' untuk stdin")
+    args = parser.parse_args()
+
+    with open_script(args.script) as source:
+        steps = list(parse_script(source))
+
+    for step in steps:
+        limit = f" < {step.limit_ms} ms" if step.limit_ms is not None else ""
+        print(f"  {step.line:>4}: {step.command} x{step.repeat}{limit}")
+    print(f"\n{len(steps)} step, {sum(step.repeat for step in steps)} eksekusi")
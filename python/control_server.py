@@ -0,0 +1,533 @@
+"""
+control_server.py
+Server TCP (JSON per baris) untuk mengontrol robot dari banyak client sekaligus
+UI, script behaviour, dan console operator bisa terhubung bersamaan
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from python import tracing
+from python.gestures import GestureError
+from python.motion_arbiter import POLICIES
+from python.movement import RobotMovements
+from python.serial_controller import HumanoidController
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_LINE = 64 * 1024          # Batas panjang satu request (byte)
+MAX_INFLIGHT = 64             # Request pipelined per client yang dieksekusi bersamaan
+MOVE_DEFAULTS = (('time', 800), ('delay', 0))   # Default timing move dan moves (ms)
+
+
+class RequestError(Exception):
+    """Request tidak valid; dikirim balik ke client sebagai error"""
+
+
+def _is_int(value) -> bool:
+    """int JSON (bool bukan integer)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _arbitration(request: Dict) -> Dict:
+    """policy dan priority request untuk MotionArbiter.submit"""
+    policy = request.get('policy')
+    if policy is not None and policy not in POLICIES:
+        raise RequestError(f"policy harus salah satu dari {', '.join(POLICIES)}")
+    priority = request.get('priority', 0)
+    if not _is_int(priority):
+        raise RequestError("priority harus integer")
+    return {'policy': policy, 'priority': priority}
+
+
+class TokenBucket:
+    """Rate limiter: `rate` request/detik dengan burst maksimal `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> float:
+        """Ambil token; mengembalikan 0 jika boleh, atau detik sampai boleh"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class ControlServer:
+    """
+    Protocol: satu JSON object per baris, response juga satu per baris
+
+        {"id": 1, "op": "pose", "name": "greeting"}
+        {"id": 1, "ok": true, "result": true}
+
+    Request boleh dikirim berturut-turut tanpa menunggu response (pipelining);
+    response dikirim begitu selesai dan dicocokkan lewat "id". Gerakan dari
+    client berbeda diatur oleh MotionArbiter sehingga tidak saling tabrak.
+
+    Op:
+        ping                              - cek koneksi
+        move   part, position, time, delay - satu servo
+        moves  moves: [{part, position, time, delay}, ...]
+        pose   name                       - pose dari poses.json
+        gesture name, args, policy, priority
+        batch  requests: [...], parallel  - banyak request, satu response
+        stop / home                       - emergency stop / stop lalu home
+        list_poses / list_gestures / status
+        metrics                           - metric tracing (format Prometheus)
+
+    move/moves/pose/gesture menerima policy (queue/preempt/reject) dan
+    priority (integer); time/delay move default 800/0 ms.
+    """
+
+    def __init__(self, controller: HumanoidController,
+                 movements: Optional[RobotMovements] = None,
+                 host: str = DEFAULT_HOST,
+                 port: int = DEFAULT_PORT,
+                 rate: float = 50.0,
+                 burst: float = 100.0,
+                 workers: int = 16):
+        self.controller = controller
+        self.movements = movements or RobotMovements(controller)
+        self.arbiter = self.movements.arbiter
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.burst = burst
+
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="control")
+        self.clients: Dict[int, str] = {}
+        self.request_count = 0
+        self.rejected_count = 0
+
+        self._client_ids = itertools.count(1)
+        self._server: Optional[asyncio.base_events.Server] = None
+
+        self.handlers = {
+            'ping': self._op_ping,
+            'move': self._op_move,
+            'moves': self._op_moves,
+            'pose': self._op_pose,
+            'gesture': self._op_gesture,
+            'batch': self._op_batch,
+            'stop': self._op_stop,
+            'home': self._op_home,
+            'list_poses': self._op_list_poses,
+            'list_gestures': self._op_list_gestures,
+            'status': self._op_status,
+            'metrics': self._op_metrics,
+        }
+
+    # ---------- Lifecycle ----------
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, limit=MAX_LINE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"🌐 Control server di {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    # ---------- Koneksi ----------
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client_id = next(self._client_ids)
+        peer = writer.get_extra_info('peername')
+        self.clients[client_id] = f"{peer[0]}:{peer[1]}" if peer else "?"
+        print(f"🔌 Client {client_id} terhubung ({self.clients[client_id]})")
+
+        bucket = TokenBucket(self.rate, self.burst)
+        inflight = asyncio.Semaphore(MAX_INFLIGHT)
+        tasks = set()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await self._write(writer, {'id': None, 'ok': False, 'error': 'request terlalu panjang'})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                await inflight.acquire()
+                task = asyncio.create_task(self._serve_line(line, bucket, writer))
+                tasks.add(task)
+                task.add_done_callback(lambda t: (tasks.discard(t), inflight.release()))
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            del self.clients[client_id]
+            writer.close()
+            print(f"🔌 Client {client_id} terputus")
+
+    async def _serve_line(self, line: bytes, bucket: TokenBucket, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError
+        except ValueError:
+            await self._write(writer, {'id': None, 'ok': False, 'error': 'JSON tidak valid'})
+            return
+
+        request_id = request.get('id')
+        # Batch dihitung per sub-request supaya tidak bisa dipakai melewati limit
+        cost = 1
+        if request.get('op') == 'batch' and isinstance(request.get('requests'), list):
+            cost = max(1, len(request['requests']))
+
+        retry_after = bucket.take(cost)
+        if retry_after:
+            self.rejected_count += 1
+            await self._write(writer, {'id': request_id, 'ok': False, 'error': 'rate_limited',
+                                 'retry_after': round(retry_after, 3)})
+            return
+
+        await self._write(writer, dict(await self._execute(request), id=request_id))
+
+    async def _write(self, writer: asyncio.StreamWriter, response: Dict):
+        if writer.is_closing():
+            return
+        writer.write((json.dumps(response) + "\n").encode('utf-8'))
+        # Client yang lambat membaca menahan request berikutnya, bukan buffer server
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _execute(self, request: Dict) -> Dict:
+        self.request_count += 1
+        handler = self.handlers.get(request.get('op'))
+
+        if handler is None:
+            return {'ok': False, 'error': f"op tidak dikenal: {request.get('op')}"}
+
+        try:
+            return {'ok': True, 'result': await handler(request)}
+        except RequestError as e:
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            print(f"✗ Request {request.get('op')} error: {e}")
+            return {'ok': False, 'error': f"internal: {e}"}
+
+    async def _blocking(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+
+    # ---------- Op ----------
+    async def _op_ping(self, request: Dict):
+        return time.time()
+
+    def _parse_moves(self, moves) -> List[Dict]:
+        if not isinstance(moves, list) or not moves:
+            raise RequestError("moves harus list yang tidak kosong")
+
+        parsed = []
+        for index, move in enumerate(moves):
+            if not isinstance(move, dict):
+                raise RequestError(f"moves[{index}] harus object")
+            part = move.get('part')
+            servo = self.controller.config.get_servo_info(part) if isinstance(part, str) else None
+            if not servo:
+                raise RequestError(f"part tidak dikenal: {part}")
+            position = move.get('position')
+            if not _is_int(position) or not self.controller.config.validate_position(part, position):
+                raise RequestError(f"position di luar range untuk {part}")
+            timing = {key: move.get(key, default) for key, default in MOVE_DEFAULTS}
+            for key, value in timing.items():
+                if not _is_int(value) or value < 0:
+                    raise RequestError(f"moves[{index}].{key} harus integer >= 0")
+            parsed.append({
+                'part': part,
+                'controller': servo['controller'],
+                'channel': servo['channel'],
+                'position': position,
+                'time': timing['time'],
+                'delay': timing['delay'],
+            })
+        return parsed
+
+    async def _run_moves(self, moves: List[Dict], request: Dict):
+        groups = self.arbiter.groups_for_parts(m['part'] for m in moves)
+        handle = self.arbiter.submit("moves", groups, self.controller.move_multiple, moves,
+                                     **_arbitration(request))
+        await self._blocking(handle.wait)
+        return handle.status == "done" and bool(handle.result)
+
+    async def _op_move(self, request: Dict):
+        move = {k: request[k] for k in ('part', 'position', 'time', 'delay') if k in request}
+        return await self._run_moves(self._parse_moves([move]), request)
+
+    async def _op_moves(self, request: Dict):
+        return await self._run_moves(self._parse_moves(request.get('moves')), request)
+
+    async def _op_pose(self, request: Dict):
+        name = request.get('name')
+        groups = self.arbiter.groups_for_pose(name)
+        if not groups:
+            raise RequestError(f"pose tidak dikenal: {name}")
+
+        handle = self.movements.start_pose(name, **_arbitration(request))
+        await self._blocking(handle.wait)
+        return handle.status == "done" and bool(handle.result)
+
+    async def _op_gesture(self, request: Dict):
+        name = request.get('name')
+        if name not in self._gesture_names():
+            raise RequestError(f"gesture tidak dikenal: {name}")
+
+        args = request.get('args') or {}
+        if not isinstance(args, dict):
+            raise RequestError("args harus object")
+
+        arbitration = _arbitration(request)
+        try:
+            handle = self.movements.start(name, **arbitration, **args)
+        except GestureError as e:
+            raise RequestError(str(e))
+        await self._blocking(handle.wait)
+        return handle.status
+
+    async def _op_batch(self, request: Dict):
+        requests = request.get('requests')
+        if not isinstance(requests, list):
+            raise RequestError("requests harus list")
+        for index, sub in enumerate(requests):
+            if not isinstance(sub, dict) or not isinstance(sub.get('op'), str):
+                raise RequestError(f"requests[{index}] harus object dengan op string")
+            if sub['op'] == 'batch':
+                raise RequestError("batch tidak boleh bersarang")
+
+        if request.get('parallel'):
+            return list(await asyncio.gather(*(self._execute(r) for r in requests)))
+
+        results = []
+        for sub in requests:
+            result = await self._execute(sub)
+            results.append(result)
+            if not result['ok'] and request.get('stop_on_error', True):
+                break
+        return results
+
+    async def _op_stop(self, request: Dict):
+        def stop():
+            self.arbiter.cancel_all()
+            results = self.controller.emergency_stop()
+            self.arbiter.wait_idle(timeout=2)
+            self.controller.resume_motion()
+            return results
+
+        return await self._blocking(stop)
+
+    async def _op_home(self, request: Dict):
+        def home():
+            self.arbiter.cancel_all()
+            return self.controller.home_now()
+
+        return await self._blocking(home)
+
+    async def _op_list_poses(self, request: Dict):
+        return self.controller.config.list_poses()
+
+    def _gesture_names(self) -> List[str]:
+        return self.movements.gesture_names()
+
+    async def _op_list_gestures(self, request: Dict):
+        return self._gesture_names()
+
+    async def _op_status(self, request: Dict):
+        return {
+            'clients': len(self.clients),
+            'active': self.arbiter.active(),
+            'requests': self.request_count,
+            'rate_limited': self.rejected_count,
+        }
+
+    async def _op_metrics(self, request: Dict):
+        return tracing.render_prometheus()
+
+
+class ControlClient:
+    """Client async dengan pipelining: banyak request in-flight di satu koneksi"""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> "ControlClient":
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, limit=MAX_LINE)
+        self._reader_task = asyncio.create_task(self._read_responses())
+        return self
+
+    def send(self, op: str, **params) -> asyncio.Future:
+        """Kirim request tanpa menunggu; await future untuk response"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        self.writer.write((json.dumps(dict(params, id=request_id, op=op)) + "\n").encode('utf-8'))
+        return future
+
+    async def request(self, op: str, **params) -> Dict:
+        future = self.send(op, **params)
+        await self.writer.drain()
+        return await future
+
+    async def _read_responses(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self._pending.pop(response.get('id'), None)
+            if future and not future.done():
+                future.set_result(response)
+
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Koneksi ke server terputus"))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        if self._reader_task:
+            await self._reader_task
+
+
+# ---------- Load test ----------
+async def _load_client(host: str, port: int, requests: int, depth: int,
+                       op: str, params: Dict, latencies: List[float], stats: Counter):
+    client = await ControlClient(host, port).connect()
+    window = asyncio.Semaphore(depth)
+
+    async def one():
+        async with window:
+            start = time.perf_counter()
+            response = await client.send(op, **params)
+            latencies.append(time.perf_counter() - start)
+            stats['ok' if response['ok'] else response.get('error', 'error')] += 1
+
+    tasks = [asyncio.create_task(one()) for _ in range(requests)]
+    await client.writer.drain()
+    await asyncio.gather(*tasks)
+    await client.close()
+
+
+async def run_load_test(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                        clients: int = 4, requests: int = 500, depth: int = 16,
+                        op: str = "ping", params: Optional[Dict] = None) -> Dict:
+    """
+    Banyak client loopback mengirim request pipelined ke server
+
+    Returns:
+        Dict dengan throughput (req/s), p50/p99 latency (ms), dan jumlah per status
+    """
+    latencies: List[float] = []
+    stats: Counter = Counter()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _load_client(host, port, requests, depth, op, params or {}, latencies, stats)
+        for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    result = {
+        'requests': len(ordered),
+        'throughput': len(ordered) / elapsed,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        'status': dict(stats),
+    }
+
+    print(f"\n📊 Load test: {clients} client x {requests} '{op}' (depth {depth})")
+    print(f"   throughput : {result['throughput']:.0f} req/s")
+    print(f"   latency    : p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    print(f"   status     : {dict(stats)}")
+    return result
+
+
+# Jalankan server atau load test
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Control server robot humanoid")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="Jalankan server")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--rate", type=float, default=50.0, help="Request/detik per client")
+    serve.add_argument("--burst", type=float, default=100.0)
+    serve.add_argument("--simulate", action="store_true", help="Tanpa Arduino")
+
+    load = sub.add_parser("load", help="Load test loopback")
+    load.add_argument("--host", default=DEFAULT_HOST)
+    load.add_argument("--port", type=int, default=0,
+                      help="Port server (0 = jalankan server simulasi sendiri)")
+    load.add_argument("--clients", type=int, default=4)
+    load.add_argument("--requests", type=int, default=500)
+    load.add_argument("--depth", type=int, default=16)
+    load.add_argument("--op", default="ping")
+    load.add_argument("--params", default="{}", help="Parameter op (JSON)")
+    load.add_argument("--rate", type=float, default=1e6,
+                      help="Rate limit server simulasi (req/detik per client)")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        controller = HumanoidController(simulate=args.simulate)
+        server = ControlServer(controller, host=args.host, port=args.port,
+                               rate=args.rate, burst=args.burst)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            print("\n👋 Server dihentikan")
+        finally:
+            controller.close()
+
+    else:
+        async def main():
+            params = json.loads(args.params)
+            if args.port:
+                return await run_load_test(args.host, args.port, args.clients,
+                                           args.requests, args.depth, args.op, params)
+
+            controller = HumanoidController(simulate=True)
+            server = ControlServer(controller, port=0, rate=args.rate, burst=args.rate)
+            await server.start()
+            try:
+                return await run_load_test(server.host, server.port, args.clients,
+                                           args.requests, args.depth, args.op, params)
+            finally:
+                await server.close()
+                controller.close()
+
+        asyncio.run(main())
@@ -0,0 +1,457 @@
+"""
+fleet.py
+Supervisor untuk banyak robot humanoid identik dari satu process
+I/O serial dibagi ke beberapa worker process; pose/koreografi disinkronkan
+dengan jam bersama (time.monotonic)
+"""
+
+import argparse
+import copy
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from python.serial_controller import HumanoidController
+from python.servo_config import ServoConfig
+
+DEFAULT_FLEET_CONFIG = "./config/fleet.json"
+DEFAULT_LEAD = 0.5   # Jeda antara broadcast dan t=0 koreografi (detik)
+
+
+def load_fleet_config(path: str = DEFAULT_FLEET_CONFIG) -> Dict:
+    """Load daftar robot dari fleet.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def simulated_fleet(count: int, time_scale: float = 1.0) -> Dict:
+    """Config fleet berisi `count` robot simulasi"""
+    return {
+        'settings': {'sim_time_scale': time_scale},
+        'robots': [{
+            'name': f"sim{i + 1}",
+            'controller_A': {'port': f"SIM{i + 1}A"},
+            'controller_B': {'port': f"SIM{i + 1}B"},
+        } for i in range(count)],
+    }
+
+
+def robot_serial_config(base: Dict, robot: Dict, settings: Optional[Dict] = None) -> Dict:
+    """serial_config.json dengan override port/baudrate untuk satu robot"""
+    merged = copy.deepcopy(base)
+    for controller in ('controller_A', 'controller_B'):
+        merged[controller].update(robot.get(controller, {}))
+    merged.setdefault('settings', {}).update(settings or {})
+    return merged
+
+
+class ResponseCache:
+    """
+    Cache respon Ollama yang dipakai bersama semua robot (memory + disk)
+
+    Opsi generate (temperature dll.) ikut masuk key. Respon sampling
+    (temperature > 0) tidak di-cache kecuali cache_sampled=True, supaya
+    jawaban acak pertama tidak dipakai ulang selamanya.
+    """
+
+    def __init__(self, cache_dir: str = "./data/llm_cache", cache_sampled: bool = False):
+        self.cache_dir = cache_dir
+        self.cache_sampled = cache_sampled
+        self._memory: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, options: Optional[Dict] = None) -> str:
+        opts = json.dumps(options or {}, sort_keys=True)
+        return hashlib.sha256(f"{model}\0{prompt}\0{opts}".encode('utf-8')).hexdigest()
+
+    def cacheable(self, options: Optional[Dict] = None) -> bool:
+        """Respon deterministik (temperature 0) selalu boleh di-cache"""
+        return self.cache_sampled or (options or {}).get('temperature', 0) == 0
+
+    def get_or_generate(self, model: str, prompt: str, generate,
+                        options: Optional[Dict] = None) -> Optional[str]:
+        if not self.cacheable(options):
+            self.misses += 1
+            return generate(prompt)
+
+        key = self.make_key(model, prompt, options)
+        path = os.path.join(self.cache_dir, f"{key}.json")
+
+        with self._lock:
+            if key in self._memory:
+                self.hits += 1
+                return self._memory[key]
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                text = json.load(f)['response']
+            with self._lock:
+                self._memory[key] = text
+                self.hits += 1
+            return text
+
+        self.misses += 1
+        text = generate(prompt)
+        if text:
+            with self._lock:
+                self._memory[key] = text
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'model': model, 'prompt': prompt, 'options': options or {},
+                           'response': text}, f)
+        return text
+
+
+def _wait_until(target: float, cancel: threading.Event) -> bool:
+    """Tidur sampai `target` (time.monotonic), 1 ms terakhir di-busy-wait"""
+    remaining = target - time.monotonic()
+    if remaining > 0.001 and cancel.wait(remaining - 0.001):
+        return False
+    while time.monotonic() < target:
+        pass
+    return not cancel.is_set()
+
+
+def _run_choreography(controller: HumanoidController, steps: List[Dict], start_at: float,
+                      cancel: threading.Event) -> Dict:
+    """Jalankan koreografi satu robot; catat selisih mulai tiap step terhadap jam bersama"""
+    result = {'ok': True, 'skew': [], 'commands': 0}
+
+    for step in steps:
+        target = start_at + step.get('t', 0.0)
+        if not _wait_until(target, cancel):
+            result['ok'] = False
+            break
+        result['skew'].append(time.monotonic() - target)
+
+        pose = controller.config.get_pose(step['pose'])
+        if pose:
+            steps_in_pose = pose['sequence'] if 'sequence' in pose else [pose]
+            result['commands'] += sum(len(s['servos']) for s in steps_in_pose)
+
+        if not controller.execute_pose(step['pose']):
+            result['ok'] = False
+            break
+
+    result['finished'] = time.monotonic()
+    return result
+
+
+def _worker_main(worker_id: int, robots: List[Dict], settings: Dict, simulate: bool,
+                 quiet: bool, inbox, outbox):
+    """Worker process: memegang port serial beberapa robot"""
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')
+
+    base = ServoConfig()
+    controllers: Dict[str, HumanoidController] = {}
+    for robot in robots:
+        config = copy.copy(base)
+        config.serial_config = robot_serial_config(base.serial_config, robot, settings)
+        controllers[robot['name']] = HumanoidController(simulate=simulate, config=config)
+
+    outbox.put(('ready', worker_id, list(controllers)))
+    running: List[threading.Event] = []   # Cancel event koreografi yang sedang jalan
+
+    def choreography(job_id: int, names: Optional[List[str]], steps: List[Dict], start_at: float):
+        targets = [n for n in controllers if names is None or n in names]
+        results: Dict[str, Dict] = {}
+        cancel = threading.Event()
+        running.append(cancel)
+
+        def run(name):
+            results[name] = _run_choreography(controllers[name], steps, start_at, cancel)
+
+        threads = [threading.Thread(target=run, args=(n,), daemon=True) for n in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        running.remove(cancel)
+        outbox.put(('result', job_id, results))
+
+    while True:
+        message = inbox.get()
+        op = message[0]
+
+        if op == 'choreography':
+            # Thread terpisah supaya 'stop' tetap bisa diterima selama koreografi
+            threading.Thread(target=choreography, args=message[1:], daemon=True).start()
+        elif op == 'stop':
+            for cancel in list(running):
+                cancel.set()
+            results = {}
+            for name, controller in controllers.items():
+                results[name] = controller.emergency_stop()
+                controller.resume_motion()
+            outbox.put(('result', message[1], results))
+        elif op == 'shutdown':
+            break
+
+    for controller in controllers.values():
+        controller.close()
+
+
+class Fleet:
+    """
+    Supervisor fleet: N robot dibagi ke beberapa worker process
+
+    Args:
+        fleet_config: Dict dari fleet.json (robots + settings)
+        workers: Jumlah worker process (default: min(jumlah robot, CPU))
+        simulate: Pakai controller simulasi
+        quiet: Sembunyikan output per-servo dari worker
+    """
+
+    def __init__(self, fleet_config: Dict, workers: Optional[int] = None,
+                 simulate: bool = False, quiet: bool = True):
+        self.robots: List[Dict] = fleet_config['robots']
+        self.settings: Dict = fleet_config.get('settings', {})
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.robots)))
+        self.simulate = simulate
+        self.quiet = quiet
+
+        ctx = mp.get_context("spawn")
+        self._outbox = ctx.Queue()
+        self._inboxes = [ctx.Queue() for _ in range(self.workers)]
+        self._processes = [
+            ctx.Process(target=_worker_main,
+                        args=(i, self.robots[i::self.workers], self.settings,
+                              simulate, quiet, self._inboxes[i], self._outbox),
+                        name=f"fleet-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+
+        self._job_ids = itertools.count(1)
+        self._jobs: Dict[int, Dict] = {}
+        self._cond = threading.Condition()
+        self._collector: Optional[threading.Thread] = None
+
+        # Dipakai bersama semua robot (dibuat saat pertama dibutuhkan)
+        self.responses = ResponseCache(
+            cache_sampled=bool(self.settings.get('cache_sampled_replies', False)))
+        self._speaker = None
+
+    # ---------- Lifecycle ----------
+    def start(self, timeout: float = 30.0) -> "Fleet":
+        print(f"\n🚀 Menjalankan fleet: {len(self.robots)} robot, {self.workers} worker")
+        for process in self._processes:
+            process.start()
+
+        ready = 0
+        deadline = time.monotonic() + timeout
+        while ready < self.workers:
+            kind, worker_id, names = self._outbox.get(timeout=max(0.1, deadline - time.monotonic()))
+            if kind == 'ready':
+                ready += 1
+                print(f"   ✓ Worker {worker_id}: {', '.join(names)}")
+
+        self._collector = threading.Thread(target=self._collect, name="fleet-results", daemon=True)
+        self._collector.start()
+        return self
+
+    def close(self):
+        for inbox in self._inboxes:
+            inbox.put(('shutdown',))
+        for process in self._processes:
+            process.join(timeout=5)
+        self._outbox.put(('closed', 0, None))
+        if self._collector:
+            self._collector.join(timeout=1)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _collect(self):
+        while True:
+            kind, job_id, results = self._outbox.get()
+            if kind == 'closed':
+                return
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job['results'].update(results)
+                    job['pending'] -= 1
+                    self._cond.notify_all()
+
+    def _broadcast(self, message: tuple, timeout: Optional[float]) -> Dict[str, Dict]:
+        job_id = next(self._job_ids)
+        with self._cond:
+            self._jobs[job_id] = {'results': {}, 'pending': self.workers}
+
+        for inbox in self._inboxes:
+            inbox.put((message[0], job_id) + message[1:])
+
+        with self._cond:
+            self._cond.wait_for(lambda: self._jobs[job_id]['pending'] == 0, timeout)
+            return self._jobs.pop(job_id)['results']
+
+    # ---------- Gerakan ----------
+    def choreography(self, steps: List[Dict], robots: Optional[List[str]] = None,
+                     lead: float = DEFAULT_LEAD, timeout: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Jalankan koreografi serentak di semua robot
+
+        Args:
+            steps: List of {'t': detik dari start, 'pose': nama pose}
+            robots: Nama robot (None = semua)
+            lead: Jeda sebelum t=0 agar semua worker sempat menerima broadcast
+
+        Returns:
+            Dict nama robot -> {ok, skew (detik per step), commands, finished}
+        """
+        start_at = time.monotonic() + lead
+        results = self._broadcast(('choreography', robots, steps, start_at), timeout)
+        for result in results.values():
+            result['started_at'] = start_at
+        return results
+
+    def broadcast_pose(self, pose_name: str, robots: Optional[List[str]] = None,
+                       lead: float = DEFAULT_LEAD) -> Dict[str, Dict]:
+        """Semua robot mulai pose yang sama pada saat yang sama"""
+        return self.choreography([{'t': 0.0, 'pose': pose_name}], robots, lead)
+
+    def stop(self) -> Dict[str, Dict]:
+        """Emergency stop semua robot"""
+        return self._broadcast(('stop',), timeout=5)
+
+    # ---------- Speech (cache bersama) ----------
+    @property
+    def speaker(self):
+        if self._speaker is None:
+            from python.tts_ollama import OllamaTTS
+            self._speaker = OllamaTTS()
+        return self._speaker
+
+    def ask(self, prompt: str, temperature: float = 0.7) -> Optional[str]:
+        """
+        Respon Ollama untuk prompt. Dengan temperature 0 (atau cache_sampled)
+        prompt yang sama cukup di-generate sekali
+        """
+        return self.responses.get_or_generate(
+            self.speaker.model, prompt,
+            lambda p: self.speaker.generate_speech_response(p, temperature=temperature),
+            options={'temperature': temperature})
+
+    def say(self, text: str) -> bool:
+        """Ucapkan text; WAV diambil dari cache TTS bersama"""
+        return self.speaker.speak(text)
+
+
+def summarize(results: Dict[str, Dict]) -> Dict[str, float]:
+    """Ringkasan hasil koreografi: skew maksimum, durasi, throughput command"""
+    if not results:
+        # Tidak ada robot yang mengirim hasil (fleet kosong / semua gagal)
+        return {'robots': 0, 'ok': 0, 'max_skew_ms': 0.0, 'duration': 0.0,
+                'commands_per_s': 0.0}
+
+    skews = [abs(s) for r in results.values() for s in r['skew']]
+    start = min(r['started_at'] for r in results.values())
+    end = max(r['finished'] for r in results.values())
+    commands = sum(r['commands'] for r in results.values())
+
+    return {
+        'robots': len(results),
+        'ok': sum(1 for r in results.values() if r['ok']),
+        'max_skew_ms': max(skews) * 1000 if skews else 0.0,
+        'duration': end - start,
+        'commands_per_s': commands / (end - start) if end > start else 0.0,
+    }
+
+
+def run_scaling_benchmark(counts: List[int] = (1, 2, 4, 8, 16),
+                          workers: Optional[int] = None,
+                          pose: str = "attention",
+                          time_scale: float = 0.2) -> List[Dict]:
+    """
+    Ukur skew dan throughput broadcast pose saat jumlah robot simulasi bertambah
+    """
+    rows = []
+    for count in counts:
+        with Fleet(simulated_fleet(count, time_scale), workers=workers, simulate=True) as fleet:
+            results = fleet.broadcast_pose(pose)
+            row = dict(summarize(results), workers=fleet.workers)
+        rows.append(row)
+
+    print(f"\n{'robots':>7}{'workers':>9}{'ok':>5}{'durasi':>9}{'cmd/s':>9}{'skew max':>11}")
+    for row in rows:
+        print(f"{row['robots']:>7}{row['workers']:>9}{row['ok']:>5}{row['duration']:>8.2f}s"
+              f"{row['commands_per_s']:>9.1f}{row['max_skew_ms']:>9.2f}ms")
+    return rows
+
+
+def _console(fleet: Fleet):
+    """Console operator fleet"""
+    print("\nCommand: pose <nama> | choreo <file.json> | stop | say <text> | ask <prompt> | quit")
+    while True:
+        try:
+            line = input("\nfleet> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            fleet.stop()
+            break
+
+        command, _, arg = line.partition(' ')
+        if command == 'quit':
+            break
+        elif command == 'pose' and arg:
+            print(summarize(fleet.broadcast_pose(arg)))
+        elif command == 'choreo' and arg:
+            try:
+                with open(arg, 'r', encoding='utf-8') as f:
+                    steps = json.load(f)['steps']
+            except (OSError, json.JSONDecodeError, KeyError) as e:
+                print(f"✗ Gagal load koreografi {arg}: {e!r}")
+                continue
+            print(summarize(fleet.choreography(steps)))
+        elif command == 'stop':
+            fleet.stop()
+        elif command == 'say' and arg:
+            fleet.say(arg)
+        elif command == 'ask' and arg:
+            reply = fleet.ask(arg)
+            print(f"🤖 {reply}")
+            if reply:
+                fleet.say(reply)
+        elif line:
+            print("✗ Command tidak dikenal")
+
+
+# Jalankan fleet atau benchmark
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fleet controller robot humanoid")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Console operator fleet")
+    run.add_argument("--config", default=DEFAULT_FLEET_CONFIG)
+    run.add_argument("--workers", type=int)
+    run.add_argument("--simulate", action="store_true")
+    run.add_argument("--verbose", action="store_true", help="Tampilkan output worker")
+
+    bench = sub.add_parser("bench", help="Benchmark scaling dengan robot simulasi")
+    bench.add_argument("--counts", default="1,2,4,8,16")
+    bench.add_argument("--workers", type=int)
+    bench.add_argument("--pose", default="attention")
+    bench.add_argument("--time-scale", type=float, default=0.2)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        with Fleet(load_fleet_config(args.config), workers=args.workers,
+                   simulate=args.simulate, quiet=not args.verbose) as fleet:
+            _console(fleet)
+    else:
+        run_scaling_benchmark([int(c) for c in args.counts.split(',')],
+                              workers=args.workers, pose=args.pose,
+                              time_scale=args.time_scale)
@@ -0,0 +1,231 @@
+"""
+frame_protocol.py
+Protocol binary opsional antara SerialController dan firmware RobotCore:
+frame ber-length, sequence number, beberapa gerakan servo per frame, dan
+CRC-16, dengan NAK untuk kirim ulang frame yang rusak saja
+
+Frame:
+    SOF(0xA5) | length | seq | type | payload[length] | CRC-16 (LE)
+
+CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) dihitung atas
+length..payload. Firmware tetap menerima ASCII; frame dikenali dari byte
+SOF di awal baris, dan command yang datang sebagai frame dijawab dengan frame.
+"""
+
+import argparse
+import binascii
+import struct
+import time
+from typing import Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+SOF = 0xA5
+HEADER = struct.Struct("<BBBB")     # SOF, length, seq, type
+CRC = struct.Struct("<H")
+OVERHEAD = HEADER.size + CRC.size
+MAX_PAYLOAD = 64
+
+# Satu gerakan: channel, posisi, T, D
+MOVE = struct.Struct("<BHHH")
+MAX_MOVES = 8                       # Sama dengan antrian firmware (Engine QUEUE)
+
+# Host -> firmware
+FRAME_MOVES = 0x01
+FRAME_STOP = 0x02
+FRAME_QUERY = 0x03
+FRAME_RESEND = 0x04                 # Minta jawaban seq ini dikirim ulang (jawaban rusak)
+
+# Firmware -> host
+FRAME_ACK = 0x81                    # Frame diterima utuh, gerakan masuk antrian
+FRAME_NAK = 0x82                    # CRC/format salah, kirim ulang frame
+FRAME_DONE = 0x83                   # Payload: status (0 = OK, 1 = tanpa OK servo controller)
+FRAME_STOPPED = 0x84
+FRAME_POS = 0x85                    # Payload: millis u32 + posisi u16 per channel
+FRAME_ERROR = 0x86                  # Payload: kode error
+
+ERRORS = {
+    1: "Queue full",
+    2: "Position must be 500-2500",
+    3: "Channel out of range",
+    4: "Invalid frame",
+}
+
+# Frame host dianggap hilang jika ACK tidak datang dalam waktu kirim + ini
+ACK_GRACE = 0.03
+# Inter-byte gap yang mereset parser firmware (frame terpotong)
+FRAME_GAP = 0.01
+
+
+class Frame(NamedTuple):
+    seq: int
+    kind: int
+    payload: bytes
+    ok: bool = True
+
+
+def crc16(data: bytes) -> int:
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(seq: int, kind: int, payload: bytes = b"") -> bytes:
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"Payload {len(payload)} byte > {MAX_PAYLOAD}")
+    body = bytes((len(payload), seq & 0xFF, kind)) + payload
+    return bytes((SOF,)) + body + CRC.pack(crc16(body))
+
+
+def pack_moves(moves: Iterable[Tuple[int, int, int, int]]) -> bytes:
+    """[(channel, posisi, T, D), ...] -> payload FRAME_MOVES"""
+    return b"".join(MOVE.pack(*move) for move in moves)
+
+
+def unpack_moves(payload: bytes) -> List[Tuple[int, int, int, int]]:
+    if not payload or len(payload) % MOVE.size:
+        raise ValueError("Payload gerakan tidak valid")
+    return list(MOVE.iter_unpack(payload))
+
+
+def unpack_positions(payload: bytes) -> Tuple[int, np.ndarray]:
+    """Payload FRAME_POS -> (millis firmware, posisi per channel)"""
+    millis = struct.unpack_from("<I", payload)[0]
+    return millis, np.frombuffer(payload, dtype='<u2', offset=4).astype(np.uint16)
+
+
+class FrameDecoder:
+    """
+    Pemecah stream byte menjadi Frame
+
+    Byte di luar frame (baris debug ASCII) dilewati. Frame dengan CRC salah
+    dilaporkan sebagai Frame(ok=False) lalu pencarian SOF dilanjutkan dari
+    byte setelah SOF yang rusak, jadi frame utuh berikutnya tetap terbaca.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.crc_errors = 0
+        self.skipped = 0
+
+    def feed(self, data: bytes) -> List[Frame]:
+        self._buffer += data
+        frames = []
+
+        while True:
+            start = self._buffer.find(SOF)
+            if start < 0:
+                self.skipped += len(self._buffer)
+                self._buffer.clear()
+                return frames
+            if start:
+                self.skipped += start
+                del self._buffer[:start]
+
+            if len(self._buffer) < HEADER.size:
+                return frames
+            _, length, seq, kind = HEADER.unpack_from(self._buffer)
+            if length > MAX_PAYLOAD:
+                # Bukan frame (atau length rusak): cari SOF berikutnya
+                self.crc_errors += 1
+                del self._buffer[:1]
+                frames.append(Frame(seq, kind, b"", ok=False))
+                continue
+
+            end = HEADER.size + length + CRC.size
+            if len(self._buffer) < end:
+                return frames
+
+            body = bytes(self._buffer[1:HEADER.size + length])
+            if CRC.unpack_from(self._buffer, end - CRC.size)[0] == crc16(body):
+                frames.append(Frame(seq, kind, body[3:]))
+                del self._buffer[:end]
+            else:
+                self.crc_errors += 1
+                frames.append(Frame(seq, kind, b"", ok=False))
+                del self._buffer[:1]
+
+    def reset(self):
+        self._buffer.clear()
+
+
+# ---------- Perbandingan throughput ----------
+def ascii_bytes(channel: int, position: int, time_ms: int, delay_ms: int) -> int:
+    return len(f"#{channel}P{position}T{time_ms}D{delay_ms}\n")
+
+
+def wire_report(baudrates: Tuple[int, ...] = (9600, 115200)):
+    """Byte per gerakan dan gerakan/detik (hanya waktu kirim) ASCII vs frame"""
+    moves = [(ch, pos, 800, 300) for ch in range(1, 25) for pos in (700, 1500, 2200)]
+    ascii_tx = float(np.mean([ascii_bytes(*move) for move in moves]))
+    # Jawaban per command: "[A] TX: ...", "[A] OK received", "[A] DONE" (CRLF)
+    ascii_rx = float(np.mean([len(f"[A] TX: #{c}P{p}T{t}D{d}\r\n") for c, p, t, d in moves])
+                     ) + len("[A] OK received\r\n") + len("[A] DONE\r\n")
+    single = OVERHEAD + MOVE.size
+    batch = (OVERHEAD + MAX_MOVES * MOVE.size) / MAX_MOVES
+    reply = 2 * OVERHEAD + 1            # ACK + DONE(status)
+
+    print("\n📦 Byte per gerakan (host -> firmware / firmware -> host)")
+    print(f"   ASCII          : {ascii_tx:5.1f} / {ascii_rx:5.1f}")
+    print(f"   Frame 1 gerak  : {single:5.1f} / {reply:5.1f}")
+    print(f"   Frame {MAX_MOVES} gerak  : {batch:5.1f} / {reply / MAX_MOVES:5.1f}")
+    for baud in baudrates:
+        rate = baud / 10
+        print(f"   @ {baud:>6} baud: ASCII {rate / ascii_tx:6.0f} gerak/s, "
+              f"frame {rate / single:6.0f}, frame x{MAX_MOVES} {rate / batch:6.0f} gerak/s")
+
+
+def run_link_benchmark(moves: int = 200, baudrate: int = 9600, corrupt_rate: float = 0.0):
+    """
+    Ukur gerakan/detik lewat SerialController + SimulatedSerial yang
+    memodelkan waktu kirim per byte pada `baudrate`, ASCII vs binary
+    (per command dan batch send_multiple), opsional dengan byte rusak
+    """
+    from python.serial_controller import SerialController
+    from python.servo_config import ServoConfig
+
+    results = {}
+    for protocol, batched in (('ascii', False), ('binary', False), ('binary', True)):
+        config = ServoConfig()
+        config.serial_config['settings'].update(
+            {'sim_line_rate': True, 'sim_corrupt_rate': corrupt_rate})
+        for name in ('controller_A', 'controller_B'):
+            config.serial_config[name]['baudrate'] = baudrate
+
+        serial = SerialController(config, simulate=True, protocol=protocol)
+        commands = [{'controller': 'A', 'channel': 1 + i % 24, 'position': 1000 + i % 1000,
+                     'time': 0, 'delay': 0} for i in range(moves)]
+        try:
+            start = time.perf_counter()
+            if batched:
+                ok = sum(len(batch) for batch in (commands[i:i + MAX_MOVES]
+                                                  for i in range(0, moves, MAX_MOVES))
+                         if serial.send_batch(batch))
+            else:
+                ok = sum(serial.send_command('A', c['channel'], c['position'], 0, 0)
+                         for c in commands)
+            elapsed = time.perf_counter() - start
+            link = serial.links['controller_A']
+            label = f"{protocol}{' batch' if batched else ''}"
+            results[label] = moves / elapsed
+            print(f"   {label:<13} {moves / elapsed:7.1f} gerak/s, {ok}/{moves} sukses, "
+                  f"retransmit {getattr(link, 'retransmits', 0)}, "
+                  f"CRC error {getattr(link, 'crc_errors', 0)}")
+        finally:
+            serial.close_all()
+    return results
+
+
+# Command line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perbandingan protocol ASCII vs frame binary")
+    parser.add_argument("--moves", type=int, default=200)
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--corrupt", type=float, default=0.02,
+                        help="Probabilitas byte rusak per write/jawaban untuk run kedua")
+    args = parser.parse_args()
+
+    wire_report()
+    print(f"\n⏱ SimulatedSerial @ {args.baud} baud, T=0 D=0:")
+    run_link_benchmark(args.moves, args.baud)
+    if args.corrupt:
+        print(f"\n⏱ Dengan {args.corrupt:.0%} write/jawaban rusak:")
+        run_link_benchmark(args.moves, args.baud, args.corrupt)
@@ -0,0 +1,280 @@
+"""
+gestures.py
+Compiler gesture deklaratif (config/gestures.json) menjadi motion plan
+yang sudah divalidasi dan di-encode, di-cache per kombinasi parameter
+"""
+
+import ast
+import argparse
+import operator
+import threading
+from typing import Any, Dict, List, NamedTuple, Set, Tuple
+
+from python.servo_config import ServoConfig
+
+MIN_POSITION = 500
+MAX_POSITION = 2500
+MAX_TIME_MS = 65535
+
+
+class GestureError(ValueError):
+    """Definisi gesture atau parameternya tidak valid"""
+
+
+class PlannedCommand(NamedTuple):
+    """Satu command servo yang siap dikirim apa adanya"""
+    part: str
+    controller: str
+    channel: int
+    position: int
+    time: int
+    delay: int
+    data: bytes      # b"#<ch>P<pos>T<time>D<delay>\n"
+    timeout: float   # Sama dengan SerialController.submit_command
+
+
+class PlanStep(NamedTuple):
+    commands: Tuple[PlannedCommand, ...]
+    wait: float      # Detik menunggu setelah command terakhir (gerakan selesai)
+
+
+class MotionPlan(NamedTuple):
+    name: str
+    label: str
+    params: Tuple[Tuple[str, Any], ...]
+    steps: Tuple[PlanStep, ...]
+    groups: frozenset
+
+    @property
+    def duration(self) -> float:
+        """Perkiraan durasi (detik): T+D tiap command ditambah wait tiap step"""
+        return sum(sum(c.time + c.delay for c in step.commands) / 1000 + step.wait
+                   for step in self.steps)
+
+    @property
+    def targets(self) -> Dict[str, int]:
+        """Posisi akhir tiap part setelah plan selesai"""
+        return {c.part: c.position for step in self.steps for c in step.commands}
+
+
+# ---------- Ekspresi ----------
+_BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+}
+_UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_COMPARE = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+    ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+
+
+def evaluate(expression: Any, env: Dict[str, Any]) -> Any:
+    """
+    Evaluasi nilai di gestures.json: angka apa adanya, string sebagai ekspresi
+    aritmatika sederhana atas parameter (contoh "1500 - amplitude",
+    "1 if hand == 'right' else -1"). Tidak ada akses ke fungsi/atribut Python.
+    """
+    if not isinstance(expression, str):
+        return expression
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise GestureError(f"Ekspresi tidak valid: {expression!r}") from e
+    return _eval_node(tree.body, env, expression)
+
+
+def _eval_node(node: ast.AST, env: Dict[str, Any], source: str) -> Any:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in env:
+            raise GestureError(f"Parameter '{node.id}' tidak dikenal di {source!r}")
+        return env[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        return _BINARY[type(node.op)](_eval_node(node.left, env, source),
+                                      _eval_node(node.right, env, source))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        return _UNARY[type(node.op)](_eval_node(node.operand, env, source))
+    if isinstance(node, ast.IfExp):
+        branch = node.body if _eval_node(node.test, env, source) else node.orelse
+        return _eval_node(branch, env, source)
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _COMPARE:
+        return _COMPARE[type(node.ops[0])](_eval_node(node.left, env, source),
+                                           _eval_node(node.comparators[0], env, source))
+    raise GestureError(f"Ekspresi tidak didukung: {source!r}")
+
+
+# ---------- Compiler ----------
+class GestureLibrary:
+    """
+    Definisi gesture dari ServoConfig + cache motion plan
+
+    plan(name, **params) mengembalikan MotionPlan yang sama untuk parameter
+    yang sama (setelah digabung dengan default), jadi eksekusi berikutnya
+    tidak lagi mengevaluasi ekspresi, mencari servo, atau memvalidasi posisi.
+    """
+
+    def __init__(self, config: ServoConfig):
+        self.config = config
+        self._plans: Dict[Tuple, MotionPlan] = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        return self.config.list_gestures()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.config.gestures
+
+    def param_names(self, name: str) -> List[str]:
+        """Urutan parameter (untuk memetakan argumen positional)"""
+        definition = self.config.get_gesture(name) or {}
+        return list(definition.get('params', {}))
+
+    def plan(self, name: str, *args, **params) -> MotionPlan:
+        definition = self.config.get_gesture(name)
+        if definition is None:
+            raise GestureError(f"Gesture '{name}' tidak ditemukan")
+
+        resolved = self._resolve_params(name, definition, args, params)
+        key = (name, tuple(sorted(resolved.items())))
+
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._compile(name, definition, resolved)
+            with self._lock:
+                plan = self._plans.setdefault(key, plan)
+        return plan
+
+    def clear_cache(self):
+        with self._lock:
+            self._plans.clear()
+
+    @property
+    def cached(self) -> int:
+        return len(self._plans)
+
+    def _resolve_params(self, name: str, definition: Dict, args: tuple,
+                        params: Dict[str, Any]) -> Dict[str, Any]:
+        defaults = definition.get('params', {})
+        resolved = dict(defaults)
+
+        if len(args) > len(defaults):
+            raise GestureError(f"Terlalu banyak argumen untuk gesture '{name}'")
+        resolved.update(zip(defaults, args))
+
+        for key, value in params.items():
+            if key not in defaults:
+                raise GestureError(f"Parameter '{key}' tidak dikenal untuk gesture '{name}'")
+            resolved[key] = value
+
+        for key, choices in definition.get('choices', {}).items():
+            if resolved.get(key) not in choices:
+                raise GestureError(f"{name}: {key} harus salah satu dari {choices}")
+
+        return resolved
+
+    def _compile(self, name: str, definition: Dict, params: Dict[str, Any]) -> MotionPlan:
+        env = dict(params)
+        for key, expression in definition.get('derived', {}).items():
+            env[key] = evaluate(expression, env)
+
+        steps: List[PlanStep] = []
+        self._compile_steps(name, definition.get('steps', []), env, steps)
+        if not steps:
+            raise GestureError(f"Gesture '{name}' tidak punya step")
+
+        groups: Set[str] = {c.part.split('.')[0] for step in steps for c in step.commands}
+        return MotionPlan(name, definition.get('name', name), tuple(sorted(params.items())),
+                          tuple(steps), frozenset(groups))
+
+    def _compile_steps(self, name: str, steps: List[Dict], env: Dict[str, Any],
+                       out: List[PlanStep]):
+        for step in steps:
+            if 'repeat' in step:
+                count = evaluate(step['repeat'], env)
+                if not isinstance(count, int) or count < 0:
+                    raise GestureError(f"{name}: repeat harus bilangan bulat >= 0, bukan {count!r}")
+                for _ in range(count):
+                    self._compile_steps(name, step.get('steps', []), env, out)
+                continue
+
+            time_ms = self._as_ms(name, evaluate(step.get('time', 800), env))
+            delay_ms = self._as_ms(name, evaluate(step.get('delay', 300), env))
+            wait = float(evaluate(step.get('wait', 0), env))
+
+            commands = []
+            for part_template, value in step.get('moves', {}).items():
+                part = part_template.format(**env)
+                if isinstance(value, dict):
+                    position = evaluate(value['position'], env)
+                    move_time = self._as_ms(name, evaluate(value.get('time', time_ms), env))
+                    move_delay = self._as_ms(name, evaluate(value.get('delay', delay_ms), env))
+                else:
+                    position, move_time, move_delay = evaluate(value, env), time_ms, delay_ms
+                commands.append(self._encode(name, part, position, move_time, move_delay))
+
+            out.append(PlanStep(tuple(commands), wait))
+
+    def _encode(self, name: str, part: str, position: Any,
+                time_ms: int, delay_ms: int) -> PlannedCommand:
+        info = self.config.servo_mapping.get(part.split('.')[0], {}).get(part.partition('.')[2])
+        if info is None:
+            raise GestureError(f"{name}: servo part '{part}' tidak ditemukan")
+
+        position = int(round(position))
+        low = max(info.get('min', MIN_POSITION), MIN_POSITION)
+        high = min(info.get('max', MAX_POSITION), MAX_POSITION)
+        if not low <= position <= high:
+            raise GestureError(f"{name}: posisi {position} di luar range {low}-{high} untuk {part}")
+
+        channel = info['channel']
+        data = f"#{channel}P{position}T{time_ms}D{delay_ms}\n".encode('utf-8')
+        timeout = (time_ms + delay_ms) / 1000 + 2
+        return PlannedCommand(part, info['controller'], channel, position,
+                              time_ms, delay_ms, data, timeout)
+
+    @staticmethod
+    def _as_ms(name: str, value: Any) -> int:
+        value = int(round(value))
+        if not 0 <= value <= MAX_TIME_MS:
+            raise GestureError(f"{name}: waktu {value} ms di luar range 0-{MAX_TIME_MS}")
+        return value
+
+
+# Test program
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description="Compile dan tampilkan motion plan gesture")
+    parser.add_argument("gesture", nargs="?", help="Kosong = validasi semua gesture")
+    parser.add_argument("params", nargs="*", help="key=value, contoh hand=left times=2")
+    args = parser.parse_args()
+
+    library = GestureLibrary(ServoConfig())
+
+    if args.gesture is None:
+        for name in library.names():
+            plan = library.plan(name)
+            commands = sum(len(step.commands) for step in plan.steps)
+            print(f"✓ {name:<12} {commands:>3} command, ~{plan.duration:.1f}s, "
+                  f"grup {sorted(plan.groups)}")
+    else:
+        params = {}
+        for item in args.params:
+            key, _, value = item.partition('=')
+            params[key] = int(value) if value.lstrip('-').isdigit() else value
+
+        start = time.perf_counter()
+        plan = library.plan(args.gesture, **params)
+        compiled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        library.plan(args.gesture, **params)
+        cached = time.perf_counter() - start
+
+        print(f"{plan.label} {dict(plan.params)}: ~{plan.duration:.2f}s, grup {sorted(plan.groups)}")
+        for i, step in enumerate(plan.steps, 1):
+            encoded = " ".join(c.data.decode().strip() for c in step.commands)
+            print(f"  {i:>2}. {encoded}  wait {step.wait:g}s")
+        print(f"\ncompile {compiled * 1e6:.0f} us, dari cache {cached * 1e6:.1f} us")
@@ -0,0 +1,442 @@
+"""
+keyframes.py
+Format keyframe binary (.rkf) untuk koreografi panjang: array fixed-width
+(timestamp, servo id, posisi) yang dibaca lewat mmap/NumPy tanpa copy,
+konverter dari/ke JSON movement & pose, dan player ke encoder frame serial
+"""
+
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from python import tracing
+from python.motion_process import FRAME_DTYPE, KIND_MOVE
+from python.serial_controller import PRIORITY_NORMAL, SerialController
+from python.servo_config import ServoConfig
+
+MAGIC = b"RKFM"
+VERSION = 1
+
+# Header: magic, versi, jumlah servo, jumlah keyframe, durasi (ms), nama
+HEADER = struct.Struct("<4sHHII48s")
+
+# Tabel servo: index di tabel ini = servo id di keyframe
+SERVO_DTYPE = np.dtype([
+    ('part', 'S32'),        # Path di servo_mapping, contoh b"head.pan"
+    ('controller', 'u1'),   # ord('A') / ord('B')
+    ('channel', 'u1'),
+    ('reserved', '<u2'),
+])
+
+KEYFRAME_DTYPE = np.dtype([
+    ('t_ms', '<u4'),        # Waktu kirim relatif ke awal track
+    ('servo', '<u2'),       # Index ke tabel servo
+    ('position', '<u2'),
+    ('time_ms', '<u2'),     # T: durasi gerakan
+    ('delay_ms', '<u2'),    # D: delay setelah gerakan
+])
+
+DATA_ALIGN = 8
+DEFAULT_POSE_DELAY = 300    # Sama dengan default execute_pose untuk pose single-step
+
+
+class KeyframeTrack:
+    """
+    Satu koreografi: tabel servo + array keyframe terurut menurut t_ms
+
+    Track dari KeyframeTrack.open() memegang np.memmap read-only; baris
+    keyframe baru dibaca dari disk saat diakses.
+    """
+
+    def __init__(self, name: str, servos: np.ndarray, keyframes: np.ndarray,
+                 path: Optional[str] = None):
+        self.name = name
+        self.servos = servos
+        self.keyframes = keyframes
+        self.path = path
+
+    def __len__(self) -> int:
+        return len(self.keyframes)
+
+    @property
+    def duration_ms(self) -> int:
+        if not len(self.keyframes):
+            return 0
+        last = self.keyframes[-1]
+        return int(last['t_ms']) + int(last['time_ms']) + int(last['delay_ms'])
+
+    @property
+    def parts(self) -> List[str]:
+        return [part.decode('ascii') for part in self.servos['part']]
+
+    # ---------- File ----------
+    @classmethod
+    def open(cls, path: str) -> "KeyframeTrack":
+        """Buka file .rkf; keyframe di-mmap tanpa copy"""
+        with open(path, 'rb') as f:
+            magic, version, servo_count, count, _, name = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Bukan file keyframe yang valid: {path}")
+            servos = np.fromfile(f, dtype=SERVO_DTYPE, count=servo_count)
+
+        offset = _data_offset(servo_count)
+        if count:
+            keyframes = np.memmap(path, dtype=KEYFRAME_DTYPE, mode='r',
+                                  offset=offset, shape=(count,))
+        else:
+            keyframes = np.zeros(0, dtype=KEYFRAME_DTYPE)
+
+        return cls(name.rstrip(b"\0").decode('utf-8'), servos, keyframes, path)
+
+    def save(self, path: str):
+        header = HEADER.pack(MAGIC, VERSION, len(self.servos), len(self.keyframes),
+                             self.duration_ms, self.name.encode('utf-8')[:48])
+        padding = _data_offset(len(self.servos)) - len(header) - self.servos.nbytes
+
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(self.servos.tobytes())
+            f.write(b"\0" * padding)
+            f.write(np.ascontiguousarray(self.keyframes, dtype=KEYFRAME_DTYPE).tobytes())
+        self.path = path
+
+    # ---------- Konversi JSON ----------
+    @classmethod
+    def from_rows(cls, name: str, rows: List[tuple], config: ServoConfig) -> "KeyframeTrack":
+        """
+        Args:
+            rows: List of (t_ms, part, position, time_ms, delay_ms)
+
+        Raises:
+            ValueError: Row dengan part yang tidak ada di servo_mapping
+        """
+        index: Dict[str, int] = {}
+        servos = []
+        keyframes = []
+
+        for row, (t_ms, part, position, time_ms, delay_ms) in enumerate(rows):
+            if part not in index:
+                info = config.get_servo_info(part)
+                if info is None:
+                    raise ValueError(f"Keyframe '{name}' baris {row} (t={t_ms} ms): "
+                                     f"part tidak dikenal '{part}'")
+                index[part] = len(servos)
+                servos.append((part.encode('ascii'), ord(info['controller']),
+                               info['channel'], 0))
+            keyframes.append((t_ms, index[part], position, time_ms, delay_ms))
+
+        keyframes = np.array(keyframes, dtype=KEYFRAME_DTYPE)
+        keyframes = keyframes[np.argsort(keyframes['t_ms'], kind='stable')]
+        return cls(name, np.array(servos, dtype=SERVO_DTYPE), keyframes)
+
+    @classmethod
+    def from_movement(cls, movement: Dict, config: ServoConfig) -> "KeyframeTrack":
+        """Dari format data/movement/*.json: step berurutan, tiap step `time` ms"""
+        rows = []
+        t_ms = 0
+        for step in movement['steps']:
+            for servo in step['servos']:
+                rows.append((t_ms, servo['part'], servo['position'],
+                             servo.get('time', step['time']), servo.get('delay', 0)))
+            t_ms += step['time']
+        return cls.from_rows(movement.get('name', ''), rows, config)
+
+    @classmethod
+    def from_pose(cls, pose: Dict, config: ServoConfig) -> "KeyframeTrack":
+        """Dari pose di poses.json (single-step atau `sequence`)"""
+        rows = []
+        if 'sequence' in pose:
+            t_ms = 0
+            for step in pose['sequence']:
+                for servo in step['servos']:
+                    rows.append((t_ms, servo['part'], servo['position'],
+                                 servo.get('time', 800), 0))
+                t_ms += max(s.get('time', 800) for s in step['servos']) + step.get('delay', 0)
+        else:
+            for servo in pose['servos']:
+                rows.append((0, servo['part'], servo['position'], servo.get('time', 800),
+                             servo.get('delay', DEFAULT_POSE_DELAY)))
+        return cls.from_rows(pose.get('name', ''), rows, config)
+
+    def to_movement(self) -> Dict:
+        """Ke format data/movement/*.json; keyframe dengan t_ms sama menjadi satu step"""
+        parts = self.parts
+        times, starts = np.unique(self.keyframes['t_ms'], return_index=True)
+        bounds = list(starts) + [len(self.keyframes)]
+
+        steps = []
+        for i, t_ms in enumerate(times):
+            rows = self.keyframes[bounds[i]:bounds[i + 1]]
+            if i + 1 < len(times):
+                step_time = int(times[i + 1] - t_ms)
+            else:
+                step_time = int(rows['time_ms'].max())
+
+            servos = []
+            for row in rows:
+                servo = {'part': parts[row['servo']], 'position': int(row['position'])}
+                if int(row['time_ms']) != step_time:
+                    servo['time'] = int(row['time_ms'])
+                if row['delay_ms']:
+                    servo['delay'] = int(row['delay_ms'])
+                servos.append(servo)
+
+            steps.append({'step': i + 1, 'name': f"Keyframe {i + 1}",
+                          'time': step_time, 'servos': servos})
+
+        return {'movement': {
+            'name': self.name,
+            'description': "Dikonversi dari keyframe binary",
+            'duration': round(self.duration_ms / 1000),
+            'steps': steps,
+        }}
+
+    # ---------- Encoder ----------
+    def encode_frames(self, start: int, stop: int, start_at: float, speed: float = 1.0,
+                      priority: int = PRIORITY_NORMAL) -> np.ndarray:
+        """Keyframe [start:stop] -> FRAME_DTYPE dengan t_due absolut (time.monotonic)"""
+        rows = self.keyframes[start:stop]
+        frames = np.zeros(len(rows), dtype=FRAME_DTYPE)
+        frames['kind'] = KIND_MOVE
+        frames['controller'] = self.servos['controller'][rows['servo']]
+        frames['channel'] = self.servos['channel'][rows['servo']]
+        frames['priority'] = priority
+        frames['position'] = rows['position']
+        frames['time_ms'] = rows['time_ms'] / speed
+        frames['delay_ms'] = rows['delay_ms'] / speed
+        frames['t_due'] = start_at + rows['t_ms'] / (1000 * speed)
+        return frames
+
+
+def _data_offset(servo_count: int) -> int:
+    end = HEADER.size + servo_count * SERVO_DTYPE.itemsize
+    return (end + DATA_ALIGN - 1) // DATA_ALIGN * DATA_ALIGN
+
+
+def load_json_track(path: str, config: ServoConfig, pose: Optional[str] = None) -> KeyframeTrack:
+    """Baca movement JSON, atau satu pose dari poses.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if 'movement' in data:
+        return KeyframeTrack.from_movement(data['movement'], config)
+
+    poses = data.get('poses', {})
+    if pose not in poses:
+        raise ValueError(f"Pose '{pose}' tidak ada di {path}")
+    return KeyframeTrack.from_pose(poses[pose], config)
+
+
+class KeyframePlayer:
+    """
+    Putar KeyframeTrack ke SerialController
+
+    Keyframe dibaca per jendela `lookahead` dari mmap dan langsung di-encode
+    ke FRAME_DTYPE. Dengan motion process, frame ditulis ke ring shared memory
+    (scheduler di sana mengirim tepat waktu); tanpa motion process, frame
+    dikirim dari thread ini lewat submit_command tanpa menunggu DONE.
+    Firmware tetap memproses satu command per controller, jadi keyframe yang
+    bertumpuk di controller yang sama akan antri.
+    """
+
+    def __init__(self, serial: SerialController, lookahead: float = 0.5):
+        self.serial = serial
+        self.lookahead = lookahead
+
+    def play(self, track: KeyframeTrack, speed: float = 1.0,
+             priority: int = PRIORITY_NORMAL,
+             cancel: Optional[threading.Event] = None) -> Dict[str, int]:
+        """
+        Returns:
+            Dict jumlah keyframe terkirim, sukses, dan gagal
+        """
+        process = getattr(self.serial, 'process', None)
+        result = {'sent': 0, 'ok': 0, 'failed': 0}
+        times = track.keyframes['t_ms']
+        window_ms = int(self.lookahead * 1000 * speed)
+        start_at = time.monotonic() + 0.05
+
+        tracing.log("info", f"▶ Keyframe '{track.name}': {len(track)} frame, "
+                            f"{track.duration_ms / 1000:.1f}s ({speed:g}x)")
+
+        with tracing.span("keyframes.play", track=track.name, frames=len(track)):
+            pending = []
+            last_ticket = None
+            index = 0
+
+            while index < len(track):
+                if (cancel is not None and cancel.is_set()) or self.serial.is_aborted(priority):
+                    tracing.log("info", f"⏹ Keyframe '{track.name}' dihentikan")
+                    break
+
+                # Jendela berikutnya: semua keyframe sampai t pertama + lookahead
+                end = int(np.searchsorted(times, int(times[index]) + window_ms, side='left'))
+                end = max(end, index + 1)
+                frames = track.encode_frames(index, end, start_at, speed, priority)
+
+                # Tunggu sampai jendela ini hampir jatuh tempo
+                remaining = frames['t_due'][0] - self.lookahead - time.monotonic()
+                if remaining > 0:
+                    self.serial.abort_event.wait(remaining)
+
+                if process is not None:
+                    last_ticket = process.submit_frames(frames)
+                    result['sent'] += len(frames)
+                else:
+                    submitted, sent = self._send_direct(frames, priority, result)
+                    pending = self._collect(pending + submitted, result)
+                    result['sent'] += sent
+
+                index = end
+
+            if last_ticket is not None:
+                # Ring hanya melaporkan frame terakhir; ok berarti stream selesai
+                ok = last_ticket.wait(track.duration_ms / 1000 / speed + 5)
+                result['ok' if ok else 'failed'] += result['sent']
+            for cmd in pending:
+                result['ok' if cmd.wait() else 'failed'] += 1
+
+        tracing.log("info", f"✓ Keyframe selesai: {result}")
+        return result
+
+    def _send_direct(self, frames: np.ndarray, priority: int,
+                     result: Dict[str, int]) -> Tuple[list, int]:
+        """
+        Returns:
+            (command yang masih berjalan, jumlah frame yang benar-benar dikirim;
+             kurang dari len(frames) jika dihentikan abort)
+        """
+        submitted = []
+        sent = 0
+        for frame in frames:
+            remaining = frame['t_due'] - time.monotonic()
+            if remaining > 0 and self.serial.abort_event.wait(remaining):
+                break
+            sent += 1
+            pending = self.serial.submit_command(
+                chr(frame['controller']), int(frame['channel']), int(frame['position']),
+                int(frame['time_ms']), int(frame['delay_ms']), priority)
+            if pending is None:
+                result['failed'] += 1
+            else:
+                submitted.append(pending)
+        return submitted, sent
+
+    @staticmethod
+    def _collect(pending: list, result: Dict[str, int]) -> list:
+        """Hitung command yang sudah selesai agar list tidak tumbuh sepanjang track"""
+        still_running = []
+        for cmd in pending:
+            if cmd.done:
+                result['ok' if cmd.success else 'failed'] += 1
+            else:
+                still_running.append(cmd)
+        return still_running
+
+
+def synthesize(config: ServoConfig, seconds: float = 300, rate: float = 50) -> KeyframeTrack:
+    """Koreografi sintetis (sinus di semua servo) untuk benchmark format"""
+    rows = []
+    parts = [f"{category}.{servo}" for category, servos in config.servo_mapping.items()
+             for servo in servos]
+    period_ms = int(1000 / rate)
+    for i, part in enumerate(parts):
+        info = config.get_servo_info(part)
+        center, span = info['center'], (info['max'] - info['min']) / 4
+        for t_ms in range(0, int(seconds * 1000), period_ms):
+            position = int(center + span * np.sin(2 * np.pi * 0.25 * t_ms / 1000 + i))
+            rows.append((t_ms, part, position, period_ms, 0))
+    return KeyframeTrack.from_rows("synthetic", rows, config)
+
+
+def run_format_benchmark(config: ServoConfig, seconds: float = 300, rate: float = 50,
+                         directory: str = "/tmp"):
+    """Bandingkan ukuran dan waktu buka JSON vs .rkf untuk koreografi panjang"""
+    track = synthesize(config, seconds, rate)
+    json_path = os.path.join(directory, "keyframes_bench.json")
+    rkf_path = os.path.join(directory, "keyframes_bench.rkf")
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(track.to_movement(), f)
+    track.save(rkf_path)
+
+    start = time.perf_counter()
+    load_json_track(json_path, config)
+    json_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    opened = KeyframeTrack.open(rkf_path)
+    checksum = int(opened.keyframes['position'].sum())
+    rkf_seconds = time.perf_counter() - start
+
+    print(f"\n{len(track)} keyframe ({seconds:g}s @ {rate:g} Hz, {len(track.servos)} servo)")
+    print(f"   JSON : {os.path.getsize(json_path) / 1e6:7.2f} MB, buka {json_seconds * 1000:8.1f} ms")
+    print(f"   .rkf : {os.path.getsize(rkf_path) / 1e6:7.2f} MB, buka {rkf_seconds * 1000:8.1f} ms "
+          f"(checksum {checksum})")
+
+
+# Tooling command line
+if __name__ == "__main__":
+    from python.serial_controller import HumanoidController
+
+    parser = argparse.ArgumentParser(description="Konversi dan putar keyframe binary")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    encode = sub.add_parser("encode", help="JSON movement/pose -> .rkf")
+    encode.add_argument("json_path")
+    encode.add_argument("out")
+    encode.add_argument("--pose", help="Nama pose jika json_path adalah poses.json")
+
+    decode = sub.add_parser("decode", help=".rkf -> JSON movement")
+    decode.add_argument("path")
+    decode.add_argument("out")
+
+    info = sub.add_parser("info", help="Ringkasan file .rkf")
+    info.add_argument("path")
+
+    play = sub.add_parser("play", help="Putar .rkf ke controller")
+    play.add_argument("path")
+    play.add_argument("--simulate", action="store_true")
+    play.add_argument("--motion-process", action="store_true")
+    play.add_argument("--speed", type=float, default=1.0)
+
+    bench = sub.add_parser("bench", help="Ukuran dan waktu buka JSON vs .rkf")
+    bench.add_argument("--seconds", type=float, default=300)
+    bench.add_argument("--rate", type=float, default=50)
+
+    args = parser.parse_args()
+
+    if args.command == "encode":
+        track = load_json_track(args.json_path, ServoConfig(), args.pose)
+        track.save(args.out)
+        print(f"✓ {len(track)} keyframe, {len(track.servos)} servo -> {args.out}")
+
+    elif args.command == "decode":
+        track = KeyframeTrack.open(args.path)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(track.to_movement(), f, indent=2, ensure_ascii=False)
+        print(f"✓ {len(track)} keyframe -> {args.out}")
+
+    elif args.command == "info":
+        track = KeyframeTrack.open(args.path)
+        print(f"📼 {track.name}: {len(track)} keyframe, {track.duration_ms / 1000:.2f}s")
+        for servo_id, servo in enumerate(track.servos):
+            count = int(np.count_nonzero(track.keyframes['servo'] == servo_id))
+            print(f"   {servo_id:>3} {servo['part'].decode('ascii'):<26} "
+                  f"{chr(servo['controller'])}#{servo['channel']:<3} {count} keyframe")
+
+    elif args.command == "play":
+        robot = HumanoidController(simulate=args.simulate, motion_process=args.motion_process)
+        try:
+            KeyframePlayer(robot.serial).play(KeyframeTrack.open(args.path), speed=args.speed)
+        finally:
+            robot.close()
+
+    else:
+        run_format_benchmark(ServoConfig(), args.seconds, args.rate)
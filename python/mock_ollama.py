@@ -0,0 +1,252 @@
+"""
+mock_ollama.py
+Server tiruan Ollama (/api/generate dan /api/tags) untuk benchmark offline
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+CANNED_REPLY = ("Tentu, dengan senang hati saya membantu. Saya adalah robot humanoid "
+                "yang bisa berbicara dan bergerak. Ada lagi yang ingin Anda tanyakan?")
+
+
+def count_tokens(text: str) -> int:
+    """Estimasi kasar jumlah token (~4 karakter per token)"""
+    return max(1, len(text) // 4)
+
+
+class MockOllamaServer:
+    """
+    Tiruan Ollama dengan latency yang bisa diatur
+
+    Args:
+        port: Port HTTP (0 = pilih port bebas)
+        token_rate: Kecepatan generate (token/detik)
+        prompt_rate: Kecepatan evaluasi prompt (token/detik); token yang sudah
+                     ada di `context` tidak dievaluasi ulang
+        cold_start: Delay load model pada request pertama (detik)
+        error_rate: Probabilitas request gagal (0.0 - 1.0)
+        error_mode: 'http500', 'hang' (tidak menjawab sampai timeout client)
+                    atau 'disconnect' (stream putus di tengah)
+        reply: Text balasan untuk prompt percakapan
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 model: str = "llama2",
+                 token_rate: float = 30.0,
+                 prompt_rate: float = 400.0,
+                 cold_start: float = 0.0,
+                 error_rate: float = 0.0,
+                 error_mode: str = "http500",
+                 reply: str = CANNED_REPLY,
+                 seed: Optional[int] = None):
+        self.model = model
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self.cold_start = cold_start
+        self.error_rate = error_rate
+        self.error_mode = error_mode
+        self.reply = reply
+
+        self._random = random.Random(seed)
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.request_count = 0
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- Simulasi ----------
+    def _load_delay(self) -> float:
+        with self._lock:
+            self.request_count += 1
+            if self._loaded:
+                return 0.0
+            self._loaded = True
+            return self.cold_start
+
+    def _inject_error(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    @staticmethod
+    def _emotion_for(text: str) -> str:
+        lowered = text.lower()
+        if any(w in lowered for w in ('!', 'hore', 'wow', 'berhasil')):
+            return "excited"
+        if '?' in lowered or 'hmm' in lowered:
+            return "thinking"
+        if any(w in lowered for w in ('halo', 'senang', 'selamat', 'hello')):
+            return "happy"
+        return "neutral"
+
+    def _reply_for(self, prompt: str) -> str:
+        """Balasan deterministik sesuai jenis prompt"""
+        if prompt.rstrip().endswith("Emotion:"):
+            return self._emotion_for(prompt)
+        if prompt.rstrip().endswith("Emotions:"):
+            # Klasifikasi batch: satu baris "<n>: <emotion>" per baris bernomor
+            lines = re.findall(r'^(\d+)\. "(.*)"$', prompt, re.MULTILINE)
+            return "\n".join(f"{n}: {self._emotion_for(text)}" for n, text in lines)
+        if prompt.rstrip().endswith("Summary:"):
+            return "The human and the robot had a friendly chat."
+        return self.reply
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # Jangan spam console
+
+            def _send_json(self, status: int, body: dict):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json(200, {"models": [{
+                        "name": f"{server.model}:latest",
+                        "model": f"{server.model}:latest",
+                        "size": 3826793677,
+                    }]})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/api/generate":
+                    self._send_json(404, {"error": "not found"})
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                server.handle_generate(self, payload)
+
+        return Handler
+
+    def handle_generate(self, handler: BaseHTTPRequestHandler, payload: dict):
+        start = time.time()
+        time.sleep(self._load_delay())
+
+        fail = self._inject_error()
+        if fail and self.error_mode == "hang":
+            time.sleep(60)
+            return
+        if fail and self.error_mode == "http500":
+            handler._send_json(500, {"error": "injected failure"})
+            return
+
+        prompt = payload.get("prompt", "")
+        context: List[int] = list(payload.get("context") or [])
+        prompt_tokens = count_tokens(prompt)
+
+        # Evaluasi prompt: hanya token baru (context sudah di-cache)
+        time.sleep(prompt_tokens / self.prompt_rate)
+
+        words = self._reply_for(prompt).split(" ")
+        tokens = [w if i == 0 else " " + w for i, w in enumerate(words)]
+        new_context = context + list(range(len(context), len(context) + prompt_tokens + len(tokens)))
+
+        final = {
+            "model": payload.get("model", self.model),
+            "done": True,
+            "context": new_context,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(tokens),
+        }
+
+        if not payload.get("stream", True):
+            time.sleep(len(tokens) / self.token_rate)
+            if fail:
+                handler.close_connection = True
+                return
+            final["response"] = "".join(tokens)
+            final["total_duration"] = int((time.time() - start) * 1e9)
+            handler._send_json(200, final)
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def write_chunk(obj: dict):
+            data = (json.dumps(obj) + "\n").encode('utf-8')
+            handler.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+            handler.wfile.flush()
+
+        try:
+            for i, token in enumerate(tokens):
+                time.sleep(1.0 / self.token_rate)
+                if fail and i == len(tokens) // 2:
+                    handler.close_connection = True
+                    return
+                write_chunk({"model": final["model"], "response": token, "done": False})
+
+            final["response"] = ""
+            final["total_duration"] = int((time.time() - start) * 1e9)
+            write_chunk(final)
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client membatalkan (barge-in)
+
+
+# Jalankan sebagai server standalone
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Ollama server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-rate", type=float, default=30.0)
+    parser.add_argument("--prompt-rate", type=float, default=400.0)
+    parser.add_argument("--cold-start", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-mode", default="http500",
+                        choices=["http500", "hang", "disconnect"])
+    args = parser.parse_args()
+
+    server = MockOllamaServer(port=args.port,
+                              token_rate=args.token_rate,
+                              prompt_rate=args.prompt_rate,
+                              cold_start=args.cold_start,
+                              error_rate=args.error_rate,
+                              error_mode=args.error_mode)
+    print(f"🧪 Mock Ollama berjalan di {server.url} (Ctrl+C untuk berhenti)")
+
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Mock Ollama dihentikan")
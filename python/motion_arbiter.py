@@ -0,0 +1,197 @@
+"""
+motion_arbiter.py
+Arbiter gerakan: gesture pada grup servo berbeda berjalan bersamaan,
+gesture yang bentrok di-queue atau di-preempt
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from python import tracing
+from python.servo_config import ServoConfig
+
+POLICIES = ('queue', 'preempt', 'reject')
+
+
+class MotionCancelled(Exception):
+    """Gesture dihentikan oleh gesture lain (preempt) atau cancel()"""
+
+
+class GestureHandle:
+    """Handle untuk gesture yang berjalan di thread arbiter"""
+
+    def __init__(self, name: str, groups: Set[str], priority: int):
+        self.name = name
+        self.groups = groups
+        self.priority = priority
+
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        self.result = None
+        self.status = "pending"  # pending, running, done, cancelled, rejected, error
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Tunggu gesture selesai; True jika selesai normal"""
+        self.done_event.wait(timeout)
+        return self.status == "done"
+
+
+class MotionArbiter:
+    """
+    Mengatur akses gesture ke grup servo (head, right_arm, left_leg, ...)
+
+    Policy saat grup sedang dipakai gesture lain:
+        queue   : tunggu sampai grup bebas
+        preempt : hentikan pemilik grup jika priority-nya tidak lebih tinggi
+        reject  : langsung gagal
+    """
+
+    def __init__(self, config: ServoConfig, policy: str = "queue"):
+        if policy not in POLICIES:
+            raise ValueError(f"Policy tidak dikenal: {policy}")
+
+        self.config = config
+        self.policy = policy
+        self.groups: List[str] = list(config.servo_mapping.keys())
+
+        self._owners: Dict[str, GestureHandle] = {}
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    # ---------- Grup servo ----------
+    def groups_for_parts(self, parts: Iterable[str]) -> Set[str]:
+        """'right_arm.elbow' -> {'right_arm'}"""
+        return {part.split('.')[0] for part in parts}
+
+    def groups_for_pose(self, pose_name: str) -> Set[str]:
+        """Grup servo yang disentuh sebuah pose dari poses.json"""
+        pose = self.config.get_pose(pose_name)
+        if not pose:
+            return set()
+
+        steps = pose['sequence'] if 'sequence' in pose else [pose]
+        return self.groups_for_parts(
+            servo['part'] for step in steps for servo in step['servos'])
+
+    # ---------- Eksekusi ----------
+    def submit(self, name: str, groups: Iterable[str], func: Callable, *args,
+               policy: Optional[str] = None, priority: int = 0, **kwargs) -> GestureHandle:
+        """
+        Jalankan gesture di thread sendiri setelah grupnya didapat
+
+        Returns:
+            GestureHandle (panggil .wait() untuk blocking)
+        """
+        handle = GestureHandle(name, set(groups), priority)
+        policy = policy or self.policy
+
+        thread = threading.Thread(
+            target=self._run, args=(handle, policy, func, args, kwargs),
+            name=f"gesture-{name}", daemon=True)
+        thread.start()
+
+        return handle
+
+    def run(self, name: str, groups: Iterable[str], func: Callable, *args,
+            policy: Optional[str] = None, priority: int = 0, **kwargs):
+        """Seperti submit() tapi blocking; mengembalikan hasil gesture"""
+        handle = self.submit(name, groups, func, *args,
+                             policy=policy, priority=priority, **kwargs)
+        handle.wait()
+        return handle.result
+
+    def _run(self, handle: GestureHandle, policy: str, func: Callable, args, kwargs):
+        if not self._acquire(handle, policy):
+            handle.done_event.set()
+            return
+
+        self._local.handle = handle
+        handle.status = "running"
+        try:
+            with tracing.span("gesture", gesture=handle.name):
+                handle.result = func(*args, **kwargs)
+            handle.status = "cancelled" if handle.cancel_event.is_set() else "done"
+        except MotionCancelled:
+            handle.status = "cancelled"
+            print(f"⏹ Gesture '{handle.name}' dihentikan")
+        except Exception as e:
+            handle.status = "error"
+            print(f"✗ Gesture '{handle.name}' error: {e}")
+        finally:
+            self._local.handle = None
+            self._release(handle)
+            handle.done_event.set()
+
+    def _acquire(self, handle: GestureHandle, policy: str) -> bool:
+        with self._cond:
+            while True:
+                if handle.cancel_event.is_set():
+                    handle.status = "cancelled"
+                    return False
+
+                blockers = {self._owners[g] for g in handle.groups if g in self._owners}
+                if not blockers:
+                    for group in handle.groups:
+                        self._owners[group] = handle
+                    return True
+
+                if policy == "reject":
+                    names = ', '.join(sorted(b.name for b in blockers))
+                    print(f"✗ Gesture '{handle.name}' ditolak, servo dipakai: {names}")
+                    handle.status = "rejected"
+                    return False
+
+                if policy == "preempt":
+                    for blocker in blockers:
+                        if blocker.priority <= handle.priority:
+                            blocker.cancel()
+
+                self._cond.wait(timeout=0.1)
+
+    def _release(self, handle: GestureHandle):
+        with self._cond:
+            for group in handle.groups:
+                if self._owners.get(group) is handle:
+                    del self._owners[group]
+            self._cond.notify_all()
+
+    # ---------- Dipanggil dari dalam gesture ----------
+    def check(self):
+        """Raise MotionCancelled jika gesture di thread ini diminta berhenti"""
+        handle = getattr(self._local, 'handle', None)
+        if handle is not None and handle.cancel_event.is_set():
+            raise MotionCancelled(handle.name)
+
+    def sleep(self, seconds: float):
+        """time.sleep yang bisa diinterupsi preempt"""
+        handle = getattr(self._local, 'handle', None)
+        if handle is None:
+            time.sleep(seconds)
+            return
+        if handle.cancel_event.wait(seconds):
+            raise MotionCancelled(handle.name)
+
+    def active(self) -> Dict[str, str]:
+        """Grup -> nama gesture yang sedang memakainya"""
+        with self._cond:
+            return {group: handle.name for group, handle in self._owners.items()}
+
+    def cancel_all(self):
+        with self._cond:
+            for handle in set(self._owners.values()):
+                handle.cancel()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Tunggu sampai tidak ada gesture yang memegang grup servo"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._owners:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
+            return True
@@ -0,0 +1,599 @@
+"""
+motion_process.py
+Process terpisah yang memegang kedua port serial + scheduler gerakan.
+Process utama mengirim command lewat ring buffer di shared memory
+"""
+
+import argparse
+import heapq
+import json
+import math
+import multiprocessing as mp
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from python.serial_controller import PRIORITY_NORMAL, SerialController
+from python.servo_config import ServoConfig
+
+# Jenis frame command
+KIND_MOVE = 1
+KIND_STOP = 2
+KIND_SHUTDOWN = 3
+
+FRAME_DTYPE = np.dtype([
+    ('seq', '<u4'),
+    ('kind', 'u1'),
+    ('controller', 'u1'),   # ord('A') / ord('B')
+    ('priority', 'u1'),
+    ('channel', '<u2'),
+    ('position', '<u2'),
+    ('time_ms', '<u2'),
+    ('delay_ms', '<u2'),
+    ('t_due', '<f8'),       # time.monotonic() saat command harus dikirim (0 = segera)
+], align=True)
+
+EVENT_DTYPE = np.dtype([
+    ('seq', '<u4'),
+    ('ok', 'u1'),
+    ('lateness', '<f8'),    # MOVE: t_sent - t_due
+    ('value_a', '<f8'),     # MOVE: t_sent -> DONE; STOP: latency controller_A
+    ('value_b', '<f8'),     # STOP: latency controller_B
+], align=True)
+
+READY_SEQ = 0               # Event pertama dari motion process: port siap
+DEFAULT_SLOTS = 1024
+POLL_INTERVAL = 0.0005      # Sleep scheduler saat tidak ada yang jatuh tempo (detik)
+SPIN_AHEAD = 0.001          # Sisa waktu yang di-busy-wait sebelum t_due (detik)
+
+
+class ShmRing:
+    """
+    Ring buffer single-producer single-consumer di shared memory
+
+    Index head/tail (uint64) ada di cache line terpisah; frame berukuran tetap
+    ditulis langsung ke shared memory lewat numpy structured array, sehingga
+    consumer membaca frame di tempat tanpa pickle/pipe. Producer menulis frame
+    dulu, baru memajukan head; consumer memproses frame lalu memajukan tail.
+    Tidak ada lock antar process. Satu process dengan banyak thread producer
+    harus men-serialisasi push() sendiri.
+    """
+
+    HEAD = 0
+    TAIL = 8   # 8 x uint64 = 64 byte
+
+    def __init__(self, dtype: np.dtype, slots: int = DEFAULT_SLOTS, name: Optional[str] = None):
+        self.owner = name is None
+        self.slots = slots
+
+        header = 2 * 64
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=self.owner, size=header + slots * dtype.itemsize)
+        self.index = np.ndarray((16,), dtype=np.uint64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,), dtype=dtype, buffer=self.shm.buf, offset=header)
+
+        if self.owner:
+            self.index[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return int(self.index[self.HEAD] - self.index[self.TAIL])
+
+    def push(self, values: tuple) -> bool:
+        """Tulis satu frame; False jika ring penuh"""
+        head = int(self.index[self.HEAD])
+        if head - int(self.index[self.TAIL]) >= self.slots:
+            return False
+
+        self.frames[head % self.slots] = values
+        self.index[self.HEAD] = head + 1
+        return True
+
+    def push_many(self, frames: np.ndarray) -> int:
+        """Tulis banyak frame sekaligus (vectorized); mengembalikan jumlah yang masuk"""
+        head = int(self.index[self.HEAD])
+        count = min(len(frames), self.slots - (head - int(self.index[self.TAIL])))
+
+        written = 0
+        while written < count:
+            start = (head + written) % self.slots
+            chunk = min(count - written, self.slots - start)
+            self.frames[start:start + chunk] = frames[written:written + chunk]
+            written += chunk
+
+        self.index[self.HEAD] = head + count
+        return count
+
+    def available(self) -> np.ndarray:
+        """View (tanpa copy) ke frame yang belum dibaca, sampai batas wrap"""
+        tail = int(self.index[self.TAIL])
+        count = int(self.index[self.HEAD]) - tail
+        start = tail % self.slots
+        return self.frames[start:start + min(count, self.slots - start)]
+
+    def release(self, count: int):
+        """Tandai `count` frame sudah diproses"""
+        self.index[self.TAIL] = int(self.index[self.TAIL]) + count
+
+    def close(self):
+        # View numpy harus dilepas sebelum shared memory bisa ditutup
+        self.index = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class MotionScheduler:
+    """
+    Loop di motion process: ambil frame dari ring, kirim tepat pada t_due,
+    laporkan hasil (ok, keterlambatan, latency DONE) ke ring event
+    """
+
+    def __init__(self, serial: SerialController, commands: ShmRing, events: ShmRing):
+        self.serial = serial
+        self.commands = commands
+        self.events = events
+
+    def emit(self, seq: int, ok: bool, lateness: float = math.nan,
+             value_a: float = math.nan, value_b: float = math.nan):
+        deadline = time.monotonic() + 1.0
+        while not self.events.push((seq, ok, lateness, value_a, value_b)):
+            if time.monotonic() > deadline:
+                return  # Process utama tidak membaca event; jangan blokir gerakan
+            time.sleep(POLL_INTERVAL)
+
+    def run(self):
+        schedule: List[tuple] = []   # heap (t_due, seq, frame)
+        inflight: List[tuple] = []   # (seq, t_due, PendingCommand)
+        running = True
+
+        self.emit(READY_SEQ, True)
+
+        while running or inflight:
+            # 1. Ambil semua frame baru
+            while True:
+                frames = self.commands.available()
+                if not len(frames):
+                    break
+
+                for frame in frames:
+                    kind = int(frame['kind'])
+                    seq = int(frame['seq'])
+
+                    if kind == KIND_SHUTDOWN:
+                        running = False
+                    elif kind == KIND_STOP:
+                        schedule.clear()
+                        self._stop(seq)
+                    elif kind == KIND_MOVE:
+                        heapq.heappush(schedule, (float(frame['t_due']), seq, frame.item()))
+
+                self.commands.release(len(frames))
+
+            # 2. Kirim command yang jatuh tempo
+            while schedule and schedule[0][0] <= time.monotonic() + SPIN_AHEAD:
+                t_due, seq, frame = heapq.heappop(schedule)
+                while time.monotonic() < t_due:
+                    pass
+
+                _, _, controller, priority, channel, position, time_ms, delay_ms, _ = frame
+                pending = self.serial.submit_command(
+                    chr(controller), channel, position, time_ms, delay_ms, priority)
+                if pending is None:
+                    self.emit(seq, False)
+                else:
+                    inflight.append((seq, t_due, pending))
+
+            # 3. Laporkan command yang sudah selesai
+            if inflight:
+                still_running = []
+                for seq, t_due, pending in inflight:
+                    if not pending.done:
+                        still_running.append((seq, t_due, pending))
+                    elif pending.t_sent is None:
+                        self.emit(seq, False)  # Dibuang oleh stop sebelum terkirim
+                    else:
+                        lateness = pending.t_sent - t_due if t_due else 0.0
+                        self.emit(seq, pending.success, lateness,
+                                  pending.t_complete - pending.t_sent)
+                inflight = still_running
+
+            # 4. Tidur sampai command berikutnya (sisa SPIN_AHEAD di-busy-wait)
+            if schedule:
+                wait = schedule[0][0] - time.monotonic() - SPIN_AHEAD
+                if wait > 0:
+                    time.sleep(min(wait, POLL_INTERVAL))
+            else:
+                time.sleep(POLL_INTERVAL)
+
+    def _stop(self, seq: int):
+        results = self.serial.emergency_stop()
+        # Gating abort dilakukan di process utama; motion process siap
+        # menerima command lagi setelah stop terkirim
+        self.serial.abort_event.clear()
+
+        latency = [results.get(name) for name in ('controller_A', 'controller_B')]
+        self.emit(seq, all(v is not None for v in latency),
+                  0.0, *(math.nan if v is None else v for v in latency))
+
+
+def _motion_main(command_ring: str, event_ring: str, slots: int, simulate: bool):
+    """Entry point motion process"""
+    commands = ShmRing(FRAME_DTYPE, slots, name=command_ring)
+    events = ShmRing(EVENT_DTYPE, slots, name=event_ring)
+    serial = SerialController(ServoConfig(), simulate=simulate)
+
+    try:
+        MotionScheduler(serial, commands, events).run()
+    finally:
+        serial.close_all()
+        commands.close()
+        events.close()
+
+
+class MotionTicket:
+    """Hasil satu command yang dikirim lewat MotionProcess"""
+
+    def __init__(self, seq: int):
+        self.seq = seq
+        self.ok = False
+        self.lateness = math.nan
+        self.value_a = math.nan
+        self.value_b = math.nan
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._done.wait(timeout)
+        return self.ok
+
+
+class MotionProcess:
+    """
+    Client di process utama untuk motion process
+
+    Args:
+        simulate: Pakai SimulatedSerial di motion process
+        slots: Kapasitas ring command dan ring event
+        in_process: Jalankan scheduler di thread process ini (baseline benchmark)
+    """
+
+    def __init__(self, simulate: bool = False, slots: int = DEFAULT_SLOTS,
+                 in_process: bool = False):
+        self.simulate = simulate
+        self.slots = slots
+        self.in_process = in_process
+
+        self.commands = ShmRing(FRAME_DTYPE, slots)
+        self.events = ShmRing(EVENT_DTYPE, slots)
+
+        self._seq = READY_SEQ
+        self._push_lock = threading.Lock()
+        self._tickets: Dict[int, MotionTicket] = {}
+        self._ready = MotionTicket(READY_SEQ)
+        self._tickets[READY_SEQ] = self._ready
+
+        self._worker = None
+        self._reader: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def start(self, timeout: float = 15.0) -> "MotionProcess":
+        args = (self.commands.name, self.events.name, self.slots, self.simulate)
+        if self.in_process:
+            self._worker = threading.Thread(target=_motion_main, args=args,
+                                            name="motion-scheduler", daemon=True)
+        else:
+            self._worker = mp.get_context("spawn").Process(
+                target=_motion_main, args=args, name="motion-process", daemon=True)
+        self._worker.start()
+
+        self._reader = threading.Thread(target=self._read_events,
+                                        name="motion-events", daemon=True)
+        self._reader.start()
+
+        deadline = time.monotonic() + timeout
+        while not self._ready.wait(0.1):
+            if not self._worker.is_alive() or time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError("Motion process tidak siap")
+        return self
+
+    # ---------- Submit ----------
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def _push(self, frame: tuple, timeout: float = 2.0) -> MotionTicket:
+        with self._push_lock:
+            ticket = MotionTicket(self._next_seq())
+            self._tickets[ticket.seq] = ticket
+
+            deadline = time.monotonic() + timeout
+            while not self.commands.push((ticket.seq,) + frame):
+                if time.monotonic() > deadline:
+                    del self._tickets[ticket.seq]
+                    raise TimeoutError("Ring command penuh")
+                time.sleep(POLL_INTERVAL)
+
+        return ticket
+
+    def submit(self, controller: str, channel: int, position: int,
+               time_ms: int = 800, delay_ms: int = 300,
+               at: Optional[float] = None,
+               priority: int = PRIORITY_NORMAL) -> MotionTicket:
+        """
+        Jadwalkan satu command servo
+
+        Args:
+            at: time.monotonic() saat command dikirim (None = segera)
+        """
+        return self._push((KIND_MOVE, ord(controller), priority,
+                           channel, position, time_ms, delay_ms, at or 0.0))
+
+    def submit_trajectory(self, points: List[Dict], start_at: Optional[float] = None,
+                          priority: int = PRIORITY_NORMAL) -> List[MotionTicket]:
+        """
+        Jadwalkan banyak command sekaligus dalam satu tulisan ke ring
+
+        Args:
+            points: List of dict dengan keys: t (detik relatif ke start_at),
+                    controller, channel, position, time, delay
+            start_at: time.monotonic() untuk t=0 (default: 50 ms dari sekarang)
+        """
+        start_at = start_at if start_at is not None else time.monotonic() + 0.05
+
+        with self._push_lock:
+            tickets = [MotionTicket(self._next_seq()) for _ in points]
+            frames = np.zeros(len(points), dtype=FRAME_DTYPE)
+            frames['seq'] = [t.seq for t in tickets]
+            frames['kind'] = KIND_MOVE
+            frames['controller'] = [ord(p.get('controller', 'A')) for p in points]
+            frames['priority'] = priority
+            frames['channel'] = [p['channel'] for p in points]
+            frames['position'] = [p['position'] for p in points]
+            frames['time_ms'] = [p.get('time', 800) for p in points]
+            frames['delay_ms'] = [p.get('delay', 0) for p in points]
+            frames['t_due'] = [start_at + p['t'] for p in points]
+
+            for ticket in tickets:
+                self._tickets[ticket.seq] = ticket
+
+            written = 0
+            deadline = time.monotonic() + 2.0
+            while written < len(frames):
+                written += self.commands.push_many(frames[written:])
+                if written < len(frames):
+                    if time.monotonic() > deadline:
+                        raise TimeoutError("Ring command penuh")
+                    time.sleep(POLL_INTERVAL)
+
+        return tickets
+
+    def submit_frames(self, frames: np.ndarray, timeout: float = 2.0) -> Optional[MotionTicket]:
+        """
+        Jadwalkan frame FRAME_DTYPE yang sudah di-encode (kolom seq diisi di sini)
+
+        Untuk stream panjang: hanya frame terakhir yang mendapat ticket,
+        event frame lain diabaikan oleh reader.
+
+        Returns:
+            Ticket frame terakhir (None jika frames kosong)
+        """
+        if not len(frames):
+            return None
+
+        with self._push_lock:
+            first = self._seq + 1
+            self._seq += len(frames)
+            frames['seq'] = np.arange(first, first + len(frames), dtype=np.uint32)
+
+            ticket = MotionTicket(self._seq)
+            self._tickets[ticket.seq] = ticket
+
+            written = 0
+            deadline = time.monotonic() + timeout
+            while written < len(frames):
+                written += self.commands.push_many(frames[written:])
+                if written < len(frames):
+                    if time.monotonic() > deadline:
+                        raise TimeoutError("Ring command penuh")
+                    time.sleep(POLL_INTERVAL)
+
+        return ticket
+
+    def forget(self, ticket: MotionTicket):
+        """Lepas ticket yang tidak ditunggu lagi (timeout) agar _tickets tidak bocor"""
+        self._tickets.pop(ticket.seq, None)
+
+    def stop(self, timeout: float = 2.0) -> Dict[str, Optional[float]]:
+        """Emergency stop di motion process; mengembalikan latency per controller"""
+        ticket = self._push((KIND_STOP, 0, 0, 0, 0, 0, 0, 0.0))
+        try:
+            ticket.wait(timeout)
+        finally:
+            self.forget(ticket)
+
+        return {
+            name: None if math.isnan(value) else value
+            for name, value in (('controller_A', ticket.value_a),
+                                ('controller_B', ticket.value_b))
+        }
+
+    def close(self):
+        if self._closed.is_set():
+            return
+
+        if self._worker is not None and self._worker.is_alive():
+            self._push((KIND_SHUTDOWN, 0, 0, 0, 0, 0, 0, 0.0))
+            self._worker.join(timeout=5)
+
+        self._closed.set()
+        if self._reader is not None:
+            self._reader.join(timeout=1)
+
+        self.commands.close()
+        self.events.close()
+
+    # ---------- Event ----------
+    def _read_events(self):
+        while not self._closed.is_set():
+            events = self.events.available()
+            if not len(events):
+                time.sleep(0.001)
+                continue
+
+            for event in events:
+                ticket = self._tickets.pop(int(event['seq']), None)
+                if ticket is None:
+                    continue
+                ticket.ok = bool(event['ok'])
+                ticket.lateness = float(event['lateness'])
+                ticket.value_a = float(event['value_a'])
+                ticket.value_b = float(event['value_b'])
+                ticket._done.set()
+
+            self.events.release(len(events))
+
+
+class RemoteSerialController(SerialController):
+    """
+    Pengganti SerialController: command diteruskan ke motion process
+
+    Port serial tidak dibuka di process ini, sehingga HTTP Ollama, TTS,
+    dan parsing di process utama tidak mengganggu timing gerakan.
+    """
+
+    def __init__(self, config: ServoConfig, simulate: bool = False):
+        self.config = config
+        self.simulate = simulate
+        # Protocol ke firmware dipilih SerialController di motion process;
+        # dari sini command diteruskan satu per satu (tanpa send_batch)
+        self.protocol = 'ascii'
+        self.connections = {}
+        self.links = {}
+        self.recorder = None
+        self.abort_event = threading.Event()
+        self.stop_latencies: Dict[str, List[float]] = {
+            'controller_A': [], 'controller_B': []}
+
+        self.process: Optional[MotionProcess] = None
+
+        print("\n=== Menjalankan motion process ===")
+        self.process = MotionProcess(simulate=simulate).start()
+        print("✓ Motion process siap")
+
+    def send_command(self, controller: str, channel: int, position: int,
+                     time_ms: int = 800, delay_ms: int = 300,
+                     priority: int = PRIORITY_NORMAL) -> bool:
+        if self.is_aborted(priority):
+            return False
+
+        ticket = self.process.submit(controller, channel, position, time_ms, delay_ms,
+                                     priority=priority)
+        try:
+            return ticket.wait((time_ms + delay_ms) / 1000 + 3)
+        finally:
+            self.process.forget(ticket)
+
+    def send_planned(self, command, priority: int = PRIORITY_NORMAL) -> bool:
+        return self.send_command(command.controller, command.channel, command.position,
+                                 command.time, command.delay, priority)
+
+    def emergency_stop(self) -> Dict[str, Optional[float]]:
+        self.abort_event.set()
+
+        # Latency per link sudah dicetak oleh SerialController di motion process
+        results = self.process.stop()
+        for name, latency in results.items():
+            if latency is not None:
+                self.stop_latencies[name].append(latency)
+
+        return results
+
+    def stop_latency_report(self):
+        for name, samples in self.stop_latencies.items():
+            if samples:
+                print(f"⏱ Stop {name}: worst {max(samples) * 1000:.1f} ms, "
+                      f"mean {sum(samples) / len(samples) * 1000:.1f} ms ({len(samples)}x)")
+
+    def close_all(self):
+        if self.process is not None:
+            self.process.close()
+
+
+# ---------- Benchmark jitter ----------
+def _gil_load(stop: threading.Event):
+    """Beban CPU-bound di process utama (mirip parsing JSON respon Ollama)"""
+    payload = json.dumps({"response": "kata " * 2000, "context": list(range(4000))})
+    while not stop.is_set():
+        json.loads(payload)
+
+
+def run_jitter_benchmark(points: int = 200, period: float = 0.02,
+                         load_threads: int = 2) -> Dict[str, Dict[str, float]]:
+    """
+    Bandingkan keterlambatan kirim command: scheduler di thread process
+    utama vs di motion process, dengan beban GIL di process utama
+
+    Returns:
+        mode -> {p50, p99, max} keterlambatan dalam ms
+    """
+    trajectory = [{
+        't': i * period,
+        'controller': 'A',
+        'channel': 1,
+        'position': 1500 + (200 if i % 2 else -200),
+        'time': int(period * 1000 / 2),
+        'delay': 0,
+    } for i in range(points)]
+
+    results = {}
+    for mode in ('thread', 'process'):
+        motion = MotionProcess(simulate=True, in_process=(mode == 'thread')).start()
+
+        stop = threading.Event()
+        load = [threading.Thread(target=_gil_load, args=(stop,), daemon=True)
+                for _ in range(load_threads)]
+        for thread in load:
+            thread.start()
+
+        tickets = motion.submit_trajectory(trajectory, start_at=time.monotonic() + 0.2)
+        for ticket in tickets:
+            ticket.wait(period * points + 5)
+
+        stop.set()
+        for thread in load:
+            thread.join()
+        motion.close()
+
+        lateness = np.array([t.lateness for t in tickets if t.ok]) * 1000
+        results[mode] = {
+            'p50': float(np.percentile(lateness, 50)),
+            'p99': float(np.percentile(lateness, 99)),
+            'max': float(lateness.max()),
+            'ok': len(lateness),
+        }
+
+    print(f"\n{'mode':<8} {'p50':>8} {'p99':>8} {'max':>8}   (ms, {points} command)")
+    for mode, stats in results.items():
+        print(f"{mode:<8} {stats['p50']:8.2f} {stats['p99']:8.2f} {stats['max']:8.2f}")
+
+    return results
+
+
+# Test program
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark jitter motion process")
+    parser.add_argument("--points", type=int, default=200)
+    parser.add_argument("--period", type=float, default=0.02)
+    parser.add_argument("--load-threads", type=int, default=2)
+    args = parser.parse_args()
+
+    run_jitter_benchmark(points=args.points, period=args.period,
+                         load_threads=args.load_threads)
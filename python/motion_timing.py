@@ -0,0 +1,431 @@
+"""
+motion_timing.py
+Analisa timing statis pose, gesture, dan file movement tanpa hardware:
+timeline per controller untuk beberapa strategi dispatch, critical path,
+idle gap tiap link, perkiraan wall time, dan daftar gerakan paling boros
+"""
+
+import argparse
+import glob
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from python.gestures import GestureLibrary
+from python.servo_config import ServoConfig
+
+SERVO_BAUD = 9600          # Arduino -> servo controller (lihat ARDUINO_README.md)
+HOST_GAP = 0.05            # time.sleep(0.05) di SerialController.send_multiple
+POSE_DELAY_MS = 300        # Default delay servo pose single-step (execute_pose)
+MIN_GAP = 0.02             # Idle lebih pendek dari ini tidak dilaporkan
+
+STRATEGIES = ('blocking', 'per_link', 'pipelined')
+STRATEGY_HELP = {
+    'blocking': "satu command per waktu di semua link, tunggu DONE (execute_pose, gesture)",
+    'per_link': "link A dan B paralel, tiap link tunggu DONE, barrier per step",
+    'pipelined': "frame terjadwal per step tanpa barrier (KeyframePlayer / motion process)",
+}
+
+# Offender: wall/intended di atas ini, atau porsi critical path di atas ini
+RATIO_LIMIT = 1.5
+DELAY_SHARE_LIMIT = 0.3
+GAP_SHARE_LIMIT = 0.1
+
+
+class TimedCommand(NamedTuple):
+    part: str
+    controller: str
+    time_ms: int
+    delay_ms: int
+    nbytes: int
+
+
+class TimedStep(NamedTuple):
+    commands: Tuple[TimedCommand, ...]
+    wait: float = 0.0      # Host menunggu setelah step (detik)
+    gap: float = 0.0       # Host sleep setelah tiap command (detik)
+
+    @property
+    def design(self) -> float:
+        """Durasi yang dimaksud: semua servo dalam step bergerak bersamaan"""
+        motion = max((c.time_ms + c.delay_ms for c in self.commands), default=0) / 1000
+        return motion + self.wait
+
+
+class MotionProgram(NamedTuple):
+    kind: str              # pose, gesture, movement
+    name: str
+    steps: Tuple[TimedStep, ...]
+
+    @property
+    def current(self) -> str:
+        """Strategi yang dipakai kode saat ini untuk jenis ini"""
+        return 'pipelined' if self.kind == 'movement' else 'blocking'
+
+    @property
+    def intended(self) -> float:
+        return sum(step.design for step in self.steps)
+
+    @property
+    def command_count(self) -> int:
+        return sum(len(step.commands) for step in self.steps)
+
+
+class Slot(NamedTuple):
+    lane: str              # 'A', 'B', atau 'host'
+    kind: str              # command, gap, wait
+    label: str
+    start: float
+    end: float
+    cause: Optional[int]   # Index slot yang menentukan start (untuk critical path)
+    motion: float = 0.0
+    delay: float = 0.0
+
+
+class Timeline:
+    """Hasil simulasi satu strategi"""
+
+    def __init__(self, program: MotionProgram, strategy: str):
+        self.program = program
+        self.strategy = strategy
+        self.slots: List[Slot] = []
+
+    def add(self, lane: str, kind: str, label: str, start: float, end: float,
+            cause: Optional[int], motion: float = 0.0, delay: float = 0.0) -> int:
+        self.slots.append(Slot(lane, kind, label, start, end, cause, motion, delay))
+        return len(self.slots) - 1
+
+    @property
+    def wall(self) -> float:
+        return max((slot.end for slot in self.slots), default=0.0)
+
+    def lanes(self) -> List[str]:
+        return sorted({slot.lane for slot in self.slots if slot.lane != 'host'})
+
+    def busy(self, lane: str) -> float:
+        return sum(slot.end - slot.start for slot in self.slots if slot.lane == lane)
+
+    def idle_gaps(self, lane: str) -> List[Tuple[float, float]]:
+        """(mulai, durasi) idle link dari t=0 sampai wall time"""
+        gaps = []
+        t = 0.0
+        for slot in sorted((s for s in self.slots if s.lane == lane), key=lambda s: s.start):
+            if slot.start - t >= MIN_GAP:
+                gaps.append((t, slot.start - t))
+            t = max(t, slot.end)
+        if self.wall - t >= MIN_GAP:
+            gaps.append((t, self.wall - t))
+        return gaps
+
+    def critical_path(self) -> List[Slot]:
+        """Rantai slot dari t=0 ke slot yang selesai terakhir"""
+        if not self.slots:
+            return []
+        index = max(range(len(self.slots)), key=lambda i: self.slots[i].end)
+        path = []
+        while index is not None:
+            path.append(self.slots[index])
+            index = self.slots[index].cause
+        return path[::-1]
+
+    def breakdown(self) -> Dict[str, float]:
+        """Critical path dipecah: gerak (T), delay (D), ack/transfer, jeda host, wait, jadwal"""
+        totals = {'gerak': 0.0, 'delay': 0.0, 'ack': 0.0, 'jeda host': 0.0,
+                  'wait': 0.0, 'jadwal': 0.0}
+        t = 0.0
+        for slot in self.critical_path():
+            totals['jadwal'] += max(0.0, slot.start - t)
+            duration = slot.end - slot.start
+            if slot.kind == 'command':
+                totals['gerak'] += slot.motion
+                totals['delay'] += slot.delay
+                totals['ack'] += duration - slot.motion - slot.delay
+            elif slot.kind == 'gap':
+                totals['jeda host'] += duration
+            else:
+                totals['wait'] += duration
+            t = slot.end
+        return totals
+
+
+class TimingAnalyzer:
+    """
+    Simulasi dispatch tanpa hardware
+
+    Model link (sama dengan SimulatedSerial dan RobotCore): satu command per
+    controller dalam satu waktu; OK/DONE datang T+D setelah command diterima
+    servo controller. Overhead per command = transfer USB + transfer ke servo
+    controller (SERVO_BAUD) + balasan OK/DONE.
+    """
+
+    def __init__(self, config: ServoConfig):
+        self.config = config
+        self.gestures = GestureLibrary(config)
+        self.usb_baud = {name[-1]: cfg.get('baudrate', 115200)
+                         for name, cfg in config.serial_config.items()
+                         if name.startswith('controller_')}
+
+    # ---------- Program ----------
+    def _command(self, part: str, time_ms: int, delay_ms: int,
+                 position: int = 1500) -> Optional[TimedCommand]:
+        info = self.config.get_servo_info(part)
+        if not info:
+            return None
+        data = f"#{info['channel']}P{position}T{time_ms}D{delay_ms}\n"
+        return TimedCommand(part, info['controller'], time_ms, delay_ms, len(data))
+
+    def pose(self, name: str) -> MotionProgram:
+        """Seperti HumanoidController.execute_pose (send_multiple + jeda 50 ms)"""
+        pose = self.config.get_pose(name)
+        if not pose:
+            raise ValueError(f"Pose '{name}' tidak ditemukan")
+
+        steps = []
+        if 'sequence' in pose:
+            for step in pose['sequence']:
+                commands = [self._command(s['part'], s.get('time', 800), 0, s['position'])
+                            for s in step['servos']]
+                steps.append(TimedStep(tuple(c for c in commands if c),
+                                       step.get('delay', 0) / 1000, HOST_GAP))
+        else:
+            commands = [self._command(s['part'], s.get('time', 800),
+                                      s.get('delay', POSE_DELAY_MS), s['position'])
+                        for s in pose['servos']]
+            steps.append(TimedStep(tuple(c for c in commands if c), 0.0, HOST_GAP))
+        return MotionProgram('pose', name, tuple(steps))
+
+    def gesture(self, name: str, **params) -> MotionProgram:
+        """Seperti RobotMovements.perform (send_planned lalu wait, tanpa telemetry)"""
+        plan = self.gestures.plan(name, **params)
+        steps = tuple(
+            TimedStep(tuple(TimedCommand(c.part, c.controller, c.time, c.delay, len(c.data))
+                            for c in step.commands), step.wait)
+            for step in plan.steps)
+        return MotionProgram('gesture', name, steps)
+
+    def movement(self, path: str) -> MotionProgram:
+        """data/movement/*.json: step berurutan, tiap step `time` ms"""
+        with open(path, 'r', encoding='utf-8') as f:
+            movement = json.load(f)['movement']
+
+        steps = []
+        for step in movement['steps']:
+            commands = [self._command(s['part'], s.get('time', step['time']),
+                                      s.get('delay', 0), s['position'])
+                        for s in step['servos']]
+            commands = tuple(c for c in commands if c)
+            # Step berikutnya dijadwalkan `time` ms kemudian
+            longest = max((c.time_ms + c.delay_ms for c in commands), default=0)
+            steps.append(TimedStep(commands, max(0, step['time'] - longest) / 1000))
+        return MotionProgram('movement', movement.get('name', os.path.basename(path)),
+                             tuple(steps))
+
+    # ---------- Simulasi ----------
+    def overhead(self, command: TimedCommand) -> float:
+        usb = self.usb_baud.get(command.controller, 115200)
+        request = command.nbytes * 10 / usb + command.nbytes * 10 / SERVO_BAUD
+        reply = len("OK\r\n") * 10 / SERVO_BAUD + len("[A] DONE\r\n") * 10 / usb
+        return request + reply
+
+    def _slot(self, timeline: Timeline, command: TimedCommand, step: int,
+              start: float, cause: Optional[int]) -> int:
+        motion = command.time_ms / 1000
+        delay = command.delay_ms / 1000
+        end = start + self.overhead(command) + motion + delay
+        label = f"{step + 1}:{command.part}"
+        return timeline.add(command.controller, 'command', label, start, end, cause,
+                            motion, delay)
+
+    def simulate(self, program: MotionProgram, strategy: str) -> Timeline:
+        timeline = Timeline(program, strategy)
+        t, prev = 0.0, None
+
+        if strategy == 'blocking':
+            for i, step in enumerate(program.steps):
+                for command in step.commands:
+                    prev = self._slot(timeline, command, i, t, prev)
+                    t = timeline.slots[prev].end
+                    if step.gap:
+                        prev = timeline.add('host', 'gap', f"{i + 1}:jeda", t, t + step.gap, prev)
+                        t += step.gap
+                if step.wait:
+                    prev = timeline.add('host', 'wait', f"{i + 1}:wait", t, t + step.wait, prev)
+                    t += step.wait
+
+        elif strategy == 'per_link':
+            for i, step in enumerate(program.steps):
+                free: Dict[str, Tuple[float, Optional[int]]] = {}
+                for command in step.commands:
+                    start, cause = free.get(command.controller, (t, prev))
+                    slot = self._slot(timeline, command, i, start, cause)
+                    free[command.controller] = (timeline.slots[slot].end, slot)
+                if free:
+                    t, prev = max(free.values(), key=lambda item: item[0])
+                if step.wait:
+                    prev = timeline.add('host', 'wait', f"{i + 1}:wait", t, t + step.wait, prev)
+                    t += step.wait
+
+        elif strategy == 'pipelined':
+            free: Dict[str, Tuple[float, Optional[int]]] = {}
+            scheduled = 0.0
+            for i, step in enumerate(program.steps):
+                for command in step.commands:
+                    start, cause = free.get(command.controller, (0.0, None))
+                    if start < scheduled:
+                        start, cause = scheduled, None
+                    slot = self._slot(timeline, command, i, start, cause)
+                    free[command.controller] = (timeline.slots[slot].end, slot)
+                scheduled += step.design
+            # Host selesai saat jadwal habis (wait terakhir) atau link terakhir selesai
+            end = max((end for end, _ in free.values()), default=0.0)
+            if scheduled > end:
+                timeline.add('host', 'wait', "jadwal", end, scheduled,
+                             max(free.values(), key=lambda item: item[0])[1] if free else None)
+
+        else:
+            raise ValueError(f"Strategi tidak dikenal: {strategy}")
+
+        return timeline
+
+    def analyze(self, program: MotionProgram) -> Dict[str, Timeline]:
+        return {strategy: self.simulate(program, strategy) for strategy in STRATEGIES}
+
+    # ---------- Library ----------
+    def library(self, movement_dir: str = "data/movement") -> List[MotionProgram]:
+        programs = [self.pose(name) for name in self.config.list_poses()]
+        programs += [self.gesture(name) for name in self.gestures.names()]
+        programs += [self.movement(path)
+                     for path in sorted(glob.glob(os.path.join(movement_dir, '*.json')))]
+        return programs
+
+
+def offender_flags(program: MotionProgram, timeline: Timeline) -> List[str]:
+    """Alasan gerakan ini boros (kosong = wajar)"""
+    flags = []
+    intended = program.intended
+    if intended > 0 and timeline.wall / intended >= RATIO_LIMIT:
+        flags.append(f"serialisasi {timeline.wall / intended:.1f}x dari durasi desain")
+
+    breakdown = timeline.breakdown()
+    if timeline.wall > 0:
+        if breakdown['delay'] / timeline.wall >= DELAY_SHARE_LIMIT:
+            flags.append(f"delay D {breakdown['delay'] / timeline.wall:.0%} dari critical path")
+        if breakdown['jeda host'] / timeline.wall >= GAP_SHARE_LIMIT:
+            flags.append(f"jeda host {breakdown['jeda host'] / timeline.wall:.0%}")
+    return flags
+
+
+# ---------- Laporan ----------
+def print_timeline_chart(timeline: Timeline, width: int = 60):
+    scale = width / timeline.wall if timeline.wall > 0 else 0
+    for lane in timeline.lanes() + ['host']:
+        row = [' '] * width
+        for slot in timeline.slots:
+            if slot.lane != lane:
+                continue
+            char = {'command': '█', 'gap': '·', 'wait': '-'}[slot.kind]
+            for x in range(int(slot.start * scale), max(int(slot.start * scale) + 1,
+                                                        int(slot.end * scale))):
+                row[min(x, width - 1)] = char
+        print(f"      {lane:<4} |{''.join(row)}|")
+
+
+def print_report(analyzer: TimingAnalyzer, program: MotionProgram, chart: bool = False):
+    timelines = analyzer.analyze(program)
+    print(f"\n📐 {program.kind} '{program.name}': {len(program.steps)} step, "
+          f"{program.command_count} command, durasi desain {program.intended:.2f}s")
+
+    lanes = sorted({lane for timeline in timelines.values() for lane in timeline.lanes()})
+    header = "".join(f"  {lane} busy/idle  " for lane in lanes)
+    print(f"   {'strategi':<10} {'wall':>7}{header}")
+    for strategy, timeline in timelines.items():
+        columns = "".join(f"  {timeline.busy(lane):5.2f}/{timeline.wall - timeline.busy(lane):5.2f}s"
+                          for lane in lanes)
+        marker = "  ← saat ini" if strategy == program.current else ""
+        print(f"   {strategy:<10} {timeline.wall:6.2f}s{columns}{marker}")
+
+    current = timelines[program.current]
+    path = current.critical_path()
+    breakdown = ", ".join(f"{key} {value:.2f}s" for key, value in current.breakdown().items()
+                          if value >= 0.005)
+    print(f"\n   Critical path ({program.current}, {len(path)} slot): {breakdown}")
+    longest = sorted((s for s in path if s.kind == 'command'),
+                     key=lambda s: s.end - s.start, reverse=True)[:3]
+    for slot in longest:
+        print(f"      {slot.lane} {slot.label:<32} {slot.end - slot.start:5.2f}s @ {slot.start:5.2f}s")
+
+    for lane in current.lanes():
+        gaps = current.idle_gaps(lane)
+        if gaps:
+            start, duration = max(gaps, key=lambda gap: gap[1])
+            print(f"   Idle link {lane}: {len(gaps)} gap, total {sum(d for _, d in gaps):.2f}s "
+                  f"(terpanjang {duration:.2f}s @ {start:.2f}s)")
+
+    best = min(timelines.values(), key=lambda timeline: (timeline.wall, timeline.strategy != program.current))
+    if best.wall < current.wall - MIN_GAP:
+        print(f"   💡 {best.strategy}: {best.wall:.2f}s (hemat {current.wall - best.wall:.2f}s)")
+
+    for flag in offender_flags(program, current):
+        print(f"   ⚠ {flag}")
+
+    if chart:
+        for strategy, timeline in timelines.items():
+            print(f"\n   {strategy} ({timeline.wall:.2f}s):")
+            print_timeline_chart(timeline)
+
+
+def print_library(analyzer: TimingAnalyzer, programs: List[MotionProgram], top: int = 10):
+    rows = []
+    for program in programs:
+        timelines = analyzer.analyze(program)
+        current = timelines[program.current]
+        best = min(timelines.values(), key=lambda timeline: (timeline.wall, timeline.strategy != program.current))
+        rows.append((program, current, best, offender_flags(program, current)))
+
+    rows.sort(key=lambda row: row[1].wall - row[0].intended, reverse=True)
+
+    print(f"\n📚 {len(rows)} gerakan (urut dari selisih wall vs desain terbesar)")
+    print(f"   {'jenis':<9} {'nama':<18} {'desain':>7} {'wall':>7} {'terbaik':>16}  catatan")
+    for program, current, best, flags in rows[:top]:
+        print(f"   {program.kind:<9} {program.name[:18]:<18} {program.intended:6.2f}s "
+              f"{current.wall:6.2f}s {best.wall:6.2f}s {best.strategy:<9}  "
+              f"{'; '.join(flags) or '-'}")
+
+    offenders = [row for row in rows if row[3]]
+    print(f"\n⚠ {len(offenders)} gerakan ditandai boros")
+    for strategy in STRATEGIES:
+        print(f"   {strategy:<10} {STRATEGY_HELP[strategy]}")
+
+
+def parse_params(items: List[str]) -> Dict:
+    params = {}
+    for item in items:
+        key, _, value = item.partition('=')
+        params[key] = int(value) if value.lstrip('-').isdigit() else value
+    return params
+
+
+# Command line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analisa timing gerakan tanpa hardware")
+    parser.add_argument("kind", nargs="?", default="library",
+                        choices=["library", "pose", "gesture", "movement"])
+    parser.add_argument("name", nargs="?", help="Nama pose/gesture atau path file movement")
+    parser.add_argument("params", nargs="*", help="Parameter gesture key=value")
+    parser.add_argument("--chart", action="store_true", help="Gambar timeline per link")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    analyzer = TimingAnalyzer(ServoConfig())
+
+    if args.kind == "library":
+        print_library(analyzer, analyzer.library(), args.top)
+    elif not args.name:
+        parser.error(f"{args.kind} butuh nama")
+    elif args.kind == "pose":
+        print_report(analyzer, analyzer.pose(args.name), args.chart)
+    elif args.kind == "gesture":
+        print_report(analyzer, analyzer.gesture(args.name, **parse_params(args.params)),
+                     args.chart)
+    else:
+        print_report(analyzer, analyzer.movement(args.name), args.chart)
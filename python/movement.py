@@ -3,15 +3,135 @@ movements.py
 Library gerakan-gerakan kompleks untuk robot humanoid
 """
 
+import functools
+import threading
 import time
-from typing import List, Dict, Optional
+from typing import List, Optional, Set
 from python.serial_controller import HumanoidController
+from python.motion_arbiter import MotionArbiter, GestureHandle
+from python.gestures import GestureLibrary, MotionPlan
 
 class RobotMovements:
     """Collection of complex movements for humanoid robot"""
     
-    def __init__(self, controller: HumanoidController):
+    # Grup servo gesture Python (untuk MotionArbiter); gesture di
+    # config/gestures.json memakai grup dari motion plan-nya
+    GESTURE_GROUPS = {
+        'look_at_direction': ['head'],
+        'thinking_gesture': ['head', 'right_arm'],
+    }
+    
+    def __init__(self, controller: HumanoidController,
+                 arbiter: Optional[MotionArbiter] = None):
         self.robot = controller
+        self.arbiter = arbiter or MotionArbiter(controller.config)
+        self.gestures = GestureLibrary(controller.config)
+        # Target _move() per thread gesture, ditunggu oleh _settle()
+        self._local = threading.local()
+    
+    def gesture_names(self) -> List[str]:
+        """Semua gesture: deklaratif (gestures.json) + gesture Python"""
+        return sorted(set(self.gestures.names()) | set(self.GESTURE_GROUPS) | {'point_at'})
+    
+    def groups_for(self, gesture: str, *args, **kwargs) -> Set[str]:
+        """Grup servo yang dibutuhkan gesture dengan argumen tertentu"""
+        if gesture in self.gestures:
+            return set(self.gestures.plan(gesture, *args, **kwargs).groups)
+        
+        if gesture == 'point_at':
+            direction = kwargs.get('direction', args[0] if args else 'right')
+            if direction in ('left', 'right'):
+                return self.arbiter.groups_for_pose(f"pointing_{direction}")
+            return {'right_arm'}
+        
+        if gesture == 'thinking_gesture':
+            return self.arbiter.groups_for_pose('thinking') | {'head'}
+        
+        return set(self.GESTURE_GROUPS.get(gesture, self.arbiter.groups))
+    
+    def start(self, gesture: str, *args, policy: Optional[str] = None,
+              priority: int = 0, **kwargs) -> GestureHandle:
+        """
+        Jalankan gesture lewat arbiter (non-blocking)
+        
+        Gesture yang memakai grup servo berbeda berjalan bersamaan,
+        contoh: start('wave_hand') lalu start('nod_head').
+        
+        Returns:
+            GestureHandle, panggil .wait() untuk menunggu selesai
+        """
+        func = getattr(self, gesture, None) or functools.partial(self.perform, gesture)
+        groups = self.groups_for(gesture, *args, **kwargs)
+        return self.arbiter.submit(gesture, groups, func, *args,
+                                   policy=policy, priority=priority, **kwargs)
+    
+    def start_pose(self, pose_name: str, cue_times: Optional[List[float]] = None,
+                   policy: Optional[str] = None, priority: int = 0) -> GestureHandle:
+        """
+        Jalankan pose dari poses.json lewat arbiter (non-blocking)
+        
+        Pose memegang grup servo yang disentuhnya seperti gesture lain,
+        jadi tidak bentrok dengan gesture yang berjalan dan bisa di-preempt.
+        """
+        return self.arbiter.submit(f"pose:{pose_name}", self.arbiter.groups_for_pose(pose_name),
+                                   self._pose, pose_name, cue_times,
+                                   policy=policy, priority=priority)
+    
+    def _pose(self, pose_name: str, cue_times: Optional[List[float]] = None) -> bool:
+        """execute_pose yang berhenti jika gesture di-preempt"""
+        return self.robot.execute_pose(pose_name, cue_times=cue_times, check=self.arbiter.check)
+    
+    def _move(self, part_path: str, position: int,
+              time_ms: int = 800, delay_ms: int = 300):
+        """move_part yang berhenti jika gesture di-preempt"""
+        self.arbiter.check()
+        if not hasattr(self._local, 'targets'):
+            self._local.targets = {}
+        self._local.targets[part_path] = position
+        return self.robot.move_part(part_path, position, time_ms=time_ms, delay_ms=delay_ms)
+    
+    def _settle(self, seconds: float):
+        """
+        Tunggu gerakan dari _move() sebelumnya selesai
+        
+        Dengan telemetry aktif, selesai begitu posisi terbaca sampai target;
+        tanpa telemetry, sleep tetap `seconds` (tetap bisa di-preempt).
+        """
+        targets = getattr(self._local, 'targets', {})
+        self._local.targets = {}
+        if self.robot.telemetry is None or not targets:
+            self.arbiter.sleep(seconds)
+            return
+        
+        deadline = time.monotonic() + seconds + 1.0
+        while not self.robot.telemetry.wait_reached(targets, timeout=0.05):
+            self.arbiter.check()
+            if time.monotonic() > deadline:
+                break
+    
+    def perform(self, gesture: str, *args, **params) -> MotionPlan:
+        """
+        Jalankan gesture deklaratif dari config/gestures.json
+        
+        Plan di-compile sekali per kombinasi parameter (lihat gestures.py);
+        eksekusi hanya mengirim command yang sudah di-encode, lalu menunggu
+        `wait` tiap step lewat _settle().
+        """
+        plan = self.gestures.plan(gesture, *args, **params)
+        print(f"▶ {plan.label} {dict(plan.params)}...")
+        
+        for step in plan.steps:
+            for command in step.commands:
+                self.arbiter.check()
+                if not hasattr(self._local, 'targets'):
+                    self._local.targets = {}
+                self._local.targets[command.part] = command.position
+                self.robot.serial.send_planned(command)
+            if step.wait:
+                self._settle(step.wait)
+        
+        print(f"✓ {plan.label} complete")
+        return plan
     
     def nod_head(self, times: int = 2, speed: int = 600):
         """
@@ -21,18 +141,7 @@ class RobotMovements:
             times: Berapa kali angguk
             speed: Kecepatan gerakan (ms)
         """
-        print(f"▶ Nodding head {times} times...")
-        
-        for i in range(times):
-            # Tilt down
-            self.robot.move_part("head.tilt", 1300, time_ms=speed, delay_ms=100)
-            time.sleep((speed + 100) / 1000)
-            
-            # Tilt up
-            self.robot.move_part("head.tilt", 1500, time_ms=speed, delay_ms=100)
-            time.sleep((speed + 100) / 1000)
-        
-        print("✓ Nod complete")
+        self.perform('nod_head', times=times, speed=speed)
     
     def shake_head(self, times: int = 2, speed: int = 600):
         """
@@ -42,20 +151,7 @@ class RobotMovements:
             times: Berapa kali geleng
             speed: Kecepatan gerakan (ms)
         """
-        print(f"▶ Shaking head {times} times...")
-        
-        for i in range(times):
-            # Pan left
-            self.robot.move_part("head.pan", 1800, time_ms=speed, delay_ms=100)
-            time.sleep((speed + 100) / 1000)
-            
-            # Pan right
-            self.robot.move_part("head.pan", 1200, time_ms=speed, delay_ms=100)
-            time.sleep((speed + 100) / 1000)
-        
-        # Center
-        self.robot.move_part("head.pan", 1500, time_ms=speed, delay_ms=100)
-        print("✓ Shake complete")
+        self.perform('shake_head', times=times, speed=speed)
     
     def wave_hand(self, hand: str = "right", times: int = 3, speed: int = 400):
         """
@@ -66,43 +162,7 @@ class RobotMovements:
             times: Berapa kali lambaian
             speed: Kecepatan gerakan
         """
-        print(f"▶ Waving {hand} hand {times} times...")
-        
-        # Angkat tangan dulu
-        if hand == "right":
-            commands = [
-                {'part': 'right_arm.shoulder_pitch', 'position': 800, 'time': 1000},
-                {'part': 'right_arm.shoulder_roll', 'position': 1800, 'time': 1000},
-                {'part': 'right_arm.elbow', 'position': 1200, 'time': 1000},
-            ]
-            wrist_part = "right_arm.wrist_roll"
-        else:
-            commands = [
-                {'part': 'left_arm.shoulder_pitch', 'position': 800, 'time': 1000},
-                {'part': 'left_arm.shoulder_roll', 'position': 1200, 'time': 1000},
-                {'part': 'left_arm.elbow', 'position': 1800, 'time': 1000},
-            ]
-            wrist_part = "left_arm.wrist_roll"
-        
-        # Angkat tangan
-        for cmd in commands:
-            self.robot.move_part(cmd['part'], cmd['position'], 
-                               time_ms=cmd['time'], delay_ms=100)
-        
-        time.sleep(1.2)
-        
-        # Lambaikan
-        for i in range(times):
-            self.robot.move_part(wrist_part, 1200, time_ms=speed, delay_ms=50)
-            time.sleep((speed + 50) / 1000)
-            
-            self.robot.move_part(wrist_part, 1800, time_ms=speed, delay_ms=50)
-            time.sleep((speed + 50) / 1000)
-        
-        # Center wrist
-        self.robot.move_part(wrist_part, 1500, time_ms=speed, delay_ms=100)
-        
-        print("✓ Wave complete")
+        self.perform('wave_hand', hand=hand, times=times, speed=speed)
     
     def look_at_direction(self, direction: str, duration: float = 2.0):
         """
@@ -129,16 +189,16 @@ class RobotMovements:
         pos = positions[direction]
         
         # Move head
-        self.robot.move_part("head.pan", pos['pan'], time_ms=800, delay_ms=100)
-        self.robot.move_part("head.tilt", pos['tilt'], time_ms=800, delay_ms=100)
+        self._move("head.pan", pos['pan'], time_ms=800, delay_ms=100)
+        self._move("head.tilt", pos['tilt'], time_ms=800, delay_ms=100)
         
         # Hold position
-        time.sleep(duration)
+        self.arbiter.sleep(duration)
         
         # Return to center
         if direction != 'center':
-            self.robot.move_part("head.pan", 1500, time_ms=800, delay_ms=100)
-            self.robot.move_part("head.tilt", 1500, time_ms=800, delay_ms=100)
+            self._move("head.pan", 1500, time_ms=800, delay_ms=100)
+            self._move("head.tilt", 1500, time_ms=800, delay_ms=100)
         
         print("✓ Look complete")
     
@@ -152,9 +212,9 @@ class RobotMovements:
         print(f"▶ Pointing {direction}...")
         
         if direction == "right":
-            self.robot.execute_pose("pointing_right")
+            self._pose("pointing_right")
         elif direction == "left":
-            self.robot.execute_pose("pointing_left")
+            self._pose("pointing_left")
         elif direction == "forward":
             commands = [
                 {'part': 'right_arm.shoulder_pitch', 'position': 1500, 'time': 1000},
@@ -162,8 +222,8 @@ class RobotMovements:
                 {'part': 'right_arm.elbow', 'position': 1900, 'time': 1000},
             ]
             for cmd in commands:
-                self.robot.move_part(cmd['part'], cmd['position'], 
-                                   time_ms=cmd['time'], delay_ms=100)
+                self._move(cmd['part'], cmd['position'], 
+                           time_ms=cmd['time'], delay_ms=100)
         elif direction == "up":
             commands = [
                 {'part': 'right_arm.shoulder_pitch', 'position': 600, 'time': 1000},
@@ -171,82 +231,39 @@ class RobotMovements:
                 {'part': 'right_arm.elbow', 'position': 1900, 'time': 1000},
             ]
             for cmd in commands:
-                self.robot.move_part(cmd['part'], cmd['position'], 
-                                   time_ms=cmd['time'], delay_ms=100)
+                self._move(cmd['part'], cmd['position'], 
+                           time_ms=cmd['time'], delay_ms=100)
         
-        time.sleep(2)
+        self.arbiter.sleep(2)
         print("✓ Point complete")
     
     def cross_arms(self):
         """Menyilangkan tangan di dada"""
-        print("▶ Crossing arms...")
-        
-        commands = [
-            {'part': 'right_arm.shoulder_pitch', 'position': 1200, 'time': 1200},
-            {'part': 'right_arm.shoulder_roll', 'position': 1200, 'time': 1200},
-            {'part': 'right_arm.elbow', 'position': 1000, 'time': 1200},
-            {'part': 'left_arm.shoulder_pitch', 'position': 1200, 'time': 1200},
-            {'part': 'left_arm.shoulder_roll', 'position': 1800, 'time': 1200},
-            {'part': 'left_arm.elbow', 'position': 2000, 'time': 1200},
-        ]
-        
-        for cmd in commands:
-            self.robot.move_part(cmd['part'], cmd['position'], 
-                               time_ms=cmd['time'], delay_ms=100)
-        
-        time.sleep(1.5)
-        print("✓ Arms crossed")
+        self.perform('cross_arms')
     
     def thinking_gesture(self, duration: float = 3.0):
         """Pose berpikir dengan gerakan"""
         print("▶ Thinking gesture...")
         
         # Execute thinking pose
-        self.robot.execute_pose("thinking")
+        self._pose("thinking")
         
         # Small head movements while thinking
-        time.sleep(0.5)
+        self.arbiter.sleep(0.5)
         for _ in range(2):
-            self.robot.move_part("head.tilt", 1250, time_ms=800, delay_ms=100)
-            time.sleep(0.9)
-            self.robot.move_part("head.tilt", 1350, time_ms=800, delay_ms=100)
-            time.sleep(0.9)
+            self._move("head.tilt", 1250, time_ms=800, delay_ms=100)
+            self._settle(0.9)
+            self._move("head.tilt", 1350, time_ms=800, delay_ms=100)
+            self._settle(0.9)
         
         # Back to neutral
-        self.robot.move_part("head.tilt", 1500, time_ms=800, delay_ms=100)
+        self._move("head.tilt", 1500, time_ms=800, delay_ms=100)
         
         print("✓ Thinking complete")
     
     def celebrate(self):
         """Gerakan merayakan/celebrate"""
-        print("▶ Celebrating!")
-        
-        # Raise both arms
-        commands = [
-            {'part': 'right_arm.shoulder_pitch', 'position': 600, 'time': 800},
-            {'part': 'right_arm.shoulder_roll', 'position': 2000, 'time': 800},
-            {'part': 'left_arm.shoulder_pitch', 'position': 600, 'time': 800},
-            {'part': 'left_arm.shoulder_roll', 'position': 1000, 'time': 800},
-            {'part': 'head.tilt', 'position': 1600, 'time': 800},
-        ]
-        
-        for cmd in commands:
-            self.robot.move_part(cmd['part'], cmd['position'], 
-                               time_ms=cmd['time'], delay_ms=50)
-        
-        time.sleep(1)
-        
-        # Wave arms
-        for _ in range(2):
-            self.robot.move_part("right_arm.shoulder_roll", 2200, time_ms=400, delay_ms=50)
-            self.robot.move_part("left_arm.shoulder_roll", 800, time_ms=400, delay_ms=50)
-            time.sleep(0.5)
-            
-            self.robot.move_part("right_arm.shoulder_roll", 1800, time_ms=400, delay_ms=50)
-            self.robot.move_part("left_arm.shoulder_roll", 1200, time_ms=400, delay_ms=50)
-            time.sleep(0.5)
-        
-        print("✓ Celebration complete!")
+        self.perform('celebrate')
 
 
 # Test program
@@ -0,0 +1,246 @@
+"""
+pose_blend.py
+Blending beberapa pose dengan bobot (contoh 70% greeting + 30% attention)
+dan skala intensitas emosi, dihitung sebagai operasi NumPy atas tabel servo
+"""
+
+import argparse
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from python.motion_process import FRAME_DTYPE, KIND_MOVE
+from python.serial_controller import PRIORITY_NORMAL, HumanoidController
+from python.servo_config import ServoConfig
+
+BASE_POSE = 'home'
+
+# Intensitas dari text: dasar + tambahan per tanda seru / kata kapital
+BASE_INTENSITY = 0.6
+INTENSITY_STEP = 0.15
+
+
+class PoseBlender:
+    """
+    Tabel semua pose sebagai matrix offset (pose x servo) terhadap pose dasar
+
+    blend(weights, intensity):
+        target = base + intensity * sum_i(w_i * m_i * offset_i) / sum_i(w_i * m_i)
+        lalu di-clip ke min/max servo, semua dalam satu pass
+
+    m_i = servo disebut di pose i. Servo yang tidak disebut sebuah pose tidak
+    ditarik ke posisi dasar oleh pose itu; servo yang tidak disebut pose mana
+    pun tetap di posisi dasar. Pose `sequence` diwakili posisi akhirnya.
+    Time/delay tiap servo di-blend dengan bobot yang sama.
+    """
+
+    def __init__(self, config: ServoConfig, base_pose: str = BASE_POSE):
+        self.config = config
+
+        # Tabel servo: satu kolom per part
+        self.parts: List[str] = []
+        controller, channel, center, low, high = [], [], [], [], []
+        for category, servos in config.servo_mapping.items():
+            for servo, info in servos.items():
+                self.parts.append(f"{category}.{servo}")
+                controller.append(ord(info['controller']))
+                channel.append(info['channel'])
+                center.append(info.get('center', 1500))
+                low.append(max(info.get('min', 500), 500))
+                high.append(min(info.get('max', 2500), 2500))
+        self.index = {part: i for i, part in enumerate(self.parts)}
+        self.controller = np.array(controller, dtype=np.uint8)
+        self.channel = np.array(channel, dtype=np.uint16)
+        self.low = np.array(low, dtype=np.float32)
+        self.high = np.array(high, dtype=np.float32)
+
+        # Tabel pose: posisi akhir tiap pose + mask servo yang disebut
+        self.poses: List[str] = config.list_poses()
+        self.pose_index = {name: i for i, name in enumerate(self.poses)}
+        targets = np.zeros((len(self.poses), len(self.parts)), dtype=np.float32)
+        times = np.zeros_like(targets)
+        delays = np.zeros_like(targets)
+        mask = np.zeros_like(targets, dtype=bool)
+        for row, name in enumerate(self.poses):
+            for part, (position, time_ms, delay_ms) in self._final_moves(config.get_pose(name)).items():
+                if part in self.index:
+                    column = self.index[part]
+                    targets[row, column] = position
+                    times[row, column] = time_ms
+                    delays[row, column] = delay_ms
+                    mask[row, column] = True
+
+        self.base = np.array(center, dtype=np.float32)
+        if base_pose in self.pose_index:
+            row = self.pose_index[base_pose]
+            self.base = np.where(mask[row], targets[row], self.base)
+
+        self.mask = mask.astype(np.float32)
+        self.offsets = np.where(mask, targets - self.base, 0).astype(np.float32)
+        self.times = times
+        self.delays = delays
+
+    @staticmethod
+    def _final_moves(pose: Dict) -> Dict[str, Tuple[int, int, int]]:
+        """{part: (posisi, time, delay)} terakhir, default sama dengan execute_pose"""
+        if 'sequence' in pose:
+            return {move['part']: (move['position'], move.get('time', 800), 0)
+                    for step in pose['sequence'] for move in step.get('servos', [])}
+        return {move['part']: (move['position'], move.get('time', 800), move.get('delay', 300))
+                for move in pose.get('servos', [])}
+
+    # ---------- Bobot ----------
+    def weight_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        vector = np.zeros(len(self.poses), dtype=np.float32)
+        for name, weight in weights.items():
+            if name not in self.pose_index:
+                raise ValueError(f"Pose '{name}' tidak ditemukan")
+            vector[self.pose_index[name]] = weight
+        return vector
+
+    # ---------- Blend ----------
+    def blend_frames(self, weights: np.ndarray, intensity: np.ndarray) -> np.ndarray:
+        """
+        Blend banyak frame sekaligus
+
+        Args:
+            weights: (frame x pose) bobot tiap pose per frame
+            intensity: (frame,) skala offset terhadap pose dasar
+
+        Returns:
+            (frame x servo) posisi uint16, sudah di-clip ke limit servo
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float32))
+        intensity = np.asarray(intensity, dtype=np.float32).reshape(-1, 1)
+
+        total = weights @ self.mask
+        offset = weights @ self.offsets
+        np.divide(offset, total, out=offset, where=total > 0)
+
+        positions = self.base + intensity * offset
+        np.clip(positions, self.low, self.high, out=positions)
+        return np.rint(positions).astype(np.uint16)
+
+    def blend(self, weights: Dict[str, float], intensity: float = 1.0) -> np.ndarray:
+        """Blend satu frame; hasil (servo,) posisi uint16"""
+        return self.blend_frames(self.weight_vector(weights), intensity)[0]
+
+    def active(self, weights: Dict[str, float]) -> np.ndarray:
+        """Mask servo yang disebut oleh pose berbobot > 0"""
+        return (self.weight_vector(weights) > 0) @ self.mask > 0
+
+    def active_parts(self, weights: Dict[str, float]) -> List[str]:
+        """Nama part yang digerakkan blend (untuk grup MotionArbiter)"""
+        return [self.parts[i] for i in np.flatnonzero(self.active(weights))]
+
+    def timings(self, weights: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """(time, delay) ms per servo: rata-rata berbobot dari pose yang menyebutnya"""
+        vector = self.weight_vector(weights)
+        total = vector @ self.mask
+        times = vector @ (self.mask * self.times)
+        delays = vector @ (self.mask * self.delays)
+        np.divide(times, total, out=times, where=total > 0)
+        np.divide(delays, total, out=delays, where=total > 0)
+        return np.rint(times).astype(int), np.rint(delays).astype(int)
+
+    def targets(self, weights: Dict[str, float], intensity: float = 1.0) -> Dict[str, int]:
+        """{part: posisi} untuk servo yang disebut pose-pose di `weights`"""
+        positions = self.blend(weights, intensity)
+        return {self.parts[i]: int(positions[i]) for i in np.flatnonzero(self.active(weights))}
+
+    # ---------- Kirim ----------
+    def execute(self, controller: HumanoidController, weights: Dict[str, float],
+                intensity: float = 1.0, time_ms: Optional[int] = None,
+                priority: int = PRIORITY_NORMAL,
+                check: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Gerakkan robot ke hasil blend (single-step, seperti execute_pose)
+
+        Args:
+            time_ms: Paksa satu durasi untuk semua servo (None = time/delay pose)
+            check: Dipanggil sebelum kirim (MotionArbiter.check untuk preempt)
+        """
+        positions = self.blend(weights, intensity)
+        times, delays = self.timings(weights)
+        commands = [{
+            'controller': chr(self.controller[i]),
+            'channel': int(self.channel[i]),
+            'position': int(positions[i]),
+            'time': int(times[i]) if time_ms is None else time_ms,
+            'delay': int(delays[i]) if time_ms is None else 0,
+        } for i in np.flatnonzero(self.active(weights))]
+        if check is not None:
+            check()
+        return controller.serial.send_multiple(commands, priority)
+
+    def encode_frames(self, positions: np.ndarray, t_due: np.ndarray,
+                      time_ms: Optional[int] = None,
+                      priority: int = PRIORITY_NORMAL) -> np.ndarray:
+        """
+        Hasil blend_frames -> FRAME_DTYPE untuk MotionProcess.submit_frames
+
+        Hanya servo yang posisinya berubah dari frame sebelumnya yang dikirim
+        (frame pertama: semua servo). time_ms default = jarak antar frame.
+        """
+        positions = np.atleast_2d(positions)
+        t_due = np.asarray(t_due, dtype=np.float64)
+
+        changed = np.ones_like(positions, dtype=bool)
+        changed[1:] = positions[1:] != positions[:-1]
+        rows, columns = np.nonzero(changed)
+
+        if time_ms is None:
+            period = np.diff(t_due).mean() if len(t_due) > 1 else 0.02
+            time_ms = int(round(period * 1000))
+
+        frames = np.zeros(len(rows), dtype=FRAME_DTYPE)
+        frames['kind'] = KIND_MOVE
+        frames['controller'] = self.controller[columns]
+        frames['channel'] = self.channel[columns]
+        frames['priority'] = priority
+        frames['position'] = positions[rows, columns]
+        frames['time_ms'] = time_ms
+        frames['t_due'] = t_due[rows]
+        return frames
+
+
+def estimate_intensity(text: str) -> float:
+    """Intensitas emosi 0..1 dari tanda seru dan kata kapital (tanpa LLM)"""
+    exclamations = text.count('!')
+    shouted = len(re.findall(r'\b[A-Z]{3,}\b', text))
+    return min(1.0, BASE_INTENSITY + INTENSITY_STEP * (exclamations + shouted))
+
+
+# Test program
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blend pose dengan bobot")
+    parser.add_argument("weights", nargs="*", default=["greeting=0.7", "attention=0.3"],
+                        help="pose=bobot, contoh greeting=0.7 attention=0.3")
+    parser.add_argument("--intensity", type=float, default=1.0)
+    parser.add_argument("--frames", type=int, default=10000, help="Jumlah frame benchmark")
+    args = parser.parse_args()
+
+    blender = PoseBlender(ServoConfig())
+    weights = {item.split('=')[0]: float(item.split('=')[1]) for item in args.weights}
+
+    print(f"Blend {weights} x {args.intensity:g}:")
+    for part, position in blender.targets(weights, args.intensity).items():
+        print(f"  {part:<28} {position}")
+
+    # Benchmark: satu frame per panggilan vs banyak frame dalam satu pass
+    vector = blender.weight_vector(weights)
+    start = time.perf_counter()
+    for _ in range(1000):
+        blender.blend_frames(vector, args.intensity)
+    single = (time.perf_counter() - start) / 1000
+
+    ramp = np.linspace(0, 1, args.frames, dtype=np.float32)
+    start = time.perf_counter()
+    blended = blender.blend_frames(np.outer(np.ones(args.frames), vector), ramp)
+    batch = time.perf_counter() - start
+
+    frames = blender.encode_frames(blended, time.monotonic() + ramp * args.frames / 50)
+    print(f"\n⏱ 1 frame: {single * 1e6:.1f} us | {args.frames} frame: {batch * 1000:.2f} ms "
+          f"({batch / args.frames * 1e6:.2f} us/frame) | {len(frames)} command setelah dedup")
@@ -0,0 +1,177 @@
+"""
+script_annotator.py
+Anotasi script show secara offline: emotion + pose tiap baris diklasifikasi
+lewat request Ollama batch dengan concurrency terbatas, hasilnya disimpan
+sebagai JSON yang bisa diputar main.py tanpa panggilan LLM
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from python.tts_ollama import OllamaTTS
+
+DEFAULT_BATCH = 8
+DEFAULT_CONCURRENCY = 4
+DEFAULT_POSE = 'attention'
+
+
+def load_script(path: str) -> List[Dict]:
+    """
+    Baca script show
+
+    .txt : satu ucapan per baris (baris kosong dan '#' diabaikan)
+    .json: list string / {"speech", "pose"?, "emotion"?}, atau {"script": [...]}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if not path.endswith('.json'):
+            return [{'speech': line.strip()} for line in f
+                    if line.strip() and not line.lstrip().startswith('#')]
+        data = json.load(f)
+
+    lines = data.get('script', []) if isinstance(data, dict) else data
+    return [{'speech': line} if isinstance(line, str) else dict(line) for line in lines]
+
+
+def is_annotated(lines: List[Dict]) -> bool:
+    return all('emotion' in line and 'pose' in line for line in lines)
+
+
+class ScriptAnnotator:
+    """
+    Klasifikasi emotion semua baris script
+
+    Baris dikelompokkan per `batch_size` (satu request Ollama per batch),
+    paling banyak `concurrency` request berjalan bersamaan. Baris yang tidak
+    terjawab di jawaban batch diulang satu per satu dengan analyze_emotion.
+    Pose diambil dari emotion_to_pose; pose/emotion yang sudah ada di script
+    tidak ditimpa.
+    """
+
+    def __init__(self, tts: OllamaTTS, emotion_to_pose: Dict[str, str],
+                 batch_size: int = DEFAULT_BATCH, concurrency: int = DEFAULT_CONCURRENCY):
+        self.tts = tts
+        self.emotion_to_pose = emotion_to_pose
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+
+        # Statistik run terakhir
+        self.requests = 0
+        self.fallbacks = 0
+        self.elapsed = 0.0
+
+    def _classify(self, texts: List[str]) -> Tuple[List[str], int]:
+        """Emotion satu batch + jumlah baris yang perlu fallback"""
+        if len(texts) == 1:
+            return [self.tts.analyze_emotion(texts[0])], 0
+
+        emotions = self.tts.analyze_emotions(texts)
+        missing = [i for i, emotion in enumerate(emotions) if emotion is None]
+        for i in missing:
+            emotions[i] = self.tts.analyze_emotion(texts[i])
+        return emotions, len(missing)
+
+    def annotate(self, lines: List[Dict]) -> List[Dict]:
+        """Kembalikan copy `lines` dengan 'emotion' dan 'pose' terisi"""
+        self.requests = self.fallbacks = 0
+        start = time.time()
+
+        annotated = [dict(line) for line in lines]
+        todo = [i for i, line in enumerate(annotated) if 'emotion' not in line]
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="annotate") as executor:
+            results = executor.map(
+                lambda batch: self._classify([annotated[i]['speech'] for i in batch]), batches)
+            for batch, (emotions, missing) in zip(batches, results):
+                for i, emotion in zip(batch, emotions):
+                    annotated[i]['emotion'] = emotion
+                self.requests += 1 + missing
+                self.fallbacks += missing
+
+        for line in annotated:
+            line.setdefault('pose', self.emotion_to_pose.get(line['emotion'], DEFAULT_POSE))
+
+        self.elapsed = time.time() - start
+        return annotated
+
+    def report(self, lines: int):
+        rate = lines / self.elapsed if self.elapsed > 0 else float('inf')
+        print(f"⏱ Anotasi {lines} baris: {self.elapsed:.2f}s ({rate:.1f} baris/s), "
+              f"{self.requests} request (fallback {self.fallbacks}), "
+              f"batch {self.batch_size} x concurrency {self.concurrency}")
+
+
+def save_annotated(path: str, lines: List[Dict], model: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'model': model, 'annotated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                   'script': lines}, f, indent=2, ensure_ascii=False)
+
+
+def annotated_path(path: str) -> str:
+    """data/scripts/show.txt -> data/scripts/show.annotated.json"""
+    return os.path.splitext(path)[0] + '.annotated.json'
+
+
+def annotate_file(path: str, tts: OllamaTTS, emotion_to_pose: Dict[str, str],
+                  output: Optional[str] = None, batch_size: int = DEFAULT_BATCH,
+                  concurrency: int = DEFAULT_CONCURRENCY) -> Tuple[str, List[Dict]]:
+    """Anotasi satu file script; mengembalikan (path output, baris teranotasi)"""
+    lines = load_script(path)
+    annotator = ScriptAnnotator(tts, emotion_to_pose, batch_size, concurrency)
+    annotated = annotator.annotate(lines)
+    annotator.report(len(lines))
+
+    output = output or annotated_path(path)
+    save_annotated(output, annotated, tts.model)
+    print(f"✓ Script teranotasi disimpan: {output}")
+    return output, annotated
+
+
+# Command line: anotasi offline sebelum show
+if __name__ == "__main__":
+    from python.mock_ollama import MockOllamaServer
+    from python.tts_ollama import RobotSpeaker
+
+    parser = argparse.ArgumentParser(description="Anotasi emotion/pose script show")
+    parser.add_argument("script", help="File .txt (satu ucapan per baris) atau .json")
+    parser.add_argument("-o", "--output", help="Default: <script>.annotated.json")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--model", default="llama2")
+    parser.add_argument("--url", default="http://localhost:11434")
+    parser.add_argument("--mock", action="store_true",
+                        help="Pakai MockOllamaServer (bandingkan juga dengan per-baris serial)")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(seed=1).start() if args.mock else None
+    url = server.url if server else args.url
+    speaker = RobotSpeaker(model=args.model, ollama_url=url)
+
+    try:
+        if not speaker.tts.available:
+            raise SystemExit("✗ Ollama tidak tersedia")
+
+        if args.mock:
+            print("\nBaseline: satu request per baris, berurutan")
+            baseline = ScriptAnnotator(speaker.tts, speaker.emotion_to_pose,
+                                       batch_size=1, concurrency=1)
+            lines = load_script(args.script)
+            baseline.annotate(lines)
+            baseline.report(len(lines))
+            print()
+
+        _, annotated = annotate_file(args.script, speaker.tts, speaker.emotion_to_pose,
+                                     args.output, args.batch, args.concurrency)
+        for line in annotated:
+            print(f"  {line['emotion']:<9} {line['pose']:<12} {line['speech']}")
+    finally:
+        speaker.tts.engine.close()
+        if server:
+            server.stop()
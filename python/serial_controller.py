@@ -3,27 +3,522 @@ serial_controller.py
 Mengelola komunikasi serial dengan kedua Arduino ATX2
 """
 
+import itertools
+import queue
 import serial
+import threading
 import time
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from python import tracing
+from python import frame_protocol
 from python.servo_config import ServoConfig
+from python.sim_serial import SimulatedSerial
+
+# Prioritas command (angka kecil diproses lebih dulu)
+PRIORITY_STOP = 0
+PRIORITY_HOME = 1
+PRIORITY_QUERY = 2
+PRIORITY_NORMAL = 5
+
+STOP_COMMAND = b"!S\n"
+STOP_TIMEOUT = 0.5  # Batas waktu menunggu "STOPPED" dari firmware (detik)
+
+QUERY_COMMAND = b"?\n"
+QUERY_TIMEOUT = 0.2
+QUERY_MAX_FAILURES = 3  # Telemetry dimatikan setelah sekian query gagal berturut-turut
+
+COMMAND_TIMEOUT_MARGIN = 2  # Batas tunggu DONE = T + D + margin (detik)
+FRAME_RETRIES = 3           # Kirim ulang frame (NAK / ACK hilang) sebelum menyerah
+
+CUE_POLL = 0.05  # Interval cek pembatalan selagi pose menunggu cue (detik)
+
+
+class PendingCommand:
+    """Command di antrian ControllerLink beserta hasilnya"""
+    
+    def __init__(self, data: bytes, timeout: float, priority: int, expect: str = "DONE"):
+        self.data = data
+        self.timeout = timeout
+        self.priority = priority
+        self.expect = expect
+        
+        self.success = False
+        self.t_submit = time.monotonic()
+        self.t_sent: Optional[float] = None
+        self.t_complete: Optional[float] = None
+        self._done = threading.Event()
+    
+    def complete(self, success: bool):
+        self.success = success
+        self.t_complete = time.monotonic()
+        self._done.set()
+    
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._done.wait(timeout)
+        return self.success
+
+
+class ControllerLink:
+    """
+    Pemilik tunggal satu port serial
+    
+    Command dari banyak thread masuk ke PriorityQueue dan dikirim satu per
+    satu oleh worker thread. Command stop melompati antrian: transaksi yang
+    sedang menunggu DONE langsung dilepas dan firmware menerima "!S".
+    
+    Jika telemetry aktif, worker juga mengirim "?" setiap `interval`, baik
+    saat idle maupun di tengah transaksi (firmware menjawab "?" selagi
+    menunggu OK), dan meneruskan frame POS ke callback.
+    """
+    
+    protocol = 'ascii'
+    stop_command = STOP_COMMAND
+    query_command = QUERY_COMMAND
+    
+    def __init__(self, name: str, ser):
+        self.name = name
+        self.ser = ser
+        self.queue: queue.PriorityQueue = queue.PriorityQueue()
+        self.stop_latencies: List[float] = []
+        
+        # Telemetry posisi (lihat telemetry.py)
+        self.telemetry_interval: Optional[float] = None
+        self.on_positions: Optional[Callable[[str, float, np.ndarray], None]] = None
+        self._next_query = 0.0
+        self._query_failures = 0
+        
+        self._seq = itertools.count()
+        self._preempt = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name=f"link-{name}", daemon=True)
+        self._thread.start()
+    
+    def submit(self, data: bytes, timeout: float,
+               priority: int = PRIORITY_NORMAL, expect: str = "DONE") -> PendingCommand:
+        """Masukkan command ke antrian (non-blocking)"""
+        cmd = PendingCommand(data, timeout, priority, expect)
+        self.queue.put((priority, next(self._seq), cmd))
+        return cmd
+    
+    def query(self) -> PendingCommand:
+        """Minta satu frame posisi; frame dikirim ke on_positions"""
+        return self.submit(self.query_command, QUERY_TIMEOUT, PRIORITY_QUERY, expect="POS")
+    
+    def encode_move(self, channel: int, position: int, time_ms: int, delay_ms: int) -> bytes:
+        """Format command: #<ch>P<pos>T<time>D<delay>"""
+        return f"#{channel}P{position}T{time_ms}D{delay_ms}\n".encode('utf-8')
+    
+    def enable_telemetry(self, interval: float,
+                         callback: Callable[[str, float, np.ndarray], None]):
+        """Query posisi setiap `interval` detik; callback(name, t_monotonic, posisi)"""
+        self.on_positions = callback
+        self.telemetry_interval = interval
+        self._query_failures = 0
+        # Membangunkan worker yang sedang menunggu antrian tanpa batas waktu
+        self.query()
+    
+    def disable_telemetry(self):
+        self.telemetry_interval = None
+    
+    def flush(self) -> int:
+        """Batalkan semua command yang belum terkirim"""
+        dropped = 0
+        while True:
+            try:
+                _, _, cmd = self.queue.get_nowait()
+            except queue.Empty:
+                return dropped
+            if cmd is None:
+                # Sentinel close harus tetap sampai ke worker
+                self.queue.put((-1, next(self._seq), None))
+                return dropped
+            cmd.complete(False)
+            dropped += 1
+    
+    def stop(self, timeout: float = STOP_TIMEOUT) -> Optional[float]:
+        """
+        Emergency stop: buang antrian, potong transaksi aktif, kirim "!S"
+        
+        Returns:
+            Latency sampai firmware menjawab STOPPED (detik), None jika timeout
+        """
+        start = time.monotonic()
+        self.flush()
+        
+        cmd = PendingCommand(self.stop_command, timeout, PRIORITY_STOP, expect="STOPPED")
+        self._preempt.set()
+        self.queue.put((PRIORITY_STOP, next(self._seq), cmd))
+        
+        if not cmd.wait(timeout + 0.5):
+            return None
+        
+        latency = cmd.t_complete - start
+        self.stop_latencies.append(latency)
+        return latency
+    
+    def close(self):
+        self.flush()
+        self._preempt.set()
+        self.queue.put((-1, next(self._seq), None))
+        self._thread.join(timeout=1)
+    
+    def _worker(self):
+        while True:
+            try:
+                _, _, cmd = self.queue.get(timeout=self._until_query())
+            except queue.Empty:
+                # Idle dan telemetry jatuh tempo
+                cmd = PendingCommand(self.query_command, QUERY_TIMEOUT, PRIORITY_QUERY,
+                                     expect="POS")
+            
+            if cmd is None:
+                return
+            
+            if cmd.priority == PRIORITY_STOP:
+                self._preempt.clear()
+            
+            try:
+                cmd.complete(self._transact(cmd))
+            except Exception as e:
+                print(f"✗ Error mengirim command: {e}")
+                cmd.complete(False)
+            
+            if cmd.expect == "POS":
+                self._check_query(cmd.success)
+    
+    def _until_query(self) -> Optional[float]:
+        if self.telemetry_interval is None:
+            return None
+        return max(0.0, self._next_query - time.monotonic())
+    
+    def _check_query(self, success: bool):
+        """Firmware lama menjawab "?" dengan ERROR; hentikan polling daripada spam"""
+        self._query_failures = 0 if success else self._query_failures + 1
+        if self._query_failures >= QUERY_MAX_FAILURES and self.telemetry_interval is not None:
+            self.telemetry_interval = None
+            tracing.log("warning", f"⚠ {self.name}: tidak ada jawaban POS, telemetry dimatikan")
+    
+    def _send_query(self):
+        self._next_query = time.monotonic() + (self.telemetry_interval or 0.0)
+        self.ser.write(QUERY_COMMAND)
+    
+    def _take_positions(self, response: str) -> Tuple[str, bool]:
+        """
+        Ambil baris POS lengkap dari response dan teruskan ke on_positions
+        
+        Returns:
+            (response tanpa baris POS, True jika ada frame POS)
+        """
+        if "POS" not in response:
+            return response, False
+        
+        lines = response.split("\n")
+        kept = []
+        found = False
+        for line in lines[:-1]:
+            fields = line.split()
+            if len(fields) == 4 and fields[1] == "POS":
+                found = True
+                hex_positions = fields[3]
+                positions = np.array([int(hex_positions[i:i + 3], 16)
+                                      for i in range(0, len(hex_positions), 3)], dtype=np.uint16)
+                if self.on_positions is not None:
+                    self.on_positions(self.name, time.monotonic(), positions)
+            else:
+                kept.append(line)
+        
+        # Baris terakhir belum lengkap, simpan untuk pembacaan berikutnya
+        kept.append(lines[-1])
+        return "\n".join(kept), found
+    
+    def _transact(self, cmd: PendingCommand) -> bool:
+        """Kirim satu command dan tunggu response yang diharapkan"""
+        controller = self.name[-1]
+        
+        with tracing.span("serial.command", controller=controller, protocol=self.protocol) as span:
+            cmd.t_sent = time.monotonic()
+            status, response = self._exchange(cmd)
+            span.set(status=status)
+        
+        if status == "error":
+            tracing.log("error", f"✗ Arduino error: {response.strip()}")
+        elif status == "timeout":
+            tracing.log("warning", f"⚠ Timeout menunggu response dari {controller}")
+        
+        if tracing.enabled():
+            tracing.count("serial_commands_total", controller=controller, status=status)
+            tracing.count("serial_bytes_total", len(cmd.data), controller=controller, direction="tx")
+            tracing.count("serial_bytes_total", len(response), controller=controller, direction="rx")
+            tracing.observe("serial_queue_seconds", cmd.t_sent - cmd.t_submit, controller=controller)
+            if status == "ok":
+                tracing.observe("serial_ack_seconds", time.monotonic() - cmd.t_sent,
+                                controller=controller)
+            elif status == "timeout":
+                tracing.count("serial_timeouts_total", controller=controller)
+        
+        return status == "ok"
+    
+    def _exchange(self, cmd: PendingCommand) -> Tuple[str, str]:
+        """Tulis command ke port lalu tunggu response (lihat _wait_response)"""
+        if cmd.expect == "POS":
+            # Frame lama dari query di tengah transaksi sebelumnya dibaca dulu
+            waiting = self.ser.in_waiting
+            if waiting:
+                self._take_positions(self.ser.read(waiting).decode('utf-8', errors='ignore'))
+            self._send_query()
+        else:
+            self.ser.write(cmd.data)
+        return self._wait_response(cmd)
+    
+    def _wait_response(self, cmd: PendingCommand) -> Tuple[str, str]:
+        """
+        Tunggu response yang diharapkan
+        
+        Returns:
+            (status, response) dengan status 'ok', 'error', 'preempted' atau 'timeout'
+        """
+        deadline = time.monotonic() + cmd.timeout
+        response = ""
+        
+        while time.monotonic() < deadline:
+            # Ada stop di antrian: lepas transaksi ini, firmware akan menjawab
+            # STOPPED (bukan DONE) ke command stop berikutnya
+            if cmd.priority != PRIORITY_STOP and self._preempt.is_set():
+                return "preempted", response
+            
+            # Query telemetry di tengah transaksi panjang
+            if (self.telemetry_interval is not None and cmd.expect != "POS"
+                    and time.monotonic() >= self._next_query):
+                self._send_query()
+            
+            waiting = self.ser.in_waiting
+            if waiting > 0:
+                response += self.ser.read(waiting).decode('utf-8', errors='ignore')
+                response, got_positions = self._take_positions(response)
+                
+                if cmd.expect == "POS":
+                    if got_positions:
+                        return "ok", response
+                    if "ERROR" in response:
+                        return "error", response
+                elif cmd.expect in response:
+                    return "ok", response
+                elif cmd.expect == "DONE" and "ERROR" in response:
+                    return "error", response
+            else:
+                self._preempt.wait(0.002)
+        
+        return "timeout", response
+
+
+class FrameLink(ControllerLink):
+    """
+    ControllerLink dengan protocol frame binary (lihat frame_protocol.py)
+    
+    Data PendingCommand berisi type + payload; seq dan CRC ditambahkan saat
+    frame dikirim. Frame yang di-NAK, atau yang jawaban pertamanya tidak
+    datang, dikirim ulang (maksimal FRAME_RETRIES kali; firmware membuang
+    duplikat seq). Jawaban yang rusak atau hilang setelah ACK diminta ulang
+    dengan FRAME_RESEND, gerakan tidak diulang.
+    """
+    
+    protocol = 'binary'
+    stop_command = bytes((frame_protocol.FRAME_STOP,))
+    query_command = bytes((frame_protocol.FRAME_QUERY,))
+    
+    REPLIES = {
+        "DONE": frame_protocol.FRAME_DONE,
+        "STOPPED": frame_protocol.FRAME_STOPPED,
+        "POS": frame_protocol.FRAME_POS,
+    }
+    # Perkiraan panjang jawaban pertama (ACK / STOPPED / POS terpanjang)
+    FIRST_REPLY_BYTES = {
+        "DONE": frame_protocol.OVERHEAD,
+        "STOPPED": frame_protocol.OVERHEAD,
+        "POS": frame_protocol.OVERHEAD + frame_protocol.MAX_PAYLOAD,
+    }
+    RESEND_INTERVAL = 0.1
+    
+    def __init__(self, name: str, ser):
+        self.decoder = frame_protocol.FrameDecoder()
+        self.retransmits = 0
+        self.resends = 0
+        self._next_seq = 0
+        super().__init__(name, ser)
+    
+    @property
+    def crc_errors(self) -> int:
+        return self.decoder.crc_errors
+    
+    def encode_move(self, channel: int, position: int, time_ms: int, delay_ms: int) -> bytes:
+        return self.encode_moves([(channel, position, time_ms, delay_ms)])
+    
+    def encode_moves(self, moves: List[Tuple[int, int, int, int]]) -> bytes:
+        """Beberapa gerakan dalam satu frame (DONE setelah gerakan terakhir)"""
+        return bytes((frame_protocol.FRAME_MOVES,)) + frame_protocol.pack_moves(moves)
+    
+    def _next_frame_seq(self) -> int:
+        self._next_seq = (self._next_seq + 1) & 0xFF
+        return self._next_seq
+    
+    def _send_query(self):
+        self._next_query = time.monotonic() + (self.telemetry_interval or 0.0)
+        self.ser.write(frame_protocol.encode_frame(self._next_frame_seq(), frame_protocol.FRAME_QUERY))
+    
+    def _first_reply_timeout(self, frame: bytes, expect: str) -> float:
+        """Waktu kirim frame + jawaban pertama pada baudrate port + ACK_GRACE"""
+        baudrate = getattr(self.ser, 'baudrate', None) or 115200
+        size = len(frame) + self.FIRST_REPLY_BYTES[expect]
+        return size * 10 / baudrate + frame_protocol.ACK_GRACE
+    
+    def _exchange(self, cmd: PendingCommand) -> Tuple[str, str]:
+        seq = self._next_frame_seq()
+        kind = cmd.data[0]
+        frame = frame_protocol.encode_frame(seq, kind, cmd.data[1:])
+        reply_kind = self.REPLIES[cmd.expect]
+        self.ser.write(frame)
+        if cmd.expect == "POS":
+            self._next_query = cmd.t_sent + (self.telemetry_interval or 0.0)
+        
+        deadline = cmd.t_sent + cmd.timeout
+        first_deadline = cmd.t_sent + self._first_reply_timeout(frame, cmd.expect)
+        resend_at = None
+        attempts = 0
+        
+        while time.monotonic() < deadline:
+            if cmd.priority != PRIORITY_STOP and self._preempt.is_set():
+                return "preempted", ""
+            
+            if (self.telemetry_interval is not None and cmd.expect != "POS"
+                    and time.monotonic() >= self._next_query):
+                self._send_query()
+            
+            retransmit = False
+            corrupted = False
+            waiting = self.ser.in_waiting
+            if waiting:
+                for reply in self.decoder.feed(self.ser.read(waiting)):
+                    if not reply.ok:
+                        corrupted = True
+                    elif reply.kind == frame_protocol.FRAME_POS:
+                        _, positions = frame_protocol.unpack_positions(reply.payload)
+                        if self.on_positions is not None:
+                            self.on_positions(self.name, time.monotonic(), positions)
+                        if reply_kind == frame_protocol.FRAME_POS and reply.seq == seq:
+                            return "ok", ""
+                    elif reply.kind == frame_protocol.FRAME_NAK:
+                        # seq pada NAK diambil dari frame yang rusak, jadi tidak dicocokkan
+                        retransmit = resend_at is None
+                    elif reply.seq != seq:
+                        continue  # Jawaban frame sebelumnya (duplikat / terlambat)
+                    elif reply.kind == frame_protocol.FRAME_ACK:
+                        # Jawaban akhir diharapkan T + D setelah ACK
+                        resend_at = (time.monotonic() + frame_protocol.ACK_GRACE
+                                     + max(0.0, cmd.timeout - COMMAND_TIMEOUT_MARGIN))
+                    elif reply.kind == reply_kind:
+                        if reply.payload[:1] == b"\x01":
+                            tracing.log("warning", f"⚠ {self.name}: No OK response dari servo controller")
+                        return "ok", ""
+                    elif reply.kind == frame_protocol.FRAME_ERROR:
+                        code = reply.payload[0] if reply.payload else 0
+                        return "error", frame_protocol.ERRORS.get(code, f"kode {code}")
+            
+            now = time.monotonic()
+            if corrupted and resend_at is None:
+                # ACK/NAK (atau jawaban stop/query) rusak: kirim ulang frame
+                retransmit = True
+            elif corrupted or (resend_at is not None and now >= resend_at):
+                self.resends += 1
+                self.ser.write(frame_protocol.encode_frame(seq, frame_protocol.FRAME_RESEND))
+                resend_at = now + self.RESEND_INTERVAL
+            elif resend_at is None and now >= first_deadline:
+                retransmit = True
+            
+            if retransmit:
+                attempts += 1
+                if attempts > FRAME_RETRIES:
+                    return "error", f"Frame seq {seq} gagal setelah {FRAME_RETRIES} kirim ulang"
+                self.retransmits += 1
+                if tracing.enabled():
+                    tracing.count("serial_retransmits_total", controller=self.name[-1])
+                self.ser.write(frame)
+                first_deadline = now + self._first_reply_timeout(frame, cmd.expect)
+            elif not waiting:
+                self._preempt.wait(0.002)
+        
+        return "timeout", ""
+
 
 class SerialController:
-    def __init__(self, config: ServoConfig):
+    def __init__(self, config: ServoConfig, simulate: bool = False,
+                 protocol: Optional[str] = None):
         self.config = config
+        self.simulate = simulate
+        
+        # 'ascii' (default) atau 'binary' (frame CRC, lihat frame_protocol.py)
+        settings = config.serial_config.get('settings', {})
+        self.protocol = protocol or settings.get('protocol') or 'ascii'
+        if self.protocol not in ('ascii', 'binary'):
+            raise ValueError(f"Protocol tidak dikenal: {self.protocol}")
         self.connections: Dict[str, serial.Serial] = {}
+        
+        # Di-set untuk membatalkan command yang belum terkirim (barge-in/stop)
+        self.abort_event = threading.Event()
+        
+        # Worker + antrian berprioritas per port; aman dipakai dari banyak thread
+        self.links: Dict[str, ControllerLink] = {}
+        
+        # Perekam traffic serial (lihat serial_recorder.py)
+        self.recorder = None
+        
         self.connect_all()
     
     def connect_all(self):
         """Koneksi ke semua Arduino"""
         print("\n=== Menghubungkan ke Arduino ===")
         
-        for controller_name in ['controller_A', 'controller_B']:
-            success = self.connect_controller(controller_name)
+        # Reset Arduino (2 detik per port) ditunggu bersamaan
+        names = ['controller_A', 'controller_B']
+        with ThreadPoolExecutor(len(names)) as executor:
+            results = list(executor.map(self.connect_controller, names))
+        
+        link_class = FrameLink if self.protocol == 'binary' else ControllerLink
+        for controller_name, success in zip(names, results):
             if success:
-                print(f"✓ {controller_name} terhubung")
+                self.links[controller_name] = link_class(
+                    controller_name, self.connections[controller_name])
+                print(f"✓ {controller_name} terhubung ({self.protocol})")
             else:
                 print(f"✗ {controller_name} gagal terhubung")
+        
+        # settings.record_path: rekam semua traffic sejak awal (analisa setelah show)
+        record_path = self.config.serial_config.get('settings', {}).get('record_path')
+        if record_path:
+            self.start_recording(time.strftime(record_path))
+    
+    def start_recording(self, path: str):
+        """Rekam semua byte TX/RX semua controller ke log binary"""
+        from python.serial_recorder import SerialRecorder, TapSerial
+        
+        self.stop_recording()
+        self.recorder = SerialRecorder(path, self.protocol)
+        for name, link in self.links.items():
+            link.ser = TapSerial(self.connections[name], self.recorder, name[-1])
+        print(f"📼 Merekam traffic serial ke {path}")
+    
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        for name, link in self.links.items():
+            link.ser = self.connections[name]
+        self.recorder.close()
+        print(f"📼 Rekaman disimpan: {self.recorder.path} ({self.recorder.records} record)")
+        self.recorder = None
     
     def connect_controller(self, controller_name: str) -> bool:
         """Koneksi ke satu controller"""
@@ -38,6 +533,21 @@ class SerialController:
             baudrate = cfg['baudrate']
             timeout = cfg['timeout']
             
+            if self.simulate:
+                # Controller simulasi, tidak perlu menunggu reset Arduino
+                settings = self.config.serial_config.get('settings', {})
+                self.connections[controller_name] = SimulatedSerial(
+                    port=f"SIM:{port}",
+                    baudrate=baudrate,
+                    timeout=timeout,
+                    name=controller_name[-1],
+                    max_servos=cfg['max_servos'],
+                    time_scale=settings.get('sim_time_scale', 1.0),
+                    line_rate=settings.get('sim_line_rate', False),
+                    corrupt_rate=settings.get('sim_corrupt_rate', 0.0)
+                )
+                return True
+            
             ser = serial.Serial(
                 port=port,
                 baudrate=baudrate,
@@ -61,8 +571,13 @@ class SerialController:
             print(f"✗ Unexpected error {controller_name}: {e}")
             return False
     
+    def is_aborted(self, priority: int = PRIORITY_NORMAL) -> bool:
+        """Command dengan prioritas ini diblokir oleh stop?"""
+        return self.abort_event.is_set() and priority > PRIORITY_HOME
+    
     def send_command(self, controller: str, channel: int, position: int, 
-                    time_ms: int = 800, delay_ms: int = 300) -> bool:
+                    time_ms: int = 800, delay_ms: int = 300,
+                    priority: int = PRIORITY_NORMAL) -> bool:
         """
         Mengirim command ke Arduino
         
@@ -72,78 +587,167 @@ class SerialController:
             position: Position servo (500-2500)
             time_ms: Waktu gerakan dalam ms
             delay_ms: Delay setelah gerakan dalam ms
+            priority: Prioritas antrian (PRIORITY_HOME melompati gerakan biasa)
         
         Returns:
             True jika sukses, False jika gagal
         """
+        pending = self.submit_command(controller, channel, position, time_ms, delay_ms, priority)
+        return pending.wait() if pending else False
+    
+    def send_planned(self, command, priority: int = PRIORITY_NORMAL) -> bool:
+        """
+        Kirim PlannedCommand dari gestures.py dan tunggu DONE
+        
+        Command sudah divalidasi dan di-encode saat plan di-compile,
+        jadi langsung masuk antrian link tanpa format ulang.
+        """
+        controller_name = f"controller_{command.controller}"
+        
+        if self.is_aborted(priority):
+            return False
+        
+        if controller_name not in self.links:
+            tracing.log("error", f"✗ Controller {command.controller} tidak terhubung")
+            return False
+        
+        link = self.links[controller_name]
+        if link.protocol == 'ascii':
+            data = command.data
+        else:
+            data = link.encode_move(command.channel, command.position, command.time, command.delay)
+        return link.submit(data, command.timeout, priority).wait()
+    
+    def submit_command(self, controller: str, channel: int, position: int,
+                       time_ms: int = 800, delay_ms: int = 300,
+                       priority: int = PRIORITY_NORMAL) -> Optional[PendingCommand]:
+        """
+        Validasi lalu masukkan command ke antrian link tanpa menunggu DONE
+        
+        Returns:
+            PendingCommand, atau None jika command ditolak
+        """
         controller_name = f"controller_{controller}"
         
-        if controller_name not in self.connections:
-            print(f"✗ Controller {controller} tidak terhubung")
+        if self.is_aborted(priority):
+            return None
+        
+        if not self._validate(controller, channel, position):
+            return None
+        
+        link = self.links[controller_name]
+        timeout = (time_ms + delay_ms) / 1000 + COMMAND_TIMEOUT_MARGIN
+        return link.submit(link.encode_move(channel, position, time_ms, delay_ms), timeout, priority)
+    
+    def _validate(self, controller: str, channel: int, position: int) -> bool:
+        """Controller terhubung, channel dan position dalam range"""
+        controller_name = f"controller_{controller}"
+        
+        if controller_name not in self.links:
+            tracing.log("error", f"✗ Controller {controller} tidak terhubung")
             return False
         
         # Validasi channel
         max_servos = self.config.serial_config[controller_name]['max_servos']
         if channel < 1 or channel > max_servos:
-            print(f"✗ Channel {channel} di luar range (1-{max_servos})")
+            tracing.log("error", f"✗ Channel {channel} di luar range (1-{max_servos})")
             return False
         
         # Validasi position
         if position < 500 or position > 2500:
-            print(f"✗ Position {position} di luar range (500-2500)")
+            tracing.log("error", f"✗ Position {position} di luar range (500-2500)")
             return False
         
-        try:
-            # Format command: #<ch>P<pos>T<time>D<delay>
-            command = f"#{channel}P{position}T{time_ms}D{delay_ms}\n"
-            
-            # Kirim command
-            ser = self.connections[controller_name]
-            ser.write(command.encode('utf-8'))
-            
-            # Tunggu response
-            start_time = time.time()
-            timeout = (time_ms + delay_ms) / 1000 + 2  # +2 detik safety margin
-            
-            response = ""
-            while time.time() - start_time < timeout:
-                if ser.in_waiting > 0:
-                    char = ser.read(1).decode('utf-8', errors='ignore')
-                    response += char
-                    
-                    if "DONE" in response:
-                        return True
-                    elif "ERROR" in response:
-                        print(f"✗ Arduino error: {response.strip()}")
-                        return False
-            
-            print(f"⚠ Timeout menunggu response dari {controller}")
-            return False
-            
-        except Exception as e:
-            print(f"✗ Error mengirim command: {e}")
+        return True
+    
+    def send_batch(self, commands: List[Dict], priority: int = PRIORITY_NORMAL) -> bool:
+        """
+        Protocol binary: semua command (satu controller, maksimal
+        frame_protocol.MAX_MOVES) dalam satu frame, tunggu DONE gerakan terakhir
+        
+        Firmware tetap menjalankan gerakan satu per satu seperti send_command.
+        """
+        if self.is_aborted(priority) or not commands:
             return False
+        
+        controller = commands[0].get('controller', 'A')
+        moves = []
+        for cmd in commands:
+            if cmd.get('controller', 'A') != controller:
+                raise ValueError("send_batch: semua command harus untuk controller yang sama")
+            if not self._validate(controller, cmd['channel'], cmd['position']):
+                return False
+            moves.append((cmd['channel'], cmd['position'], cmd.get('time', 800), cmd.get('delay', 300)))
+        
+        link = self.links[f"controller_{controller}"]
+        if link.protocol != 'binary' or len(moves) > frame_protocol.MAX_MOVES:
+            raise ValueError("send_batch butuh protocol binary dan maksimal "
+                             f"{frame_protocol.MAX_MOVES} command")
+        
+        timeout = sum(t + d for _, _, t, d in moves) / 1000 + COMMAND_TIMEOUT_MARGIN
+        return link.submit(link.encode_moves(moves), timeout, priority).wait()
     
-    def send_multiple(self, commands: List[Dict]) -> bool:
+    def emergency_stop(self) -> Dict[str, Optional[float]]:
+        """
+        Hentikan semua controller secepatnya
+        
+        Antrian gerakan dibuang, transaksi aktif dipotong, dan firmware
+        menerima "!S". Command biasa tetap diblokir sampai abort_event
+        di-clear; command PRIORITY_HOME masih diizinkan.
+        
+        Returns:
+            Dict controller -> latency stop (detik, None jika timeout)
+        """
+        self.abort_event.set()
+        
+        results = {}
+        for name, link in self.links.items():
+            latency = link.stop()
+            results[name] = latency
+            if latency is None:
+                print(f"⚠ {name}: tidak ada konfirmasi STOPPED")
+            else:
+                print(f"⏹ {name} berhenti dalam {latency * 1000:.1f} ms")
+        
+        return results
+    
+    def stop_latency_report(self):
+        """Tampilkan latency stop terburuk per controller"""
+        for name, link in self.links.items():
+            samples = link.stop_latencies
+            if samples:
+                print(f"⏱ Stop {name}: worst {max(samples) * 1000:.1f} ms, "
+                      f"mean {sum(samples) / len(samples) * 1000:.1f} ms ({len(samples)}x)")
+    
+    def send_multiple(self, commands: List[Dict],
+                      priority: int = PRIORITY_NORMAL) -> bool:
         """
         Mengirim multiple commands sekaligus
         
         Args:
             commands: List of dict dengan keys: controller, channel, position, time, delay
+            priority: Prioritas antrian untuk semua command
         
         Returns:
             True jika semua sukses
         """
+        if self.protocol == 'binary':
+            return self._send_multiple_framed(commands, priority)
+        
         all_success = True
         
         for cmd in commands:
+            if self.is_aborted(priority):
+                return False
+            
             controller = cmd.get('controller', 'A')
             channel = cmd.get('channel')
             position = cmd.get('position')
             time_ms = cmd.get('time', 800)
             delay_ms = cmd.get('delay', 300)
             
-            success = self.send_command(controller, channel, position, time_ms, delay_ms)
+            success = self.send_command(controller, channel, position, time_ms, delay_ms,
+                                        priority=priority)
             
             if not success:
                 all_success = False
@@ -153,6 +757,27 @@ class SerialController:
         
         return all_success
     
+    def _send_multiple_framed(self, commands: List[Dict], priority: int) -> bool:
+        """send_multiple untuk protocol binary: command berurutan per controller jadi satu frame"""
+        batches: List[List[Dict]] = []
+        for cmd in commands:
+            last = batches[-1] if batches else None
+            if (last and last[0].get('controller', 'A') == cmd.get('controller', 'A')
+                    and len(last) < frame_protocol.MAX_MOVES):
+                last.append(cmd)
+            else:
+                batches.append([cmd])
+        
+        all_success = True
+        for batch in batches:
+            if self.is_aborted(priority):
+                return False
+            if not self.send_batch(batch, priority):
+                all_success = False
+            time.sleep(0.05)
+        
+        return all_success
+    
     def move_servo_by_part(self, part_path: str, position: int, 
                           time_ms: int = 800, delay_ms: int = 300) -> bool:
         """
@@ -170,7 +795,7 @@ class SerialController:
         servo_info = self.config.get_servo_info(part_path)
         
         if not servo_info:
-            print(f"✗ Servo part '{part_path}' tidak ditemukan")
+            tracing.log("error", f"✗ Servo part '{part_path}' tidak ditemukan")
             return False
         
         # Validasi position dengan range yang sudah ditentukan
@@ -184,6 +809,11 @@ class SerialController:
     
     def close_all(self):
         """Tutup semua koneksi serial"""
+        for link in self.links.values():
+            link.close()
+        self.stop_recording()
+        self.links.clear()
+        
         for name, ser in self.connections.items():
             try:
                 ser.close()
@@ -201,9 +831,56 @@ class SerialController:
 class HumanoidController:
     """High-level controller untuk robot humanoid"""
     
-    def __init__(self):
-        self.config = ServoConfig()
-        self.serial = SerialController(self.config)
+    def __init__(self, simulate: bool = False, motion_process: bool = False,
+                 config: Optional[ServoConfig] = None):
+        self.config = config or ServoConfig()
+        
+        if motion_process:
+            # Port serial dipegang process terpisah (lihat motion_process.py)
+            from python.motion_process import RemoteSerialController
+            self.serial = RemoteSerialController(self.config, simulate=simulate)
+        else:
+            self.serial = SerialController(self.config, simulate=simulate)
+        
+        # Posisi servo dari firmware (lihat telemetry.py); None = tidak aktif
+        self.telemetry = None
+        telemetry_hz = self.config.serial_config.get('settings', {}).get('telemetry_hz')
+        if telemetry_hz:
+            self.enable_telemetry(telemetry_hz)
+    
+    def enable_telemetry(self, rate_hz: float = 20):
+        """Mulai polling posisi servo; mengembalikan TelemetryPoller (None jika tidak didukung)"""
+        from python.telemetry import TelemetryPoller
+        
+        if self.telemetry is not None:
+            return self.telemetry
+        if not self.serial.links:
+            # RemoteSerialController: port ada di motion process
+            tracing.log("warning", "⚠ Telemetry tidak tersedia tanpa link serial lokal")
+            return None
+        
+        self.telemetry = TelemetryPoller(self.serial, rate_hz).start()
+        return self.telemetry
+    
+    def wait_motion(self, targets: Dict[str, int], fallback: float,
+                    cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Tunggu servo sampai di target (part -> posisi)
+        
+        Dengan telemetry: selesai begitu posisi terbaca sampai (paling lama
+        fallback + 1 detik). Tanpa telemetry: sleep `fallback` detik.
+        
+        Returns:
+            False jika dibatalkan lewat `cancel`
+        """
+        if self.telemetry is None or not targets:
+            if cancel is not None:
+                return not cancel.wait(fallback)
+            time.sleep(fallback)
+            return True
+        
+        self.telemetry.wait_reached(targets, timeout=fallback + 1.0, cancel=cancel)
+        return cancel is None or not cancel.is_set()
     
     def move_servo(self, controller: str, channel: int, position: int, 
                    time_ms: int = 800, delay_ms: int = 300):
@@ -219,30 +896,71 @@ class HumanoidController:
         """Gerakkan multiple servos"""
         return self.serial.send_multiple(commands)
     
-    def execute_pose(self, pose_name: str) -> bool:
+    def pose_keyframes(self, pose_name: str) -> int:
+        """Jumlah keyframe (step) dalam pose"""
+        pose = self.config.get_pose(pose_name)
+        
+        if not pose:
+            return 0
+        
+        return len(pose['sequence']) if 'sequence' in pose else 1
+    
+    def execute_pose(self, pose_name: str,
+                     cue_times: Optional[List[float]] = None,
+                     priority: int = PRIORITY_NORMAL,
+                     check: Optional[Callable[[], None]] = None) -> bool:
         """
         Execute pose yang sudah tersimpan
         
         Args:
             pose_name: Nama pose dari poses.json
+            cue_times: Waktu mulai tiap step (detik, relatif ke pemanggilan);
+                       step tidak dimulai sebelum cue-nya
+            priority: Prioritas antrian command
+            check: Dipanggil sebelum tiap step dan selama menunggu cue;
+                   raise untuk membatalkan pose (contoh MotionArbiter.check)
         
         Returns:
             True jika sukses
         """
+        with tracing.span("pose.execute", pose=pose_name) as span:
+            success = self._execute_pose(pose_name, cue_times, priority, check)
+            span.set(ok=success)
+        return success
+    
+    def _execute_pose(self, pose_name: str, cue_times: Optional[List[float]],
+                      priority: int, check: Optional[Callable[[], None]]) -> bool:
         pose = self.config.get_pose(pose_name)
         
         if not pose:
-            print(f"✗ Pose '{pose_name}' tidak ditemukan")
+            tracing.log("error", f"✗ Pose '{pose_name}' tidak ditemukan")
             return False
         
-        print(f"\n▶ Executing pose: {pose['name']}")
-        print(f"   {pose['description']}")
+        tracing.log("info", f"\n▶ Executing pose: {pose['name']}")
+        tracing.log("debug", f"   {pose['description']}")
+        
+        start = time.time()
+        
+        def wait_cue(step_idx: int):
+            if cue_times and step_idx < len(cue_times):
+                deadline = start + cue_times[step_idx]
+                while time.time() < deadline and not self.serial.abort_event.is_set():
+                    if check is not None:
+                        check()
+                    self.serial.abort_event.wait(min(CUE_POLL, deadline - time.time()))
+            if check is not None:
+                check()
         
         # Check apakah pose punya sequence
         if 'sequence' in pose:
             # Pose dengan sequence (multi-step)
             for step_idx, step in enumerate(pose['sequence']):
-                print(f"   Step {step_idx + 1}/{len(pose['sequence'])}")
+                wait_cue(step_idx)
+                if self.serial.is_aborted(priority):
+                    tracing.log("info", f"⏹ Pose '{pose_name}' dihentikan")
+                    return False
+                
+                tracing.log("debug", f"   Step {step_idx + 1}/{len(pose['sequence'])}")
                 
                 # Convert servo movements ke format command
                 commands = []
@@ -258,7 +976,7 @@ class HumanoidController:
                         })
                 
                 # Execute step
-                self.serial.send_multiple(commands)
+                self.serial.send_multiple(commands, priority)
                 
                 # Delay antar step
                 if 'delay' in step:
@@ -266,6 +984,7 @@ class HumanoidController:
         
         else:
             # Pose sederhana (single-step)
+            wait_cue(0)
             commands = []
             for servo_move in pose['servos']:
                 servo_info = self.config.get_servo_info(servo_move['part'])
@@ -278,17 +997,42 @@ class HumanoidController:
                         'delay': servo_move.get('delay', 300)
                     })
             
-            self.serial.send_multiple(commands)
+            self.serial.send_multiple(commands, priority)
         
-        print(f"✓ Pose '{pose_name}' selesai\n")
+        if self.serial.is_aborted(priority):
+            tracing.log("info", f"⏹ Pose '{pose_name}' dihentikan")
+            return False
+        
+        tracing.log("info", f"✓ Pose '{pose_name}' selesai\n")
         return True
     
+    def stop_motion(self):
+        """Batalkan semua command yang belum terkirim; servo diam di posisi terakhir"""
+        self.serial.abort_event.set()
+    
+    def resume_motion(self):
+        """Izinkan command gerakan lagi setelah stop_motion()"""
+        self.serial.abort_event.clear()
+    
+    def emergency_stop(self) -> Dict[str, Optional[float]]:
+        """Stop semua servo secepatnya; gerakan biasa diblokir sampai resume_motion()"""
+        return self.serial.emergency_stop()
+    
+    def home_now(self) -> bool:
+        """Stop gerakan yang sedang berjalan lalu langsung ke home (melompati antrian)"""
+        self.serial.emergency_stop()
+        success = self.execute_pose('home', priority=PRIORITY_HOME)
+        self.resume_motion()
+        return success
+    
     def go_home(self):
         """Kembali ke home position"""
         return self.execute_pose('home')
     
     def close(self):
         """Tutup semua koneksi"""
+        if self.telemetry is not None:
+            self.telemetry.stop()
         self.serial.close_all()
 
 
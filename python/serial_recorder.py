@@ -0,0 +1,533 @@
+"""
+serial_recorder.py
+Rekam semua byte serial (dua arah, per controller) ke log binary,
+putar ulang dengan timing asli, dan analisa latency command -> ack
+
+Log menyimpan protocol link (ASCII atau frame binary, lihat frame_protocol.py);
+statistik dan replay mengurai byte sesuai protocol tersebut.
+"""
+
+import argparse
+import re
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from python import frame_protocol
+from python.frame_protocol import Frame, FrameDecoder
+
+MAGIC = b"RSRL"
+VERSION = 2
+
+# Header: magic, versi, wall clock saat mulai (detik), protocol (indeks PROTOCOLS)
+HEADER = struct.Struct("<4sHdB")
+HEADER_V1 = struct.Struct("<4sHd")     # Versi 1: selalu ASCII
+PROTOCOLS = ('ascii', 'binary')
+# Record: t (ns sejak mulai rekam), controller ('A'/'B'), arah, panjang payload
+RECORD = struct.Struct("<QBBH")
+
+TX = 0   # Python -> Arduino
+RX = 1   # Arduino -> Python
+
+COMMAND_RE = re.compile(r'^#(\d+)P(\d+)T(\d+)D(\d+)$')
+
+
+class Record(NamedTuple):
+    t: float          # Detik sejak mulai rekam (monotonic)
+    controller: str
+    direction: int
+    data: bytes
+
+
+class Recording(NamedTuple):
+    started: float    # Wall clock saat mulai rekam
+    protocol: str     # 'ascii' atau 'binary'
+    records: List[Record]
+
+
+class SerialRecorder:
+    """Penulis log binary; aman dipanggil dari banyak thread"""
+
+    def __init__(self, path: str, protocol: str = 'ascii'):
+        self.path = path
+        self.protocol = protocol
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time(), PROTOCOLS.index(protocol)))
+        self._start = time.monotonic_ns()
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def write(self, controller: str, direction: int, data: bytes):
+        if not data:
+            return
+        t = time.monotonic_ns() - self._start
+        with self._lock:
+            if self._file is None:
+                return
+            # Payload > 64 KB dipecah agar muat di field panjang uint16
+            for offset in range(0, len(data), 0xFFFF):
+                chunk = data[offset:offset + 0xFFFF]
+                self._file.write(RECORD.pack(t, ord(controller), direction, len(chunk)))
+                self._file.write(chunk)
+                self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TapSerial:
+    """Pembungkus port serial yang menyalin setiap byte ke SerialRecorder"""
+
+    def __init__(self, ser, recorder: SerialRecorder, controller: str):
+        self.ser = ser
+        self.recorder = recorder
+        self.controller = controller
+
+    def write(self, data: bytes) -> int:
+        self.recorder.write(self.controller, TX, data)
+        return self.ser.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.ser.read(size)
+        self.recorder.write(self.controller, RX, data)
+        return data
+
+    def readline(self) -> bytes:
+        data = self.ser.readline()
+        self.recorder.write(self.controller, RX, data)
+        return data
+
+    def __getattr__(self, name):
+        # in_waiting, close, reset_input_buffer, dll. diteruskan ke port asli
+        return getattr(self.ser, name)
+
+
+def read_recording(path: str) -> Recording:
+    """Baca log binary (versi 1 dianggap ASCII)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, version, started = HEADER_V1.unpack_from(data, 0)
+    if magic != MAGIC or version not in (1, VERSION):
+        raise ValueError(f"Bukan rekaman serial yang valid: {path}")
+    if version == 1:
+        protocol, offset = 'ascii', HEADER_V1.size
+    else:
+        protocol, offset = PROTOCOLS[HEADER.unpack_from(data, 0)[3]], HEADER.size
+
+    records = []
+    while offset + RECORD.size <= len(data):
+        t, controller, direction, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        records.append(Record(t / 1e9, chr(controller), direction, data[offset:offset + length]))
+        offset += length
+
+    return Recording(started, protocol, records)
+
+
+def iter_lines(records: List[Record]) -> Iterator[Tuple[float, str, int, str]]:
+    """
+    Gabungkan potongan byte menjadi baris utuh per controller dan arah
+
+    Yields:
+        (t byte terakhir baris, controller, arah, baris tanpa newline)
+    """
+    buffers: Dict[Tuple[str, int], bytearray] = {}
+
+    for record in records:
+        buffer = buffers.setdefault((record.controller, record.direction), bytearray())
+        buffer += record.data
+        while True:
+            index = buffer.find(b"\n")
+            if index < 0:
+                break
+            line = buffer[:index].decode('utf-8', errors='ignore').strip()
+            del buffer[:index + 1]
+            if line:
+                yield record.t, record.controller, record.direction, line
+
+
+def iter_frames(records: List[Record]) -> Iterator[Tuple[float, str, int, Frame]]:
+    """
+    Urai rekaman protocol binary menjadi Frame per controller dan arah
+
+    Yields:
+        (t byte terakhir frame, controller, arah, Frame); frame rusak ok=False
+    """
+    decoders: Dict[Tuple[str, int], FrameDecoder] = {}
+
+    for record in records:
+        decoder = decoders.setdefault((record.controller, record.direction), FrameDecoder())
+        for frame in decoder.feed(record.data):
+            yield record.t, record.controller, record.direction, frame
+
+
+def describe_frame(frame: Frame) -> str:
+    """Frame -> teks untuk dump, contoh 'MOVES #3 #1P1500T800D300'"""
+    names = {value: name[6:] for name, value in vars(frame_protocol).items()
+             if name.startswith('FRAME_') and isinstance(value, int)}
+    if not frame.ok:
+        return f"<CRC error, seq {frame.seq}>"
+    text = f"{names.get(frame.kind, hex(frame.kind))} #{frame.seq}"
+    if frame.kind == frame_protocol.FRAME_MOVES:
+        try:
+            moves = frame_protocol.unpack_moves(frame.payload)
+        except ValueError:
+            return text + " <payload tidak valid>"
+        return text + " " + " ".join(f"#{c}P{p}T{t}D{d}" for c, p, t, d in moves)
+    if frame.kind == frame_protocol.FRAME_ERROR and frame.payload:
+        return text + f" {frame_protocol.ERRORS.get(frame.payload[0], frame.payload[0])}"
+    if frame.kind == frame_protocol.FRAME_DONE and frame.payload[:1] == b"\x01":
+        return text + " (tanpa OK)"
+    return text
+
+
+def iter_messages(recording: Recording) -> Iterator[Tuple[float, str, int, str]]:
+    """Baris ASCII atau frame yang sudah dijadikan teks, sesuai protocol rekaman"""
+    if recording.protocol == 'binary':
+        for t, controller, direction, frame in iter_frames(recording.records):
+            yield t, controller, direction, describe_frame(frame)
+    else:
+        yield from iter_lines(recording.records)
+
+
+def _new_stats() -> Dict:
+    return {'latency': [], 'overhead': [], 'stop': [],
+            'timeouts': 0, 'cancelled': 0, 'retransmits': 0, 'crc_errors': 0}
+
+
+def _finish_stats(result: Dict[str, Dict]) -> Dict[str, Dict]:
+    for stats in result.values():
+        for key in ('latency', 'overhead', 'stop'):
+            stats[key] = np.array(stats[key])
+    return dict(sorted(result.items()))
+
+
+def ack_latencies(recording: Recording) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Pasangkan tiap command dengan ack-nya (DONE/ERROR), dan "!S" dengan STOPPED
+
+    Returns:
+        controller -> {'latency': detik TX -> ack,
+                       'overhead': latency dikurangi T+D yang diminta,
+                       'stop': detik "!S" -> STOPPED,
+                       'timeouts': jumlah command tanpa ack,
+                       'cancelled': command yang dipotong stop,
+                       'retransmits', 'crc_errors': hanya protocol binary}
+    """
+    if recording.protocol == 'binary':
+        return _frame_latencies(recording.records)
+
+    pending: Dict[str, List[Tuple[float, float]]] = {}   # controller -> [(t_tx, T+D detik)]
+    stops: Dict[str, List[float]] = {}                   # controller -> [t_tx "!S"]
+    result: Dict[str, Dict] = {}
+
+    for t, controller, direction, line in iter_lines(recording.records):
+        queue = pending.setdefault(controller, [])
+        stop_queue = stops.setdefault(controller, [])
+        stats = result.setdefault(controller, _new_stats())
+
+        if direction == TX and line == "?":
+            continue        # Query telemetry tidak punya ack DONE
+
+        if direction == TX:
+            if line == "!S":
+                stop_queue.append(t)
+                continue
+            # Firmware memproses satu command pada satu waktu; command baru
+            # sebelum ack berarti ack command lama tidak pernah datang
+            if queue:
+                stats['timeouts'] += len(queue)
+                queue.clear()
+            match = COMMAND_RE.match(line)
+            expected = (int(match.group(3)) + int(match.group(4))) / 1000 if match else 0.0
+            queue.append((t, expected))
+
+        elif line.endswith("STOPPED"):
+            if stop_queue:
+                stats['stop'].append(t - stop_queue.pop(0))
+            stats['cancelled'] += len(queue)
+            queue.clear()
+
+        elif queue and (line.endswith("DONE") or "ERROR" in line):
+            t_tx, expected = queue.pop(0)
+            stats['latency'].append(t - t_tx)
+            stats['overhead'].append(t - t_tx - expected)
+
+    for controller, queue in pending.items():
+        result[controller]['timeouts'] += len(queue)
+
+    return _finish_stats(result)
+
+
+def _frame_latencies(records: List[Record]) -> Dict[str, Dict]:
+    """ack_latencies untuk protocol binary: MOVES/STOP dicocokkan dengan DONE/STOPPED lewat seq"""
+    pending: Dict[str, Dict[int, Tuple[float, float]]] = {}  # controller -> seq -> (t_tx, T+D)
+    stops: Dict[str, Dict[int, float]] = {}                  # controller -> seq -> t_tx STOP
+    result: Dict[str, Dict] = {}
+
+    for t, controller, direction, frame in iter_frames(records):
+        moves = pending.setdefault(controller, {})
+        stop_seqs = stops.setdefault(controller, {})
+        stats = result.setdefault(controller, _new_stats())
+
+        if not frame.ok:
+            stats['crc_errors'] += 1
+            continue
+
+        if direction == TX:
+            if frame.kind == frame_protocol.FRAME_MOVES:
+                if frame.seq in moves:
+                    stats['retransmits'] += 1     # Kirim ulang: latency dari kiriman pertama
+                    continue
+                # Seperti ASCII: frame baru sebelum DONE berarti jawaban frame lama hilang
+                stats['timeouts'] += len(moves)
+                moves.clear()
+                try:
+                    expected = sum(t_ms + d_ms for _, _, t_ms, d_ms
+                                   in frame_protocol.unpack_moves(frame.payload)) / 1000
+                except ValueError:
+                    expected = 0.0
+                moves[frame.seq] = (t, expected)
+            elif frame.kind == frame_protocol.FRAME_STOP:
+                stop_seqs.setdefault(frame.seq, t)
+
+        elif frame.kind == frame_protocol.FRAME_STOPPED:
+            if frame.seq in stop_seqs:
+                stats['stop'].append(t - stop_seqs.pop(frame.seq))
+                stats['cancelled'] += len(moves)
+                moves.clear()
+
+        elif frame.kind in (frame_protocol.FRAME_DONE, frame_protocol.FRAME_ERROR):
+            # DONE dari FRAME_RESEND datang lagi untuk seq yang sudah selesai: diabaikan
+            if frame.seq in moves:
+                t_tx, expected = moves.pop(frame.seq)
+                stats['latency'].append(t - t_tx)
+                stats['overhead'].append(t - t_tx - expected)
+
+    for controller, moves in pending.items():
+        result[controller]['timeouts'] += len(moves)
+
+    return _finish_stats(result)
+
+
+def print_stats(path: str):
+    """Ringkasan rekaman: jumlah byte, command, dan distribusi latency ack"""
+    recording = read_recording(path)
+    records = recording.records
+    duration = records[-1].t if records else 0.0
+
+    print(f"\n📼 {path}")
+    print(f"   mulai  : {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(recording.started))}")
+    print(f"   durasi : {duration:.2f}s, {len(records)} record, protocol {recording.protocol}")
+
+    for controller in sorted({r.controller for r in records}):
+        tx = sum(len(r.data) for r in records if r.controller == controller and r.direction == TX)
+        rx = sum(len(r.data) for r in records if r.controller == controller and r.direction == RX)
+        print(f"   {controller}: tx {tx} byte, rx {rx} byte")
+
+    print(f"\n   {'ctrl':<6}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+          f"{'overhead p50':>15}{'timeout':>9}")
+    for controller, stats in ack_latencies(recording).items():
+        latency = stats['latency'] * 1000
+        overhead = stats['overhead'] * 1000
+        if len(latency):
+            p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+            print(f"   {controller:<6}{len(latency):>6}{p50:>8.1f}ms{p95:>8.1f}ms{p99:>8.1f}ms"
+                  f"{latency.max():>8.1f}ms{np.median(overhead):>13.1f}ms{stats['timeouts']:>9}")
+        else:
+            print(f"   {controller:<6}{0:>6}{'-':>10}{'-':>10}{'-':>10}{'-':>10}{'-':>15}"
+                  f"{stats['timeouts']:>9}")
+        if len(stats['stop']):
+            print(f"   {'':<6}stop: {len(stats['stop'])}x, max {stats['stop'].max() * 1000:.1f} ms, "
+                  f"{stats['cancelled']} command dipotong")
+        if stats['retransmits'] or stats['crc_errors']:
+            print(f"   {'':<6}frame: {stats['retransmits']} kirim ulang, "
+                  f"{stats['crc_errors']} CRC error")
+
+
+class ReplayCommand(NamedTuple):
+    t: float
+    controller: str
+    stop: bool
+    moves: List[Tuple[int, int, int, int]]   # (channel, posisi, T, D)
+    line: Optional[str] = None               # Baris ASCII yang tidak bisa diurai, dikirim apa adanya
+
+
+def replay_commands(recording: Recording) -> List[ReplayCommand]:
+    """Command TX rekaman (tanpa query telemetry dan frame kirim ulang)"""
+    commands = []
+    if recording.protocol == 'binary':
+        last_seq: Dict[Tuple[str, int], int] = {}
+        for t, controller, direction, frame in iter_frames(recording.records):
+            if direction != TX or not frame.ok:
+                continue
+            if frame.kind not in (frame_protocol.FRAME_MOVES, frame_protocol.FRAME_STOP):
+                continue
+            key = (controller, frame.kind)
+            if last_seq.get(key) == frame.seq:
+                continue    # Frame yang sama dikirim ulang (NAK / ACK hilang)
+            last_seq[key] = frame.seq
+            if frame.kind == frame_protocol.FRAME_STOP:
+                commands.append(ReplayCommand(t, controller, True, []))
+            else:
+                commands.append(ReplayCommand(t, controller, False,
+                                              frame_protocol.unpack_moves(frame.payload)))
+        return commands
+
+    for t, controller, direction, line in iter_lines(recording.records):
+        if direction != TX or line == "?":
+            continue
+        match = COMMAND_RE.match(line)
+        if line == "!S":
+            commands.append(ReplayCommand(t, controller, True, []))
+        elif match:
+            commands.append(ReplayCommand(t, controller, False,
+                                          [tuple(int(v) for v in match.groups())]))
+        else:
+            commands.append(ReplayCommand(t, controller, False, [], line))
+    return commands
+
+
+def replay(path: str, serial, speed: Optional[float] = 1.0,
+           controllers: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Kirim ulang command TX dari rekaman ke SerialController (asli atau simulasi)
+
+    Rekaman dan controller boleh beda protocol: frame MOVES dikirim per
+    gerakan ke link ASCII, dan tiap gerakan ASCII menjadi satu frame.
+
+    Args:
+        serial: SerialController yang sudah terhubung
+        speed: Faktor kecepatan terhadap timing asli (2.0 = dua kali lebih cepat);
+               None = secepat mungkin (tiap controller tetap menunggu ack
+               sebelum command berikutnya)
+        controllers: Batasi ke controller tertentu, contoh ['A']
+
+    Returns:
+        Dict jumlah command terkirim, sukses, dan gagal
+    """
+    recording = read_recording(path)
+    commands = [command for command in replay_commands(recording)
+                if controllers is None or command.controller in controllers]
+
+    result = {'sent': 0, 'ok': 0, 'failed': 0, 'skipped': 0}
+    pending = []
+    start = time.monotonic()
+    first = commands[0].t if commands else 0.0
+
+    print(f"▶ Replay {len(commands)} command dari rekaman {recording.protocol} "
+          f"({'secepat mungkin' if speed is None else f'{speed:g}x'})")
+
+    for command in commands:
+        link = serial.links.get(f"controller_{command.controller}")
+        if link is None:
+            continue
+
+        if speed is not None:
+            remaining = start + (command.t - first) / speed - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+
+        if command.line is not None and link.protocol != 'ascii':
+            result['skipped'] += 1      # Baris rusak tidak punya padanan frame
+            continue
+
+        if command.stop:
+            result['sent'] += 1
+            if speed is None:
+                # Tanpa timing asli, stop baru boleh dikirim setelah command sebelumnya
+                for cmd in pending:
+                    result['ok' if cmd.wait() else 'failed'] += 1
+                pending.clear()
+            ok = link.stop() is not None
+            result['ok' if ok else 'failed'] += 1
+            continue
+
+        # Link mengirim command berikutnya setelah ack, jadi antrian A dan B
+        # berjalan paralel dengan kecepatan maksimal firmware
+        if command.line is not None:
+            submitted = [link.submit((command.line + "\n").encode('utf-8'), 2)]
+        elif link.protocol == 'binary':
+            timeout = sum(t_ms + d_ms for _, _, t_ms, d_ms in command.moves) / 1000 + 2
+            submitted = [link.submit(link.encode_moves(command.moves), timeout)]
+        else:
+            submitted = [link.submit(link.encode_move(*move), (move[2] + move[3]) / 1000 + 2)
+                         for move in command.moves]
+        result['sent'] += len(submitted)
+        pending.extend(submitted)
+
+    for cmd in pending:
+        result['ok' if cmd.wait() else 'failed'] += 1
+
+    print(f"✓ Replay selesai: {result}")
+    return result
+
+
+# Tooling command line
+if __name__ == "__main__":
+    from python.serial_controller import HumanoidController
+    from python.servo_config import ServoConfig
+
+    parser = argparse.ArgumentParser(description="Rekam, putar ulang, dan analisa traffic serial")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stats = sub.add_parser("stats", help="Distribusi latency command -> ack")
+    stats.add_argument("path")
+
+    dump = sub.add_parser("dump", help="Tampilkan baris per baris")
+    dump.add_argument("path")
+
+    play = sub.add_parser("replay", help="Putar ulang ke controller")
+    play.add_argument("path")
+    play.add_argument("--simulate", action="store_true")
+    play.add_argument("--speed", type=float, default=1.0)
+    play.add_argument("--fast", action="store_true", help="Secepat mungkin")
+    play.add_argument("--record", help="Rekam replay ke file baru")
+    play.add_argument("--protocol", choices=PROTOCOLS, help="Protocol link (default: config)")
+
+    demo = sub.add_parser("record-demo", help="Rekam beberapa pose di controller simulasi")
+    demo.add_argument("path")
+    demo.add_argument("--poses", default="greeting,thinking,home")
+    demo.add_argument("--protocol", choices=PROTOCOLS, help="Protocol link (default: config)")
+
+    args = parser.parse_args()
+
+    config = ServoConfig()
+    if getattr(args, 'protocol', None):
+        config.serial_config.setdefault('settings', {})['protocol'] = args.protocol
+
+    if args.command == "stats":
+        print_stats(args.path)
+
+    elif args.command == "dump":
+        for t, controller, direction, line in iter_messages(read_recording(args.path)):
+            arrow = "→" if direction == TX else "←"
+            print(f"{t:10.4f}  {controller} {arrow} {line}")
+
+    elif args.command == "replay":
+        robot = HumanoidController(simulate=args.simulate, config=config)
+        if args.record:
+            robot.serial.start_recording(args.record)
+        try:
+            replay(args.path, robot.serial, speed=None if args.fast else args.speed)
+        finally:
+            robot.close()
+        if args.record:
+            print_stats(args.record)
+
+    else:
+        robot = HumanoidController(simulate=True, config=config)
+        robot.serial.start_recording(args.path)
+        try:
+            for pose in args.poses.split(','):
+                robot.execute_pose(pose)
+        finally:
+            robot.close()
+        print_stats(args.path)
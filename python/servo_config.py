@@ -6,12 +6,14 @@ Mengelola konfigurasi servo dan poses
 import json
 import os
 from typing import Dict, Any, Optional, List
+from python import tracing
 
 class ServoConfig:
     def __init__(self, config_dir: str = "./config"):
         self.config_dir = config_dir
         self.servo_mapping: Dict[str, Any] = {}
         self.poses: Dict[str, Any] = {}
+        self.gestures: Dict[str, Any] = {}
         self.serial_config: Dict[str, Any] = {}
         
         self.load_configs()
@@ -31,6 +33,13 @@ class ServoConfig:
                 data = json.load(f)
                 self.poses = data.get('poses', {})
             
+            # Load gestures (opsional, lihat gestures.py)
+            gestures_path = os.path.join(self.config_dir, "gestures.json")
+            if os.path.exists(gestures_path):
+                with open(gestures_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.gestures = data.get('gestures', {})
+            
             # Load serial config
             serial_path = os.path.join(self.config_dir, "serial_config.json")
             with open(serial_path, 'r', encoding='utf-8') as f:
@@ -55,17 +64,17 @@ class ServoConfig:
         parts = part_path.split('.')
         
         if len(parts) != 2:
-            print(f"✗ Invalid part path: {part_path}")
+            tracing.log("warning", f"✗ Invalid part path: {part_path}")
             return None
         
         category, servo = parts
         
         if category not in self.servo_mapping:
-            print(f"✗ Category not found: {category}")
+            tracing.log("warning", f"✗ Category not found: {category}")
             return None
         
         if servo not in self.servo_mapping[category]:
-            print(f"✗ Servo not found: {servo} in {category}")
+            tracing.log("warning", f"✗ Servo not found: {servo} in {category}")
             return None
         
         return self.servo_mapping[category][servo]
@@ -78,6 +87,14 @@ class ServoConfig:
         """List semua pose yang tersedia"""
         return list(self.poses.keys())
     
+    def get_gesture(self, gesture_name: str) -> Optional[Dict[str, Any]]:
+        """Mendapatkan definisi gesture dari nama"""
+        return self.gestures.get(gesture_name)
+    
+    def list_gestures(self) -> List[str]:
+        """List semua gesture deklaratif"""
+        return list(self.gestures.keys())
+    
     def get_serial_config(self, controller: str) -> Optional[Dict[str, Any]]:
         """Mendapatkan konfigurasi serial untuk controller"""
         return self.serial_config.get(controller)
@@ -93,7 +110,7 @@ class ServoConfig:
         max_pos = servo_info.get('max', 2500)
         
         if position < min_pos or position > max_pos:
-            print(f"✗ Position {position} di luar range {min_pos}-{max_pos} untuk {part_path}")
+            tracing.log("warning", f"✗ Position {position} di luar range {min_pos}-{max_pos} untuk {part_path}")
             return False
         
         return True
@@ -0,0 +1,356 @@
+"""
+sim_serial.py
+Simulasi port serial + firmware controller_A/B untuk test tanpa hardware
+"""
+
+import random
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from python import frame_protocol
+
+COMMAND_RE = re.compile(r'^#(\d+)P(\d+)T(\d+)D(\d+)$')
+
+
+class SimulatedSerial:
+    """
+    Pengganti serial.Serial yang meniru perilaku controller_A.ino
+
+    Command `#<ch>P<pos>T<time>D<delay>` dijawab "[X] TX: ..." lalu
+    "[X] DONE" setelah T+D ms (dikali time_scale). Seperti firmware asli,
+    command diproses satu per satu: command berikutnya baru mulai setelah
+    command sebelumnya selesai. "!S" membatalkan semua command yang belum
+    selesai dan dijawab "[X] STOPPED" segera. "?" dijawab segera dengan
+    posisi hasil interpolasi linear tiap channel ("[X] POS <ms> <hex3...>").
+
+    Frame binary (frame_protocol.py) dikenali dari byte SOF di awal baris dan
+    dijawab dengan frame, termasuk NAK untuk CRC salah, buang duplikat seq,
+    dan FRAME_RESEND. line_rate=True memodelkan waktu kirim tiap byte pada
+    baudrate; corrupt_rate = probabilitas satu bit terbalik per write atau
+    per jawaban (uji integritas dan retransmit).
+    """
+
+    def __init__(self,
+                 port: str = "SIM",
+                 baudrate: int = 115200,
+                 timeout: Optional[float] = 2,
+                 write_timeout: Optional[float] = None,
+                 name: str = "A",
+                 max_servos: int = 24,
+                 time_scale: float = 1.0,
+                 line_rate: bool = False,
+                 corrupt_rate: float = 0.0,
+                 seed: int = 0):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.name = name
+        self.max_servos = max_servos
+        self.time_scale = time_scale
+        self.line_rate = line_rate
+        self.corrupt_rate = corrupt_rate
+        self._random = random.Random(seed)
+
+        self.is_open = True
+        self.positions = [1500] * (max_servos + 1)  # index 1..max_servos (target)
+        # Segmen gerakan per channel: (t0, p0, t1, p1), terurut menurut t0
+        self._segments: List[List[Tuple[float, float, float, float]]] = [
+            [(0.0, 1500.0, 0.0, 1500.0)] for _ in range(max_servos + 1)]
+        self._epoch = time.monotonic()
+
+        self._rx_line = bytearray()
+        self._pending: List[Tuple[float, bytes]] = []  # (ready_time, data)
+        self._busy_until = 0.0
+        self._rx_free = 0.0
+        self._cond = threading.Condition()
+
+        # Protocol frame: byte frame yang sedang diterima, seq MOVES terakhir,
+        # jawaban terakhir per seq untuk FRAME_RESEND
+        self._frame = bytearray()
+        self._frame_time = 0.0
+        self._last_moves_seq: Optional[int] = None
+        self._replies: "OrderedDict[int, Tuple[float, bytes]]" = OrderedDict()
+
+    # ---------- API mirip pyserial ----------
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            return len(self._ready_bytes(time.monotonic()))
+
+    def write(self, data: bytes) -> int:
+        with self._cond:
+            now = time.monotonic()
+            if self.line_rate:
+                # Byte baru sampai di firmware setelah waktu kirim pada baudrate
+                self._rx_free = max(now, self._rx_free) + len(data) * 10 / self.baudrate
+                now = self._rx_free
+            if self._frame and now - self._frame_time > frame_protocol.FRAME_GAP:
+                self._frame.clear()  # Frame terpotong: reset seperti firmware
+
+            for byte in self._corrupt(data):
+                if self._frame or (byte == frame_protocol.SOF and not self._rx_line):
+                    self._frame.append(byte)
+                    self._frame_time = now
+                    self._take_frame(now)
+                elif byte in (0x0A, 0x0D):
+                    if self._rx_line:
+                        self._handle_line(self._rx_line.decode('ascii', errors='ignore'), now)
+                        self._rx_line.clear()
+                else:
+                    self._rx_line.append(byte)
+            self._cond.notify_all()
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = self._ready_bytes(now)
+                if ready:
+                    return self._consume(size, now)
+                if deadline is not None and now >= deadline:
+                    return b""
+                wait = self._next_ready_in(now)
+                if deadline is not None:
+                    wait = min(wait, deadline - now) if wait is not None else deadline - now
+                self._cond.wait(timeout=wait)
+
+    def readline(self) -> bytes:
+        line = bytearray()
+        while True:
+            char = self.read(1)
+            if not char:
+                return bytes(line)
+            line += char
+            if char == b"\n":
+                return bytes(line)
+
+    def reset_input_buffer(self):
+        with self._cond:
+            now = time.monotonic()
+            self._pending = [(t, d) for t, d in self._pending if t > now]
+
+    def reset_output_buffer(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+    # ---------- Firmware ----------
+    def _handle_line(self, line: str, now: float):
+        line = line.strip()
+
+        if line == "!S":
+            self._stop(now)
+            self._emit(now, f"[{self.name}] STOPPED")
+            return
+
+        if line == "?":
+            positions = "".join(f"{round(self._position_at(ch, now)):03X}"
+                                for ch in range(1, self.max_servos + 1))
+            millis = int((now - self._epoch) * 1000)
+            self._emit(now, f"[{self.name}] POS {millis} {positions}")
+            return
+
+        start = max(now, self._busy_until)
+
+        match = COMMAND_RE.match(line)
+        if not match:
+            if line.startswith('#'):
+                self._emit(start, f"[{self.name}] ERROR: Invalid command format")
+            else:
+                self._emit(start, f"[{self.name}] ERROR: Command must start with #")
+            return
+
+        channel, position, time_ms, delay_ms = (int(v) for v in match.groups())
+
+        if position < 500 or position > 2500:
+            self._emit(start, f"[{self.name}] ERROR: Position must be 500-2500")
+            return
+        if channel < 1 or channel > self.max_servos:
+            self._emit(start, f"ERROR: Channel out of range (1-{self.max_servos})")
+            self._emit(start, f"[{self.name}] DONE")
+            return
+
+        start, done = self._start_move(channel, position, time_ms, delay_ms, now)
+        self._emit(start, f"[{self.name}] TX: {line}")
+        self._emit(done, f"[{self.name}] OK received")
+        self._emit(done, f"[{self.name}] DONE")
+
+    def _stop(self, now: float):
+        """Emergency stop: buang DONE yang belum terjadi"""
+        self._pending = [(t, d) for t, d in self._pending if t <= now]
+        self._busy_until = now
+        # Interpolasi yang sedang berjalan tetap selesai; yang belum mulai batal
+        for segments in self._segments:
+            while len(segments) > 1 and segments[-1][0] > now:
+                segments.pop()
+
+    def _start_move(self, channel: int, position: int, time_ms: int, delay_ms: int,
+                    now: float) -> Tuple[float, float]:
+        """Jadwalkan gerakan setelah gerakan sebelumnya; (mulai, selesai)"""
+        start = max(now, self._busy_until)
+        self.positions[channel] = position
+        self._add_segment(channel, start, start + time_ms / 1000.0 * self.time_scale,
+                          position, now)
+        done = start + (time_ms + delay_ms) / 1000.0 * self.time_scale
+        self._busy_until = done
+        return start, done
+
+    # ---------- Protocol frame ----------
+    def _take_frame(self, now: float):
+        """Proses self._frame jika sudah lengkap"""
+        buffer = self._frame
+        if len(buffer) < frame_protocol.HEADER.size:
+            return
+        _, length, seq, kind = frame_protocol.HEADER.unpack_from(buffer)
+        end = frame_protocol.HEADER.size + length + frame_protocol.CRC.size
+        if length <= frame_protocol.MAX_PAYLOAD and len(buffer) < end:
+            return
+
+        body = bytes(buffer[1:end - frame_protocol.CRC.size])
+        valid = (length <= frame_protocol.MAX_PAYLOAD and
+                 frame_protocol.CRC.unpack_from(buffer, end - frame_protocol.CRC.size)[0]
+                 == frame_protocol.crc16(body))
+        buffer.clear()
+        if not valid:
+            self._emit_frame(now, seq, frame_protocol.FRAME_NAK)
+            return
+        self._handle_frame(seq, kind, body[3:], now)
+
+    def _handle_frame(self, seq: int, kind: int, payload: bytes, now: float):
+        if kind == frame_protocol.FRAME_MOVES:
+            if seq == self._last_moves_seq:
+                # Frame dikirim ulang karena ACK hilang: jangan gerak dua kali
+                self._emit_frame(now, seq, frame_protocol.FRAME_ACK)
+                return
+            try:
+                moves = frame_protocol.unpack_moves(payload)
+            except ValueError:
+                self._reply_frame(now, seq, frame_protocol.FRAME_ERROR, b"\x04")
+                return
+            if len(moves) > frame_protocol.MAX_MOVES:
+                self._reply_frame(now, seq, frame_protocol.FRAME_ERROR, b"\x01")
+                return
+            for channel, position, _, _ in moves:
+                if position < 500 or position > 2500:
+                    self._reply_frame(now, seq, frame_protocol.FRAME_ERROR, b"\x02")
+                    return
+                if channel < 1 or channel > self.max_servos:
+                    self._reply_frame(now, seq, frame_protocol.FRAME_ERROR, b"\x03")
+                    return
+
+            self._last_moves_seq = seq
+            self._emit_frame(now, seq, frame_protocol.FRAME_ACK)
+            done = now
+            for move in moves:
+                _, done = self._start_move(*move, now)
+            self._reply_frame(done, seq, frame_protocol.FRAME_DONE, b"\x00")
+
+        elif kind == frame_protocol.FRAME_STOP:
+            self._stop(now)
+            self._reply_frame(now, seq, frame_protocol.FRAME_STOPPED)
+
+        elif kind == frame_protocol.FRAME_QUERY:
+            millis = int((now - self._epoch) * 1000) & 0xFFFFFFFF
+            payload = struct.pack("<I", millis) + b"".join(
+                struct.pack("<H", round(self._position_at(ch, now)))
+                for ch in range(1, self.max_servos + 1))
+            self._emit_frame(now, seq, frame_protocol.FRAME_POS, payload)
+
+        elif kind == frame_protocol.FRAME_RESEND:
+            reply = self._replies.get(seq)
+            if reply is not None and reply[0] <= now:
+                self._emit_bytes(now, reply[1])
+
+        else:
+            self._reply_frame(now, seq, frame_protocol.FRAME_ERROR, b"\x04")
+
+    def _emit_frame(self, ready_time: float, seq: int, kind: int, payload: bytes = b""):
+        self._emit_bytes(ready_time, frame_protocol.encode_frame(seq, kind, payload))
+
+    def _reply_frame(self, ready_time: float, seq: int, kind: int, payload: bytes = b""):
+        """Jawaban akhir sebuah seq; disimpan untuk FRAME_RESEND"""
+        frame = frame_protocol.encode_frame(seq, kind, payload)
+        self._replies[seq] = (ready_time, frame)
+        while len(self._replies) > 16:
+            self._replies.popitem(last=False)
+        self._emit_bytes(ready_time, frame)
+
+    def _corrupt(self, data: bytes) -> bytes:
+        if not self.corrupt_rate or self._random.random() >= self.corrupt_rate:
+            return data
+        damaged = bytearray(data)
+        damaged[self._random.randrange(len(damaged))] ^= 1 << self._random.randrange(8)
+        return bytes(damaged)
+
+    def _position_at(self, channel: int, t: float) -> float:
+        segments = self._segments[channel]
+        value = segments[0][1]
+        for t0, p0, t1, p1 in segments:
+            if t < t0:
+                break
+            value = p1 if t >= t1 else p0 + (p1 - p0) * (t - t0) / (t1 - t0)
+        return value
+
+    def _add_segment(self, channel: int, t0: float, t1: float, position: int, now: float):
+        segments = self._segments[channel]
+        segments.append((t0, self._position_at(channel, t0), t1, float(position)))
+        # Segmen yang sudah tergantikan segmen berikutnya tidak dibutuhkan lagi
+        while len(segments) > 1 and segments[1][0] <= now:
+            segments.pop(0)
+
+    def _emit(self, ready_time: float, text: str):
+        self._emit_bytes(ready_time, (text + "\r\n").encode('ascii'))
+
+    def _emit_bytes(self, ready_time: float, data: bytes):
+        if self.line_rate:
+            ready_time += len(data) * 10 / self.baudrate
+        self._pending.append((ready_time, self._corrupt(data)))
+
+    def _ready_bytes(self, now: float) -> bytes:
+        return b"".join(d for t, d in self._pending if t <= now)
+
+    def _consume(self, size: int, now: float) -> bytes:
+        out = bytearray()
+        remaining: List[Tuple[float, bytes]] = []
+
+        for ready_time, data in self._pending:
+            if ready_time <= now and len(out) < size:
+                take = data[:size - len(out)]
+                out += take
+                rest = data[len(take):]
+                if rest:
+                    remaining.append((ready_time, rest))
+            else:
+                remaining.append((ready_time, data))
+
+        self._pending = remaining
+        return bytes(out)
+
+    def _next_ready_in(self, now: float) -> Optional[float]:
+        future = [t for t, _ in self._pending if t > now]
+        return (min(future) - now) if future else None
+
+
+# Test program
+if __name__ == "__main__":
+    ser = SimulatedSerial(name="A", time_scale=0.5)
+
+    start = time.time()
+    ser.write(b"#1P1800T400D100\n")
+    while True:
+        line = ser.readline().decode().strip()
+        print(f"{time.time() - start:5.2f}s  {line}")
+        if line.endswith("DONE"):
+            break
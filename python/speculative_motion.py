@@ -0,0 +1,193 @@
+"""
+speculative_motion.py
+Pre-positioning spekulatif: mulai bergerak ke pose yang diprediksi
+selagi Ollama masih generate, lalu retarget saat emotion sebenarnya diketahui
+"""
+
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+from python.motion_arbiter import GestureHandle, MotionArbiter
+from python.serial_controller import HumanoidController
+
+# Kata kunci murah untuk menebak emotion dari input user (ID + EN)
+EMOTION_KEYWORDS = {
+    'happy': ['halo', 'hai', 'hello', 'hi', 'selamat', 'terima kasih', 'thanks',
+              'senang', 'suka', 'bagus', 'good', 'nice', 'great'],
+    'excited': ['wow', 'hore', 'horee', 'keren', 'hebat', 'amazing', 'awesome',
+                'luar biasa', 'menang', 'berhasil'],
+    'sad': ['sedih', 'maaf', 'sorry', 'sad', 'gagal', 'kecewa', 'sakit', 'hilang'],
+    'thinking': ['kenapa', 'mengapa', 'bagaimana', 'apa', 'apakah', 'why', 'how',
+                 'what', 'jelaskan', 'explain', 'menurutmu', 'think'],
+}
+
+LISTENING_POSE = 'listening'
+
+
+class EmotionPredictor:
+    """Tebak emotion dari text tanpa LLM (keyword + tanda baca)"""
+
+    def __init__(self, keywords: Optional[Dict[str, list]] = None):
+        self.keywords = keywords or EMOTION_KEYWORDS
+        self._patterns = {
+            emotion: re.compile(r'\b(' + '|'.join(re.escape(w) for w in words) + r')\b')
+            for emotion, words in self.keywords.items()
+        }
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Returns:
+            (emotion, confidence) - emotion None jika tidak ada petunjuk
+        """
+        lowered = text.lower()
+        scores = {emotion: len(pattern.findall(lowered))
+                  for emotion, pattern in self._patterns.items()}
+
+        if lowered.rstrip().endswith('?'):
+            scores['thinking'] += 1
+        if lowered.count('!') >= 2:
+            scores['excited'] += 1
+
+        emotion, best = max(scores.items(), key=lambda item: item[1])
+        total = sum(scores.values())
+
+        if best == 0:
+            return (None, 0.0)
+        return (emotion, best / total)
+
+
+class SpeculativeMotion:
+    """
+    Jalankan pose tebakan di background dan resolve saat pose asli diketahui
+
+    Hit  : pose tebakan = pose asli, gerakan sudah jalan duluan
+    Miss : command yang belum terkirim dibatalkan, lalu retarget ke pose asli
+
+    Pose tebakan berjalan lewat MotionArbiter seperti gesture lain.
+    """
+
+    def __init__(self,
+                 controller: HumanoidController,
+                 emotion_to_pose: Dict[str, str],
+                 min_confidence: float = 0.5,
+                 arbiter: Optional[MotionArbiter] = None):
+        self.controller = controller
+        self.emotion_to_pose = emotion_to_pose
+        self.min_confidence = min_confidence
+        self.predictor = EmotionPredictor()
+        self.arbiter = arbiter or MotionArbiter(controller.config)
+
+        self._handle: Optional[GestureHandle] = None
+        self.pose: Optional[str] = None
+        self._t_start = 0.0
+        self._t_done: Optional[float] = None
+
+        # Statistik
+        self.hits = 0
+        self.misses = 0
+        self.neutral = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self._handle is not None
+
+    def start(self, user_text: str) -> str:
+        """
+        Prediksi pose dari input user dan mulai bergerak ke sana
+
+        Returns:
+            Nama pose yang sedang dituju
+        """
+        self.cancel()
+
+        emotion, confidence = self.predictor.predict(user_text)
+        if emotion and confidence >= self.min_confidence:
+            self.pose = self.emotion_to_pose.get(emotion, LISTENING_POSE)
+        else:
+            self.pose = LISTENING_POSE
+
+        print(f"🔮 Spekulasi pose: {self.pose} ({emotion or '-'}, {confidence:.0%})")
+
+        self._t_start = time.time()
+        self._t_done = None
+        self._handle = self.arbiter.submit(f"pose:{self.pose}",
+                                           self.arbiter.groups_for_pose(self.pose),
+                                           self._run, self.pose)
+
+        return self.pose
+
+    def _run(self, pose_name: str):
+        self.controller.execute_pose(pose_name, check=self.arbiter.check)
+        self._t_done = time.time()
+
+    def resolve(self, actual_pose: str) -> bool:
+        """
+        Bandingkan dengan pose sebenarnya
+
+        Returns:
+            True jika spekulasi benar (pose tidak perlu dieksekusi ulang);
+            False jika pemanggil harus execute actual_pose
+        """
+        if self._handle is None:
+            return False
+
+        t_resolve = time.time()
+
+        if actual_pose == self.pose:
+            self._handle.wait()
+            saved = min(t_resolve, self._t_done or t_resolve) - self._t_start
+            self.hits += 1
+            self.saved_seconds += saved
+            print(f"🔮 Spekulasi tepat, hemat {saved:.2f}s")
+            self._handle = None
+            return True
+
+        if self.pose == LISTENING_POSE:
+            self.neutral += 1
+        else:
+            self.misses += 1
+            print(f"🔮 Spekulasi meleset ({self.pose} → {actual_pose}), retarget")
+
+        self.cancel()
+        return False
+
+    def cancel(self):
+        """Hentikan gerakan spekulatif (servo diam di posisi terakhir)"""
+        if self._handle is None:
+            return
+
+        self._handle.cancel()
+        self.controller.stop_motion()
+        self._handle.wait()
+        self.controller.resume_motion()
+        self._handle = None
+
+    @property
+    def hit_rate(self) -> float:
+        decided = self.hits + self.misses
+        return self.hits / decided if decided else 0.0
+
+    def report(self):
+        total = self.hits + self.misses + self.neutral
+        if total == 0:
+            return
+
+        print("\n🔮 Statistik spekulasi:")
+        print(f"   Prediksi      : {total} (hit {self.hits}, miss {self.misses}, listening {self.neutral})")
+        print(f"   Hit rate      : {self.hit_rate:.0%}")
+        print(f"   Latency hemat : {self.saved_seconds:.2f}s total, "
+              f"{self.saved_seconds / max(1, self.hits):.2f}s per hit")
+
+
+# Test program
+if __name__ == "__main__":
+    predictor = EmotionPredictor()
+
+    for text in ["Halo robot, apa kabar?",
+                 "Wow keren sekali, kita menang!!",
+                 "Maaf, saya sedang sedih hari ini",
+                 "Jelaskan bagaimana kamu bergerak",
+                 "Baik"]:
+        print(f"{text!r:45} → {predictor.predict(text)}")
@@ -0,0 +1,105 @@
+"""
+speech_sync.py
+Sinkronisasi keyframe gerakan dengan batas kalimat/kata dalam ucapan
+"""
+
+import re
+from typing import List, Tuple
+
+# Bobot jeda tambahan (dalam "karakter") setelah tanda baca
+PAUSE_WEIGHT = {',': 4, ';': 5, ':': 5, '.': 8, '!': 8, '?': 8}
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'\S+')
+
+
+def word_timings(text: str, duration: float) -> List[Tuple[str, float]]:
+    """
+    Estimasi waktu mulai tiap kata dalam ucapan
+
+    Durasi dibagi proporsional terhadap panjang kata ditambah bobot jeda
+    tanda baca, karena engine TTS tidak mengembalikan timing per kata.
+
+    Returns:
+        List of (word, start_time_detik)
+    """
+    words = WORD.findall(text)
+    if not words:
+        return []
+
+    weights = [len(w) + 1 + PAUSE_WEIGHT.get(w[-1], 0) for w in words]
+    total = float(sum(weights))
+
+    timings = []
+    elapsed = 0.0
+    for word, weight in zip(words, weights):
+        timings.append((word, duration * elapsed / total))
+        elapsed += weight
+
+    return timings
+
+
+def sentence_boundaries(text: str, duration: float) -> List[float]:
+    """Waktu mulai tiap kalimat (selalu diawali 0.0)"""
+    timings = word_timings(text, duration)
+    if not timings:
+        return [0.0]
+
+    boundaries = [0.0]
+    for (word, _), (_, next_start) in zip(timings, timings[1:]):
+        if word[-1] in '.!?':
+            boundaries.append(next_start)
+
+    return boundaries
+
+
+def keyframe_cues(text: str, duration: float, n_keyframes: int) -> List[float]:
+    """
+    Tentukan waktu (relatif ke awal ucapan) untuk setiap keyframe gerakan
+
+    Keyframe pertama selalu di awal ucapan. Keyframe berikutnya diletakkan
+    di batas kalimat; jika kalimat kurang, dipakai batas kata.
+
+    Args:
+        text: Text yang diucapkan
+        duration: Durasi audio (detik)
+        n_keyframes: Jumlah step dalam pose/gesture
+
+    Returns:
+        List waktu cue, panjangnya n_keyframes
+    """
+    if n_keyframes <= 0:
+        return []
+    if n_keyframes == 1 or duration <= 0:
+        return [0.0] * n_keyframes
+
+    candidates = sentence_boundaries(text, duration)[1:]
+    if len(candidates) < n_keyframes - 1:
+        candidates = [start for _, start in word_timings(text, duration)[1:]]
+
+    if not candidates:
+        # Text satu kata: sebar rata sepanjang durasi
+        step = duration / n_keyframes
+        return [i * step for i in range(n_keyframes)]
+
+    cues = [0.0]
+    needed = n_keyframes - 1
+    for i in range(needed):
+        # Ambil kandidat tersebar rata
+        idx = min(len(candidates) - 1, (i * len(candidates)) // needed)
+        cues.append(max(cues[-1], candidates[idx]))
+
+    return cues
+
+
+# Test program
+if __name__ == "__main__":
+    text = "Halo! Nama saya Robot Humanoid. Senang bertemu dengan Anda!"
+
+    print("Word timings (durasi 4s):")
+    for word, start in word_timings(text, 4.0):
+        print(f"  {start:5.2f}s  {word}")
+
+    print(f"\nSentence boundaries: {sentence_boundaries(text, 4.0)}")
+    print(f"Cues 3 keyframe: {keyframe_cues(text, 4.0, 3)}")
+    print(f"Cues 5 keyframe: {keyframe_cues(text, 4.0, 5)}")
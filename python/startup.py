@@ -0,0 +1,127 @@
+"""
+startup.py
+Bring-up subsystem secara paralel: tiap subsystem punya future kesiapan,
+dependensi antar subsystem eksplisit, dan timeline startup dicatat
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from python import tracing
+
+BAR_WIDTH = 40
+
+
+class Startup:
+    """
+    Jalankan inisialisasi subsystem di thread pool
+
+        startup = Startup()
+        startup.task('controller', HumanoidController)
+        startup.task('movements', RobotMovements, 'controller')
+        startup.get('movements')   # blocking sampai siap
+
+    Task mulai begitu semua dependensinya siap; hasil dependensi diteruskan
+    sebagai argumen positional sesuai urutan. Subsystem yang tidak pernah
+    di-get() tidak ditunggu siapa pun.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.t0 = time.monotonic()
+        self.futures: Dict[str, Future] = {}
+        # name -> (mulai, selesai, ok) relatif ke t0
+        self.timeline: Dict[str, Tuple[float, float, bool]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="startup")
+
+    def task(self, name: str, func: Callable, *deps: str) -> Future:
+        """Daftarkan subsystem `name` = func(*hasil deps)"""
+        dep_futures = [self.futures[dep] for dep in deps]
+
+        def run():
+            args = [future.result() for future in dep_futures]
+            start = time.monotonic()
+            ok = False
+            try:
+                with tracing.span("startup." + name):
+                    result = func(*args)
+                ok = True
+                return result
+            finally:
+                end = time.monotonic()
+                with self._lock:
+                    self.timeline[name] = (start - self.t0, end - self.t0, ok)
+                tracing.observe("startup_seconds", end - start, subsystem=name)
+
+        self.futures[name] = self._executor.submit(run)
+        return self.futures[name]
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Hasil subsystem; menunggu jika belum siap (exception init diteruskan)"""
+        return self.futures[name].result(timeout)
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Tunggu subsystem selesai tanpa meneruskan exception; True jika sukses"""
+        return self.futures[name].exception(timeout) is None
+
+    def ready(self, name: str) -> bool:
+        """Sudah siap tanpa error? (tidak menunggu)"""
+        future = self.futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def when_ready(self, name: str, callback: Callable[[Any], None]):
+        """Panggil callback(hasil) setelah subsystem siap (langsung jika sudah)"""
+        def done(future: Future):
+            if future.exception() is None:
+                callback(future.result())
+        self.futures[name].add_done_callback(done)
+
+    def wait_all(self, timeout: Optional[float] = None) -> List[str]:
+        """Tunggu semua task; mengembalikan nama subsystem yang gagal"""
+        failed = []
+        for name, future in self.futures.items():
+            if future.exception(timeout) is not None:
+                failed.append(name)
+        return failed
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def report(self):
+        """Cetak timeline per subsystem (yang sudah selesai)"""
+        with self._lock:
+            timeline = sorted(self.timeline.items(), key=lambda item: item[1][0])
+        pending = [name for name in self.futures if name not in dict(timeline)]
+        if not timeline:
+            return
+
+        total = max(end for _, (_, end, _) in timeline)
+        busy = sum(end - start for _, (start, end, _) in timeline)
+        scale = BAR_WIDTH / total if total > 0 else 0
+
+        print("\n⏱ Timeline startup:")
+        for name, (start, end, ok) in timeline:
+            offset = int(start * scale)
+            bar = " " * offset + "█" * max(1, int(end * scale) - offset)
+            status = "✓" if ok else "✗"
+            print(f"   {status} {name:<12} {start:6.2f}s → {end:6.2f}s "
+                  f"({end - start:5.2f}s) |{bar:<{BAR_WIDTH}}|")
+        for name in pending:
+            print(f"   … {name:<12} masih berjalan")
+        print(f"   Total {total:.2f}s (berurutan {busy:.2f}s)")
+
+
+# Test program
+if __name__ == "__main__":
+    startup = Startup()
+    startup.task('serial', lambda: time.sleep(0.6) or "serial")
+    startup.task('speech', lambda: time.sleep(0.9) or "speech")
+    startup.task('movements', lambda serial: time.sleep(0.1) or f"movements({serial})", 'serial')
+    startup.task('home', lambda serial: time.sleep(0.5), 'serial')
+
+    print(startup.get('movements'))
+    startup.wait_all()
+    startup.report()
+    startup.shutdown()
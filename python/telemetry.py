@@ -0,0 +1,272 @@
+"""
+telemetry.py
+Polling posisi servo ("?" ke firmware) ke ring buffer NumPy per controller,
+deteksi gerakan selesai dari telemetry, dan teach pose dari rekaman posisi
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from python import tracing
+from python.serial_controller import SerialController
+
+DEFAULT_RATE_HZ = 20
+DEFAULT_CAPACITY = 2048       # ~100 detik pada 20 Hz
+DEFAULT_TOLERANCE = 10        # Selisih posisi (us) yang dianggap sudah sampai
+
+
+class TelemetryRing:
+    """
+    Ring buffer ukuran tetap: timestamp + posisi semua channel satu controller
+
+    Kolom posisi 0..channels-1 = channel 1..channels. Satu writer (worker
+    ControllerLink), banyak reader; pembacaan mengembalikan copy.
+    """
+
+    def __init__(self, channels: int, capacity: int = DEFAULT_CAPACITY):
+        self.channels = channels
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype=np.float64)
+        self.positions = np.zeros((capacity, channels), dtype=np.uint16)
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def append(self, t: float, positions: np.ndarray):
+        count = min(len(positions), self.channels)
+        with self._lock:
+            row = self.written % self.capacity
+            self.t[row] = t
+            self.positions[row, :count] = positions[:count]
+            self.written += 1
+
+    def latest(self) -> Optional[Tuple[float, np.ndarray]]:
+        with self._lock:
+            if not self.written:
+                return None
+            row = (self.written - 1) % self.capacity
+            return float(self.t[row]), self.positions[row].copy()
+
+    def since(self, t_start: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Semua frame dengan t >= t_start, urut waktu"""
+        with self._lock:
+            count = len(self)
+            order = (np.arange(self.written - count, self.written)) % self.capacity
+            t = self.t[order]
+            keep = t >= t_start
+            return t[keep], self.positions[order][keep]
+
+
+class TelemetryPoller:
+    """
+    Aktifkan query posisi periodik di semua ControllerLink
+
+    Query dikirim oleh worker link itu sendiri (port tetap punya satu pemilik),
+    frame POS masuk ke TelemetryRing per controller.
+    """
+
+    def __init__(self, serial: SerialController, rate_hz: float = DEFAULT_RATE_HZ,
+                 capacity: int = DEFAULT_CAPACITY):
+        self.serial = serial
+        self.config = serial.config
+        self.rate_hz = rate_hz
+        self.rings: Dict[str, TelemetryRing] = {}
+        self._cond = threading.Condition()
+
+        for name in serial.links:
+            channels = self.config.serial_config[name]['max_servos']
+            self.rings[name] = TelemetryRing(channels, capacity)
+
+        # part -> (controller_X, index kolom)
+        self.parts: Dict[str, Tuple[str, int]] = {}
+        for category, servos in self.config.servo_mapping.items():
+            for servo, info in servos.items():
+                name = f"controller_{info['controller']}"
+                if name in self.rings:
+                    self.parts[f"{category}.{servo}"] = (name, info['channel'] - 1)
+
+    def start(self) -> "TelemetryPoller":
+        for link in self.serial.links.values():
+            link.enable_telemetry(1.0 / self.rate_hz, self._on_frame)
+        tracing.log("info", f"📡 Telemetry posisi {self.rate_hz:g} Hz")
+        return self
+
+    def stop(self):
+        for link in self.serial.links.values():
+            link.disable_telemetry()
+
+    def _on_frame(self, name: str, t: float, positions: np.ndarray):
+        ring = self.rings.get(name)
+        if ring is None:
+            return
+        ring.append(t, positions)
+        with self._cond:
+            self._cond.notify_all()
+        if tracing.enabled():
+            tracing.count("telemetry_frames_total", controller=name[-1])
+
+    # ---------- Baca ----------
+    def position(self, part: str) -> Optional[int]:
+        """Posisi terakhir satu part, None jika belum ada frame"""
+        if part not in self.parts:
+            return None
+        name, column = self.parts[part]
+        latest = self.rings[name].latest()
+        return None if latest is None else int(latest[1][column])
+
+    def snapshot(self, parts: Optional[List[str]] = None) -> Dict[str, int]:
+        """Posisi terakhir semua part (atau part tertentu)"""
+        latest = {name: ring.latest() for name, ring in self.rings.items()}
+        result = {}
+        for part in parts or self.parts:
+            if part not in self.parts:
+                continue
+            name, column = self.parts[part]
+            if latest[name] is not None:
+                result[part] = int(latest[name][1][column])
+        return result
+
+    def history(self, part: str, seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(t, posisi) part selama `seconds` terakhir"""
+        name, column = self.parts[part]
+        t, positions = self.rings[name].since(time.monotonic() - seconds)
+        return t, positions[:, column]
+
+    # ---------- Gerakan selesai ----------
+    def reached(self, targets: Dict[str, int], tolerance: int = DEFAULT_TOLERANCE) -> bool:
+        current = self.snapshot(list(targets))
+        return all(part in current and abs(current[part] - position) <= tolerance
+                   for part, position in targets.items())
+
+    def wait_reached(self, targets: Dict[str, int], tolerance: int = DEFAULT_TOLERANCE,
+                     timeout: float = 5.0, cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Tunggu sampai semua part berada dalam `tolerance` dari target
+
+        Returns:
+            True jika sampai, False jika timeout atau dibatalkan
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self.reached(targets, tolerance):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (cancel is not None and cancel.is_set()):
+                    return False
+                self._cond.wait(min(remaining, 2.0 / self.rate_hz))
+        return True
+
+    # ---------- Teach ----------
+    def teach_pose(self, name: str, description: str = "", parts: Optional[List[str]] = None,
+                   time_ms: int = 800, save: bool = True) -> Dict:
+        """Simpan posisi saat ini sebagai pose single-step (tidak disimpan jika kosong)"""
+        pose = {
+            'name': name,
+            'description': description or "Diajarkan dari telemetry",
+            'servos': [{'part': part, 'position': position, 'time': time_ms}
+                       for part, position in self.snapshot(parts).items()],
+        }
+        if save and pose['servos']:
+            self.config.save_pose(name, pose)
+        return pose
+
+    def teach_sequence(self, name: str, seconds: float, description: str = "",
+                       parts: Optional[List[str]] = None, still: float = 2.0,
+                       hold: float = 0.1, min_change: int = 20, save: bool = True) -> Dict:
+        """
+        Ubah rekaman `seconds` terakhir menjadi pose `sequence`
+
+        Rekaman di-resample ke grid rate_hz; segmen diam (perubahan per sampel
+        <= `still` us selama >= `hold` detik) menjadi keyframe. Segmen diam
+        pertama adalah posisi awal; tiap keyframe berikutnya memuat part yang
+        berubah > min_change, `time` = lama gerakan sebelumnya dan `delay` =
+        lama diam sesudahnya.
+        """
+        parts = [part for part in (parts or self.parts) if part in self.parts]
+        t_end = time.monotonic()
+        grid = np.arange(t_end - seconds, t_end, 1.0 / self.rate_hz)
+
+        columns = []
+        for part in parts:
+            t, positions = self.history(part, seconds)
+            if len(t) < 2:
+                raise ValueError(f"Telemetry {part} belum cukup untuk teach")
+            columns.append(np.interp(grid, t, positions.astype(np.float64)))
+        samples = np.stack(columns, axis=1)
+
+        moving = np.abs(np.diff(samples, axis=0)).max(axis=1) > still
+        moving = np.concatenate([[False], moving])
+
+        # Segmen diam: (index awal, index akhir) yang cukup panjang
+        segments = []
+        start = None
+        for i, is_moving in enumerate(list(moving) + [True]):
+            if not is_moving and start is None:
+                start = i
+            elif is_moving and start is not None:
+                if (i - start) / self.rate_hz >= hold:
+                    segments.append((start, i - 1))
+                start = None
+
+        sequence = []
+        previous = samples[segments[0][1]] if segments else None
+        for (prev_start, prev_end), (seg_start, seg_end) in zip(segments, segments[1:]):
+            current = samples[(seg_start + seg_end) // 2]
+            changed = [j for j, part in enumerate(parts)
+                       if abs(current[j] - previous[j]) > min_change]
+            if not changed:
+                continue
+            move_ms = int(round((seg_start - prev_end) / self.rate_hz * 100)) * 10
+            step = {'servos': [{'part': parts[j], 'position': int(round(current[j])),
+                                'time': max(move_ms, 100)} for j in changed]}
+            hold_ms = int(round((seg_end - seg_start) / self.rate_hz * 100)) * 10
+            if hold_ms and seg_end < len(samples) - 1:
+                step['delay'] = hold_ms
+            sequence.append(step)
+            previous = current
+
+        pose = {
+            'name': name,
+            'description': description or f"Diajarkan dari telemetry {seconds:g} detik",
+            'sequence': sequence,
+        }
+        if save and sequence:
+            self.config.save_pose(name, pose)
+        return pose
+
+
+# Test program
+if __name__ == "__main__":
+    import json
+    from python.serial_controller import HumanoidController
+
+    parser = argparse.ArgumentParser(description="Telemetry posisi servo")
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--rate", type=float, default=50)
+    parser.add_argument("--pose", default="wave_hand", help="Pose yang direkam lalu diajarkan ulang")
+    args = parser.parse_args()
+
+    robot = HumanoidController(simulate=args.simulate)
+    try:
+        telemetry = robot.enable_telemetry(args.rate)
+        time.sleep(0.5)
+
+        start = time.monotonic()
+        robot.execute_pose(args.pose)
+        time.sleep(0.5)
+        elapsed = time.monotonic() - start
+
+        frames = {name: ring.written for name, ring in telemetry.rings.items()}
+        print(f"\nFrame telemetry: {frames}")
+        print(f"Posisi saat ini: {telemetry.snapshot()}")
+
+        taught = telemetry.teach_sequence(f"{args.pose}_taught", elapsed + 0.5, save=False)
+        print(f"\nPose hasil teach ({len(taught['sequence'])} step):")
+        print(json.dumps(taught, indent=2))
+    finally:
+        robot.close()
@@ -0,0 +1,451 @@
+"""
+teleop.py
+Teleoperasi real-time kepala dan lengan dari input kontinu (keyboard,
+gamepad /dev/input/js*, atau file event rekaman). Target per servo ditampung
+di mailbox "target terakhir menang": update yang belum terkirim ditimpa,
+bukan diantri, jadi backlog tidak pernah tumbuh
+"""
+
+import argparse
+import json
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from python import tracing
+from python.serial_controller import PRIORITY_NORMAL, HumanoidController
+from python.servo_config import ServoConfig
+
+# T per command teleop: cukup pendek agar responsif, cukup panjang agar halus
+TELEOP_TIME_MS = 40
+
+# Keyboard: key -> (part, langkah posisi)
+KEY_BINDINGS = {
+    'a': ('head.pan', -40), 'd': ('head.pan', 40),
+    'w': ('head.tilt', -40), 's': ('head.tilt', 40),
+    'i': ('right_arm.shoulder_pitch', -50), 'k': ('right_arm.shoulder_pitch', 50),
+    'j': ('right_arm.shoulder_roll', -50), 'l': ('right_arm.shoulder_roll', 50),
+    'u': ('right_arm.elbow', -50), 'o': ('right_arm.elbow', 50),
+    't': ('left_arm.shoulder_pitch', -50), 'g': ('left_arm.shoulder_pitch', 50),
+    'f': ('left_arm.shoulder_roll', -50), 'h': ('left_arm.shoulder_roll', 50),
+    'r': ('left_arm.elbow', -50), 'y': ('left_arm.elbow', 50),
+}
+
+# Gamepad: nomor axis -> part (stick kiri = kepala, stick kanan = lengan kanan)
+AXIS_BINDINGS = {
+    0: 'head.pan',
+    1: 'head.tilt',
+    3: 'right_arm.shoulder_roll',
+    4: 'right_arm.shoulder_pitch',
+}
+
+# Device joystick Linux default
+GAMEPAD_DEVICE = "/dev/input/js0"
+
+# struct js_event dari linux/joystick.h
+JS_EVENT = struct.Struct("<IhBB")
+JS_EVENT_BUTTON = 0x01
+JS_EVENT_AXIS = 0x02
+JS_EVENT_INIT = 0x80
+
+
+class TargetMailbox:
+    """
+    Satu slot target per servo, dikelompokkan per controller
+
+    put() menimpa target yang belum terkirim (coalesce). take() mengambil
+    slot yang paling lama menunggu di controller itu, jadi semua servo yang
+    aktif mendapat giliran bergantian.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # controller -> part -> (channel, posisi, t update pertama, t update terakhir)
+        self._slots: Dict[str, Dict[str, Tuple[int, int, float, float]]] = {}
+        self._ready: Dict[str, threading.Condition] = {}
+        self._closed = False
+        self.coalesced = 0
+
+    def _condition(self, controller: str) -> threading.Condition:
+        if controller not in self._ready:
+            self._ready[controller] = threading.Condition(self._lock)
+            self._slots[controller] = {}
+        return self._ready[controller]
+
+    def put(self, controller: str, part: str, channel: int, position: int,
+            t_input: float) -> bool:
+        """Simpan target; True jika menimpa target lama yang belum terkirim"""
+        with self._lock:
+            ready = self._condition(controller)
+            slots = self._slots[controller]
+            previous = slots.get(part)
+            if previous is not None:
+                self.coalesced += 1
+                slots[part] = (channel, position, previous[2], t_input)
+            else:
+                slots[part] = (channel, position, t_input, t_input)
+            ready.notify()
+            return previous is not None
+
+    def take(self, controller: str, timeout: Optional[float] = None
+             ) -> Optional[Tuple[str, int, int, float]]:
+        """
+        Ambil satu target
+
+        Returns:
+            (part, channel, posisi, t input terakhir), None jika timeout atau
+            mailbox ditutup
+        """
+        with self._lock:
+            ready = self._condition(controller)
+            slots = self._slots[controller]
+            if not ready.wait_for(lambda: slots or self._closed, timeout) or not slots:
+                return None
+            part = min(slots, key=lambda name: slots[name][2])
+            channel, position, _, t_input = slots.pop(part)
+            return part, channel, position, t_input
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(slots) for slots in self._slots.values())
+
+    def clear(self) -> int:
+        """Buang semua target yang belum terkirim (emergency stop)"""
+        with self._lock:
+            dropped = sum(len(slots) for slots in self._slots.values())
+            for slots in self._slots.values():
+                slots.clear()
+            return dropped
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for ready in self._ready.values():
+                ready.notify_all()
+
+
+class LatencyStats:
+    """Latency input -> wire dan input -> DONE per command terkirim"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wire: List[float] = []
+        self.done: List[float] = []
+        self.sent: Dict[str, int] = {}
+        self.failed = 0
+
+    def record(self, controller: str, wire: float, done: float, ok: bool):
+        with self._lock:
+            self.wire.append(wire)
+            self.done.append(done)
+            self.sent[controller] = self.sent.get(controller, 0) + 1
+            self.failed += not ok
+
+    def fail(self):
+        with self._lock:
+            self.failed += 1
+
+    @staticmethod
+    def _percentiles(samples: List[float]) -> Dict[str, float]:
+        if not samples:
+            return {'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        ms = np.array(samples) * 1000
+        return {'p50_ms': float(np.percentile(ms, 50)),
+                'p95_ms': float(np.percentile(ms, 95)),
+                'max_ms': float(ms.max())}
+
+    def summary(self) -> Dict:
+        return {'sent': dict(self.sent), 'failed': self.failed,
+                'wire': self._percentiles(self.wire), 'done': self._percentiles(self.done)}
+
+
+class Teleop:
+    """
+    Input kontinu -> mailbox -> satu sender thread per controller
+
+    Sender mengirim satu command per waktu dan langsung mengambil target
+    berikutnya begitu DONE datang, jadi setiap link berjalan pada rate
+    tertinggi yang bisa dilayaninya dan target yang dikirim selalu yang
+    terbaru.
+    """
+
+    def __init__(self, controller: HumanoidController, time_ms: int = TELEOP_TIME_MS,
+                 priority: int = PRIORITY_NORMAL):
+        self.controller = controller
+        self.config = controller.config
+        self.time_ms = time_ms
+        self.priority = priority
+        self.mailbox = TargetMailbox()
+        self.stats = LatencyStats()
+        self.events = 0
+        self.rejected = 0
+        self.elapsed = 0.0
+        self._t0 = 0.0
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self._stop.clear()
+        self._t0 = time.monotonic()
+        controllers = sorted({info['controller'] for servos in self.config.servo_mapping.values()
+                              for info in servos.values()})
+        for name in controllers:
+            if f"controller_{name}" not in self.controller.serial.links:
+                continue
+            thread = threading.Thread(target=self._sender, args=(name,),
+                                      name=f"teleop-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, drain: float = 2.0):
+        """Hentikan sender setelah target terakhir terkirim (maksimal `drain` detik)"""
+        deadline = time.monotonic() + drain
+        while self.mailbox.pending() and time.monotonic() < deadline and self._threads:
+            time.sleep(0.01)
+        self._stop.set()
+        self.mailbox.close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads.clear()
+        self.elapsed = time.monotonic() - self._t0
+
+    def update(self, part: str, position: int, t_input: Optional[float] = None) -> bool:
+        """Target baru dari input; posisi di-clamp ke limit servo"""
+        info = self.config.get_servo_info(part)
+        if info is None:
+            self.rejected += 1
+            return False
+        position = int(min(max(position, info.get('min', 500), 500), info.get('max', 2500), 2500))
+        self.events += 1
+        self.mailbox.put(info['controller'], part, info['channel'], position,
+                         time.monotonic() if t_input is None else t_input)
+        return True
+
+    def run(self, source: Iterator[Tuple[str, int]]):
+        """Konsumsi source sampai habis / Ctrl+C; tiap event dicap waktu saat diterima"""
+        self.start()
+        try:
+            for part, position in source:
+                if self._stop.is_set():
+                    break
+                self.update(part, position)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _sender(self, controller: str):
+        serial = self.controller.serial
+        while not self._stop.is_set():
+            target = self.mailbox.take(controller, timeout=0.1)
+            if target is None:
+                continue
+            if serial.is_aborted(self.priority):
+                self.mailbox.clear()
+                continue
+
+            part, channel, position, t_input = target
+            pending = serial.submit_command(controller, channel, position, self.time_ms, 0,
+                                            self.priority)
+            if pending is None:
+                self.stats.fail()
+                continue
+
+            ok = pending.wait()
+            wire = (pending.t_sent or pending.t_complete) - t_input
+            self.stats.record(controller, wire, pending.t_complete - t_input, ok)
+            if tracing.enabled():
+                tracing.observe("teleop_input_to_wire_seconds", wire, controller=controller)
+
+    def report(self, label: str = "Teleop"):
+        summary = self.stats.summary()
+        rates = ", ".join(f"{name} {count / self.elapsed:.1f} cmd/s"
+                          for name, count in sorted(summary['sent'].items())) if self.elapsed else "-"
+        wire, done = summary['wire'], summary['done']
+        print(f"\n🎮 {label}: {self.events} event, {sum(summary['sent'].values())} command "
+              f"({self.mailbox.coalesced} di-coalesce, {summary['failed']} gagal) "
+              f"dalam {self.elapsed:.1f}s")
+        print(f"   Link: {rates}")
+        print(f"   Input -> wire: p50 {wire['p50_ms']:.0f} ms, p95 {wire['p95_ms']:.0f} ms, "
+              f"max {wire['max_ms']:.0f} ms")
+        print(f"   Input -> DONE: p50 {done['p50_ms']:.0f} ms, p95 {done['p95_ms']:.0f} ms, "
+              f"max {done['max_ms']:.0f} ms")
+
+
+# ---------- Input source ----------
+def replay_source(path: str, speed: float = 1.0) -> Iterator[Tuple[str, int]]:
+    """File JSONL {"t": detik, "part": ..., "position": ...} diputar sesuai waktunya"""
+    start = time.monotonic()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            remaining = start + event['t'] / speed - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            yield event['part'], int(event['position'])
+
+
+def record_source(source: Iterator[Tuple[str, int]], path: str) -> Iterator[Tuple[str, int]]:
+    """Teruskan event sambil menyimpannya untuk replay_source"""
+    start = time.monotonic()
+    with open(path, 'w', encoding='utf-8') as f:
+        for part, position in source:
+            f.write(json.dumps({'t': round(time.monotonic() - start, 4),
+                                'part': part, 'position': position}) + "\n")
+            yield part, position
+
+
+def synthetic_source(parts: List[str], config: ServoConfig, rate: float = 100,
+                     seconds: float = 5) -> Iterator[Tuple[str, int]]:
+    """Sinus di tiap part pada `rate` Hz (benchmark tanpa operator)"""
+    period = 1 / rate
+    start = time.monotonic()
+    for i in range(int(seconds * rate)):
+        remaining = start + i * period - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        for k, part in enumerate(parts):
+            info = config.get_servo_info(part)
+            span = (info['max'] - info['min']) / 3
+            yield part, int(info['center'] + span * np.sin(2 * np.pi * 0.5 * i * period + k))
+
+
+def keyboard_available() -> bool:
+    """keyboard_source butuh termios dan stdin berupa terminal (bukan pipe/file)"""
+    return os.name == 'posix' and sys.stdin.isatty()
+
+
+def keyboard_source(config: ServoConfig) -> Iterator[Tuple[str, int]]:
+    """Key di KEY_BINDINGS menggeser target; spasi = semua ke center, q = selesai"""
+    import termios
+    import tty
+
+    targets = {part: config.get_servo_info(part)['center'] for part, _ in KEY_BINDINGS.values()}
+    fd = sys.stdin.fileno()
+    saved = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        while True:
+            if not select.select([sys.stdin], [], [], 0.1)[0]:
+                continue
+            key = sys.stdin.read(1).lower()
+            if key == 'q':
+                return
+            if key == ' ':
+                for part in targets:
+                    targets[part] = config.get_servo_info(part)['center']
+                    yield part, targets[part]
+            elif key in KEY_BINDINGS:
+                part, step = KEY_BINDINGS[key]
+                info = config.get_servo_info(part)
+                targets[part] = min(max(targets[part] + step, info['min']), info['max'])
+                yield part, targets[part]
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+
+def gamepad_source(config: ServoConfig, device: str = GAMEPAD_DEVICE) -> Iterator[Tuple[str, int]]:
+    """Axis joystick Linux -> posisi absolut di antara min dan max servo; tombol 0 = selesai"""
+    with open(device, 'rb') as js:
+        while True:
+            data = js.read(JS_EVENT.size)
+            if len(data) < JS_EVENT.size:
+                return
+            _, value, kind, number = JS_EVENT.unpack(data)
+            if kind & JS_EVENT_INIT:
+                continue
+            if kind & JS_EVENT_BUTTON and number == 0 and value:
+                return
+            if kind & JS_EVENT_AXIS and number in AXIS_BINDINGS:
+                part = AXIS_BINDINGS[number]
+                info = config.get_servo_info(part)
+                half = (info['max'] - info['min']) / 2
+                yield part, int(info['center'] + value / 32767 * half)
+
+
+def run_baseline(controller: HumanoidController, source: Iterator[Tuple[str, int]]) -> LatencyStats:
+    """Perbandingan: tiap event diantri lalu move_part blocking satu per satu"""
+    events: queue.Queue = queue.Queue()
+    stats = LatencyStats()
+
+    def consume():
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            part, position, t_input = item
+            ok = controller.move_part(part, position, time_ms=TELEOP_TIME_MS, delay_ms=0)
+            now = time.monotonic()
+            stats.record(controller.config.get_servo_info(part)['controller'], now - t_input,
+                         now - t_input, ok)
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    count = 0
+    for part, position in source:
+        events.put((part, position, time.monotonic()))
+        count += 1
+    backlog = events.qsize()
+    events.put(None)
+    consumer.join()
+
+    done = stats.summary()['done']
+    print(f"\n🐢 Baseline move_part: {count} event, backlog saat input berhenti {backlog}, "
+          f"input -> DONE p50 {done['p50_ms']:.0f} ms, max {done['max_ms']:.0f} ms")
+    return stats
+
+
+# Command line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teleoperasi kepala dan lengan")
+    parser.add_argument("source", nargs="?", default="keyboard",
+                        help="keyboard, gamepad, synthetic, atau file event .jsonl")
+    parser.add_argument("--device", default=GAMEPAD_DEVICE)
+    parser.add_argument("--record", help="Simpan event ke file .jsonl")
+    parser.add_argument("--time-ms", type=int, default=TELEOP_TIME_MS)
+    parser.add_argument("--rate", type=float, default=100, help="Rate synthetic (Hz)")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--baseline", action="store_true",
+                        help="Bandingkan dengan move_part blocking (synthetic)")
+    parser.add_argument("--simulate", action="store_true")
+    args = parser.parse_args()
+
+    robot = HumanoidController(simulate=args.simulate)
+    parts = ['head.pan', 'head.tilt', 'right_arm.shoulder_pitch']
+
+    def make_source():
+        if args.source == "keyboard":
+            print("⌨ a/d w/s = kepala, i/k j/l u/o = lengan kanan, t/g f/h r/y = lengan kiri, "
+                  "spasi = center, q = selesai")
+            return keyboard_source(robot.config)
+        if args.source == "gamepad":
+            return gamepad_source(robot.config, args.device)
+        if args.source == "synthetic":
+            return synthetic_source(parts, robot.config, args.rate, args.seconds)
+        if not os.path.exists(args.source):
+            raise SystemExit(f"✗ File event tidak ditemukan: {args.source}")
+        return replay_source(args.source)
+
+    try:
+        source = make_source()
+        if args.record:
+            source = record_source(source, args.record)
+
+        teleop = Teleop(robot, args.time_ms)
+        teleop.run(source)
+        teleop.report()
+
+        if args.baseline:
+            run_baseline(robot, synthetic_source(parts, robot.config, args.rate, args.seconds))
+    finally:
+        robot.close()
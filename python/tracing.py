@@ -0,0 +1,362 @@
+"""
+tracing.py
+Instrumentasi stack kontrol: span, histogram latency, counter, log berlevel
+Export ke JSON lines dan teks Prometheus; hampir tanpa biaya saat dimatikan
+"""
+
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+# Bucket histogram latency (detik), mirip default client Prometheus
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "robot_"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histogram bucket kumulatif (format Prometheus)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # +Inf di akhir
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Perkiraan kuantil dari bucket (batas atas bucket)"""
+        target = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts[:-1]):
+            cumulative += count
+            if cumulative >= target and self.count:
+                return self.buckets[i]
+        return float('inf')
+
+
+class _NullSpan:
+    """Span kosong yang dipakai saat tracing dimatikan"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Satu operasi bertiming; nested span mencatat parent-nya"""
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.id = next(tracer._span_ids)
+        self.parent: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent = parent.id if parent else None
+        self._token = _current_span.set(self)
+        self.ts = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.tracer._finish(self)
+        return False
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+
+
+class Tracer:
+    """
+    Kumpulan metric + sink JSON lines
+
+    Saat `enabled` False, span() mengembalikan NULL_SPAN dan count()/observe()
+    langsung kembali, jadi instrumentasi di hot path hanya berupa satu cek bool.
+    log() tetap mencetak ke console sesuai `console_level`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.console_level = LEVELS['info']
+
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._span_ids = itertools.count(1)
+        self._sink = None
+        self._unflushed = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def configure(self, enabled: bool = True, jsonl_path: Optional[str] = None,
+                  console_level: str = "info"):
+        """
+        Args:
+            enabled: Aktifkan span dan metric
+            jsonl_path: File JSON lines untuk span dan log (None = tidak ditulis)
+            console_level: Level minimum log yang dicetak ke console
+        """
+        self.close()
+        self.enabled = enabled
+        self.console_level = LEVELS[console_level]
+        if enabled and jsonl_path:
+            directory = os.path.dirname(jsonl_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._sink = open(jsonl_path, 'a', encoding='utf-8')
+
+    # ---------- API instrumentasi ----------
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def count(self, metric: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, metric: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def log(self, level: str, message: str, **attrs):
+        """Pengganti print: dicetak jika level >= console_level, dicatat jika tracing aktif"""
+        if LEVELS[level] >= self.console_level:
+            print(message)
+        if self._sink is not None:
+            self._write({'type': 'log', 'ts': time.time(), 'level': level,
+                         'message': message, **attrs})
+
+    def is_enabled_for(self, level: str) -> bool:
+        return LEVELS[level] >= self.console_level
+
+    def _finish(self, span: Span):
+        self.observe("span_duration_seconds", span.duration, name=span.name)
+        if span.error:
+            self.count("span_errors_total", name=span.name)
+        if self._sink is not None:
+            self._write({'type': 'span', 'name': span.name, 'id': span.id,
+                         'parent': span.parent, 'ts': span.ts,
+                         'dur_ms': round(span.duration * 1000, 3),
+                         'error': span.error, 'attrs': span.attrs})
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._sink is None:
+                return
+            self._sink.write(line)
+            self._unflushed += 1
+            if self._unflushed >= 100:
+                self._sink.flush()
+                self._unflushed = 0
+
+    # ---------- Export ----------
+    def snapshot(self) -> Dict:
+        """Salinan semua metric (untuk benchmark/report)"""
+        with self._lock:
+            return {
+                'counters': {self._format_key(n, l): v for (n, l), v in self._counters.items()},
+                'histograms': {self._format_key(n, l): {
+                    'count': h.count, 'sum': h.sum,
+                    'p50': h.quantile(0.5), 'p99': h.quantile(0.99),
+                } for (n, l), h in self._histograms.items()},
+            }
+
+    @staticmethod
+    def _format_key(name: str, labels: Labels, extra: Labels = ()) -> str:
+        labels = labels + extra
+        if not labels:
+            return name
+        body = ",".join(f'{k}="{v}"' for k, v in labels)
+        return f"{name}{{{body}}}"
+
+    def render_prometheus(self) -> str:
+        """Metric dalam format teks exposition Prometheus"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+            typed = set()
+            for (name, labels), value in counters:
+                metric = METRIC_PREFIX + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{self._format_key(metric, labels)} {value:g}")
+
+            for (name, labels), histogram in histograms:
+                metric = METRIC_PREFIX + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float('inf') else f"{bound:g}"
+                    lines.append(f"{self._format_key(metric + '_bucket', labels, (('le', le),))} {cumulative}")
+                lines.append(f"{self._format_key(metric + '_sum', labels)} {histogram.sum:.6f}")
+                lines.append(f"{self._format_key(metric + '_count', labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Endpoint HTTP /metrics di thread background"""
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server
+
+    def close(self):
+        with self._lock:
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+TRACER = Tracer()
+atexit.register(TRACER.close)
+
+# Shortcut level modul: `from python import tracing; tracing.span(...)`
+configure = TRACER.configure
+span = TRACER.span
+count = TRACER.count
+observe = TRACER.observe
+log = TRACER.log
+is_enabled_for = TRACER.is_enabled_for
+render_prometheus = TRACER.render_prometheus
+serve_metrics = TRACER.serve_metrics
+snapshot = TRACER.snapshot
+
+
+def enabled() -> bool:
+    return TRACER.enabled
+
+
+def traced(name: str):
+    """Decorator: bungkus seluruh pemanggilan fungsi dalam span `name`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with Span(TRACER, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure_from_env():
+    """
+    Konfigurasi dari environment:
+        ROBOT_TRACE         : path file JSON lines (atau "1" = metric saja)
+        ROBOT_METRICS_PORT  : port endpoint /metrics
+        ROBOT_LOG_LEVEL     : debug, info, warning, error
+    """
+    trace = os.environ.get("ROBOT_TRACE")
+    port = os.environ.get("ROBOT_METRICS_PORT")
+    level = os.environ.get("ROBOT_LOG_LEVEL", "info").strip().lower()
+    if level not in LEVELS:
+        print(f"⚠ ROBOT_LOG_LEVEL tidak dikenal: {level!r}, memakai 'info' "
+              f"(pilihan: {', '.join(LEVELS)})")
+        level = 'info'
+
+    if trace or port:
+        configure(enabled=True, jsonl_path=None if trace in (None, "1") else trace,
+                  console_level=level)
+        if port:
+            serve_metrics(int(port))
+            log('info', f"📈 Metrics di http://127.0.0.1:{port}/metrics")
+    else:
+        TRACER.console_level = LEVELS[level]
+
+
+# Test program
+if __name__ == "__main__":
+    loops = 200_000
+
+    start = time.perf_counter()
+    for _ in range(loops):
+        with span("noop"):
+            observe("noop_seconds", 0.001)
+    disabled = (time.perf_counter() - start) / loops * 1e9
+
+    configure(enabled=True)
+    start = time.perf_counter()
+    for _ in range(loops):
+        with span("test"):
+            observe("test_seconds", 0.001)
+    active = (time.perf_counter() - start) / loops * 1e9
+
+    print(f"span + observe: {disabled:.0f} ns (mati), {active:.0f} ns (aktif)")
+    print(render_prometheus()[:400])
@@ -0,0 +1,489 @@
+"""
+tts_engine.py
+Render speech ke WAV buffer, cache di disk, dan playback dari memory
+"""
+
+import base64
+import hashlib
+import io
+import os
+import platform
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from python import tracing
+
+
+def _data_offset(wav_bytes: bytes) -> int:
+    """Offset awal sampel (isi chunk 'data'), -1 jika tidak ditemukan"""
+    offset = 12
+    while offset + 8 <= len(wav_bytes):
+        chunk_id = wav_bytes[offset:offset + 4]
+        size = int.from_bytes(wav_bytes[offset + 4:offset + 8], 'little')
+        if chunk_id == b'data':
+            return offset + 8
+        offset += 8 + size + (size & 1)
+    return -1
+
+
+def wav_duration(wav_bytes: bytes) -> float:
+    """
+    Durasi WAV dalam detik (0.0 jika buffer tidak valid)
+
+    Jumlah frame dibatasi byte sampel yang benar-benar ada: espeak --stdout
+    menulis ukuran data 0x7ffff000 karena output-nya pipe.
+    """
+    try:
+        with wave.open(io.BytesIO(wav_bytes), 'rb') as wav:
+            rate = wav.getframerate()
+            frame_size = wav.getnchannels() * wav.getsampwidth()
+            frames = wav.getnframes()
+    except Exception:
+        return 0.0
+
+    offset = _data_offset(wav_bytes)
+    if not rate or not frame_size or offset < 0:
+        return 0.0
+    frames = min(frames, (len(wav_bytes) - offset) // frame_size)
+    return frames / rate
+
+
+class SpeechCache:
+    """Cache WAV content-addressed: memory (LRU) + file di disk"""
+
+    def __init__(self, cache_dir: str = "./data/tts_cache", max_memory_items: int = 64):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(engine_id: str, text: str) -> str:
+        """Key cache = sha256(engine + text)"""
+        return hashlib.sha256(f"{engine_id}\0{text}".encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        # Tulis ke file sementara dulu supaya render paralel tidak saling menimpa
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠ Gagal menyimpan cache TTS: {e}")
+
+        self._remember(key, data)
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+
+class WavRenderer:
+    """Base class renderer text -> WAV bytes"""
+
+    engine_id = "none"
+
+    def available(self) -> bool:
+        return False
+
+    def render(self, text: str) -> Optional[bytes]:
+        return None
+
+    def close(self):
+        pass
+
+
+class PowerShellRenderer(WavRenderer):
+    """
+    Windows: satu proses PowerShell long-lived dengan SpeechSynthesizer
+
+    Text dikirim per baris (base64) lewat stdin, WAV dikembalikan
+    sebagai satu baris base64 di stdout.
+    """
+
+    engine_id = "sapi"
+
+    SCRIPT = r"""
+Add-Type -AssemblyName System.Speech
+$s = New-Object System.Speech.Synthesis.SpeechSynthesizer
+[Console]::Out.WriteLine("READY")
+[Console]::Out.Flush()
+while (($line = [Console]::In.ReadLine()) -ne $null) {
+    $text = [Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($line))
+    $ms = New-Object System.IO.MemoryStream
+    $s.SetOutputToWaveStream($ms)
+    $s.Speak($text)
+    $s.SetOutputToNull()
+    [Console]::Out.WriteLine([Convert]::ToBase64String($ms.ToArray()))
+    [Console]::Out.Flush()
+}
+"""
+
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return platform.system() == "Windows" and shutil.which("powershell") is not None
+
+    def _ensure_process(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            encoded = base64.b64encode(self.SCRIPT.encode('utf-16-le')).decode('ascii')
+            self._proc = subprocess.Popen(
+                ["powershell", "-NoProfile", "-NonInteractive", "-EncodedCommand", encoded],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True
+            )
+            self._proc.stdout.readline()  # READY
+        return self._proc
+
+    def render(self, text: str) -> Optional[bytes]:
+        with self._lock:
+            try:
+                proc = self._ensure_process()
+                proc.stdin.write(base64.b64encode(text.encode('utf-8')).decode('ascii') + "\n")
+                proc.stdin.flush()
+                line = proc.stdout.readline().strip()
+                return base64.b64decode(line) if line else None
+            except Exception as e:
+                print(f"✗ Error render TTS: {e}")
+                self.close()
+                return None
+
+    def close(self):
+        if self._proc and self._proc.poll() is None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=2)
+            except Exception:
+                self._proc.kill()
+        self._proc = None
+
+
+class CommandRenderer(WavRenderer):
+    """
+    Linux/macOS: render lewat espeak --stdout atau say -o
+
+    Tool ini tidak punya mode server, jadi satu proses per render; proses
+    hanya dipanggil saat cache miss dan bisa dijalankan di background.
+    """
+
+    def __init__(self):
+        system = platform.system()
+        self._espeak = shutil.which("espeak-ng") or shutil.which("espeak")
+        self._say = shutil.which("say") if system == "Darwin" else None
+        self.engine_id = "say" if self._say else "espeak"
+
+    def available(self) -> bool:
+        return bool(self._say or self._espeak)
+
+    def render(self, text: str) -> Optional[bytes]:
+        try:
+            if self._say:
+                tmp_path = os.path.join(
+                    os.path.expanduser("~"), f".tts_{threading.get_ident()}.wav")
+                subprocess.run(
+                    [self._say, "-o", tmp_path, "--data-format=LEI16@22050", text],
+                    check=True,
+                    capture_output=True
+                )
+                with open(tmp_path, 'rb') as f:
+                    data = f.read()
+                os.remove(tmp_path)
+                return data
+
+            if self._espeak:
+                result = subprocess.run(
+                    [self._espeak, "--stdout", text],
+                    check=True,
+                    capture_output=True
+                )
+                return result.stdout
+
+        except Exception as e:
+            print(f"✗ Error render TTS: {e}")
+
+        return None
+
+
+class SilentRenderer(WavRenderer):
+    """Render WAV sunyi dengan durasi sebanding panjang text (untuk benchmark)"""
+
+    engine_id = "silent"
+
+    def __init__(self, chars_per_second: float = 14.0, sample_rate: int = 16000):
+        self.chars_per_second = chars_per_second
+        self.sample_rate = sample_rate
+
+    def available(self) -> bool:
+        return True
+
+    def render(self, text: str) -> Optional[bytes]:
+        frames = int(len(text) / self.chars_per_second * self.sample_rate)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(b"\0\0" * frames)
+        return buffer.getvalue()
+
+
+class AudioPlayer:
+    """Playback WAV dari memory"""
+
+    def __init__(self):
+        self.system = platform.system()
+        self._aplay = shutil.which("aplay")
+        self._afplay = shutil.which("afplay")
+        self._proc: Optional[subprocess.Popen] = None
+        self.stopped = False  # True jika playback terakhir dihentikan stop()
+
+    def available(self) -> bool:
+        if self.system == "Windows":
+            return True
+        return bool(self._aplay or self._afplay)
+
+    def play(self, wav_bytes: bytes, path: Optional[str] = None) -> bool:
+        """
+        Putar WAV (blocking sampai selesai)
+
+        Args:
+            wav_bytes: Isi file WAV
+            path: File cache yang sama (dipakai jika player butuh file)
+        """
+        self.stopped = False
+        try:
+            if self.system == "Windows":
+                import winsound
+                winsound.PlaySound(wav_bytes, winsound.SND_MEMORY)
+                return True
+
+            if self._aplay:
+                self._proc = subprocess.Popen(
+                    [self._aplay, "-q", "-"],
+                    stdin=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL
+                )
+                try:
+                    self._proc.communicate(wav_bytes)
+                except BrokenPipeError:
+                    pass  # Playback dihentikan oleh stop()
+                return self._proc.returncode == 0
+
+            if self._afplay and path:
+                self._proc = subprocess.Popen([self._afplay, path])
+                self._proc.wait()
+                return self._proc.returncode == 0
+
+        except Exception as e:
+            print(f"✗ Error playback: {e}")
+
+        return False
+
+    def stop(self):
+        """Hentikan playback yang sedang berjalan"""
+        self.stopped = True
+        if self.system == "Windows":
+            try:
+                import winsound
+                winsound.PlaySound(None, 0)
+            except Exception:
+                pass
+        if self._proc and self._proc.poll() is None:
+            self._proc.terminate()
+
+
+class NullAudioSink(AudioPlayer):
+    """
+    Player tanpa speaker: hanya mencatat kapan playback dimulai
+
+    Args:
+        realtime: True = tunggu selama durasi audio (meniru speaker asli)
+    """
+
+    def __init__(self, realtime: bool = True):
+        super().__init__()
+        self.realtime = realtime
+        self.play_times: List[float] = []
+        self._stop = threading.Event()
+
+    def available(self) -> bool:
+        return True
+
+    def play(self, wav_bytes: bytes, path: Optional[str] = None) -> bool:
+        self.play_times.append(time.time())
+        self.stopped = False
+        self._stop.clear()
+        if self.realtime:
+            self._stop.wait(wav_duration(wav_bytes))
+        return True
+
+    def stop(self):
+        self.stopped = True
+        self._stop.set()
+
+
+class SpeechEngine:
+    """
+    Layer TTS: renderer long-lived + cache WAV + playback dari memory
+
+    Render berulang untuk text yang sama hanya membaca cache, sehingga
+    latency per-ucapan tinggal waktu mulai playback.
+    """
+
+    def __init__(self,
+                 cache_dir: str = "./data/tts_cache",
+                 renderer: Optional[WavRenderer] = None,
+                 player: Optional[AudioPlayer] = None,
+                 workers: int = 2):
+        self.renderer = renderer or self._default_renderer()
+        self.player = player or AudioPlayer()
+        self.cache = SpeechCache(cache_dir)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self._pending: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+
+    @staticmethod
+    def _default_renderer() -> WavRenderer:
+        for renderer in (PowerShellRenderer(), CommandRenderer()):
+            if renderer.available():
+                return renderer
+        return WavRenderer()
+
+    def available(self) -> bool:
+        return self.renderer.available() and self.player.available()
+
+    def _key(self, text: str) -> str:
+        return SpeechCache.make_key(self.renderer.engine_id, text)
+
+    @tracing.traced("tts.render")
+    def render(self, text: str) -> Optional[bytes]:
+        """Text -> WAV bytes (dari cache jika ada)"""
+        key = self._key(text)
+
+        data = self.cache.get(key)
+        if data is not None:
+            tracing.count("tts_cache_total", result="hit")
+            return data
+        tracing.count("tts_cache_total", result="miss")
+
+        # Jika sedang di-prerender di background, tunggu hasilnya
+        with self._pending_lock:
+            future = self._pending.get(key)
+        if future is not None:
+            return future.result()
+
+        data = self.renderer.render(text)
+        if data:
+            self.cache.put(key, data)
+        return data
+
+    def prerender(self, texts: List[str]) -> List[Future]:
+        """Render beberapa text di background pool (untuk script/demo)"""
+        futures = []
+
+        for text in texts:
+            key = self._key(text)
+            with self._pending_lock:
+                if key in self._pending:
+                    futures.append(self._pending[key])
+                    continue
+                future = self._pool.submit(self._render_pending, key, text)
+                self._pending[key] = future
+            futures.append(future)
+
+        return futures
+
+    def _render_pending(self, key: str, text: str) -> Optional[bytes]:
+        try:
+            data = self.cache.get(key)
+            if data is None:
+                data = self.renderer.render(text)
+                if data:
+                    self.cache.put(key, data)
+            return data
+        finally:
+            with self._pending_lock:
+                self._pending.pop(key, None)
+
+    @tracing.traced("tts.say")
+    def say(self, text: str) -> bool:
+        """Render (atau ambil dari cache) lalu putar"""
+        data = self.render(text)
+        if not data:
+            return False
+        return self.player.play(data, self.cache.path_for(self._key(text)))
+
+    def stop(self):
+        self.player.stop()
+
+    def stopped(self) -> bool:
+        """True jika ucapan terakhir dihentikan (barge-in / stop), bukan gagal"""
+        return self.player.stopped
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.renderer.close()
+
+
+# Test program
+if __name__ == "__main__":
+    print("=== Testing Speech Engine ===\n")
+
+    engine = SpeechEngine()
+    print(f"Renderer: {engine.renderer.engine_id}, available: {engine.available()}")
+
+    text = "Halo, saya adalah robot humanoid!"
+
+    start = time.time()
+    wav = engine.render(text)
+    print(f"Render pertama: {time.time() - start:.3f}s")
+
+    start = time.time()
+    wav = engine.render(text)
+    print(f"Render kedua (cache): {time.time() - start:.3f}s")
+
+    if wav:
+        print(f"Durasi audio: {wav_duration(wav):.2f}s")
+        engine.say(text)
+
+    engine.close()
+    print("\n✓ Test selesai!")
@@ -5,27 +5,50 @@ Text-to-Speech dengan Ollama AI
 
 import requests
 import json
+import re
 import subprocess
 import platform
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from python import tracing
+from python.tts_engine import SpeechEngine, wav_duration
+
+EMOTIONS = ['happy', 'sad', 'neutral', 'excited', 'thinking']
+
+
+def parse_emotion(reply: str) -> Optional[str]:
+    """Emotion pertama yang disebut di jawaban LLM (None jika tidak ada)"""
+    reply = reply.lower()
+    for emotion in EMOTIONS:
+        if emotion in reply:
+            return emotion
+    return None
 
 class OllamaTTS:
     def __init__(self, 
                  model: str = "llama2",
-                 ollama_url: str = "http://localhost:11434"):
+                 ollama_url: str = "http://localhost:11434",
+                 engine: Optional[SpeechEngine] = None):
         """
         Initialize Ollama TTS
         
         Args:
             model: Model Ollama yang digunakan (default: llama2)
             ollama_url: URL Ollama API
+            engine: Speech engine (None = engine system default)
         """
         self.model = model
         self.ollama_url = ollama_url
         self.api_url = f"{ollama_url}/api/generate"
         
+        # Engine TTS dengan cache WAV (render sekali, putar dari memory)
+        self.engine = engine or SpeechEngine()
+        self._playback = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speech")
+        
         # Check Ollama availability
-        if not self.check_ollama():
+        self.available = self.check_ollama()
+        if not self.available:
             print("⚠ Ollama tidak terdeteksi!")
             print("   Install dari: https://ollama.ai")
             print("   Atau jalankan: ollama serve")
@@ -38,6 +61,7 @@ class OllamaTTS:
         except:
             return False
     
+    @tracing.traced("llm.speech_response")
     def generate_speech_response(self, 
                                  text: str, 
                                  context: str = "",
@@ -83,16 +107,99 @@ Response (keep it natural and conversational):"""
                 generated_text = result.get('response', '').strip()
                 return generated_text
             else:
-                print(f"✗ Ollama error: {response.status_code}")
+                tracing.log("error", f"✗ Ollama error: {response.status_code}")
                 return None
                 
         except requests.exceptions.Timeout:
-            print("✗ Ollama timeout")
+            tracing.log("error", "✗ Ollama timeout")
             return None
         except Exception as e:
             print(f"✗ Error: {e}")
             return None
     
+    @tracing.traced("llm.generate")
+    def generate_with_context(self,
+                              prompt: str,
+                              context: Optional[List[int]] = None,
+                              temperature: float = 0.7,
+                              timeout: float = 30,
+                              cancel_event: Optional[threading.Event] = None,
+                              on_token: Optional[Callable[[str], None]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Generate dengan meneruskan token `context` dari request sebelumnya
+
+        Ollama hanya mengevaluasi token baru di `prompt`; prefix yang sudah
+        ada di `context` tidak diproses ulang.
+
+        Args:
+            prompt: Prompt baru (tanpa history)
+            context: Token context dari response sebelumnya (None = mulai baru)
+            temperature: Creativity level (0.0 - 1.0)
+            timeout: Timeout request (detik)
+            cancel_event: Jika diberikan, response di-stream dan koneksi
+                          ditutup begitu event di-set (Ollama ikut berhenti)
+            on_token: Callback per token (mengaktifkan streaming)
+
+        Returns:
+            Dict response Ollama (response, context, prompt_eval_count, ...)
+            atau None jika gagal/dibatalkan
+        """
+        stream = cancel_event is not None or on_token is not None
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "temperature": temperature,
+            "keep_alive": "10m"
+        }
+        if context:
+            payload["context"] = context
+
+        try:
+            response = requests.post(self.api_url, json=payload, timeout=timeout,
+                                     stream=stream)
+
+            if response.status_code != 200:
+                tracing.log("error", f"✗ Ollama error: {response.status_code}")
+                return None
+
+            if not stream:
+                return self._record_usage(response.json())
+
+            # Streaming: kumpulkan token sambil memeriksa pembatalan
+            chunks = []
+            with response:
+                for line in response.iter_lines():
+                    if cancel_event is not None and cancel_event.is_set():
+                        return None
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    token = data.get('response', '')
+                    chunks.append(token)
+                    if on_token and token:
+                        on_token(token)
+                    if data.get('done'):
+                        data['response'] = ''.join(chunks)
+                        return self._record_usage(data)
+
+            return None
+
+        except requests.exceptions.Timeout:
+            tracing.log("error", "✗ Ollama timeout")
+            return None
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            return None
+
+    @staticmethod
+    def _record_usage(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Catat jumlah token prompt/generate ke metric"""
+        if tracing.enabled():
+            tracing.count("llm_tokens_total", result.get('prompt_eval_count', 0), kind="prompt")
+            tracing.count("llm_tokens_total", result.get('eval_count', 0), kind="eval")
+        return result
+    
     def speak(self, text: str, use_system_tts: bool = True) -> bool:
         """
         Speak text menggunakan system TTS
@@ -114,8 +221,61 @@ Response (keep it natural and conversational):"""
         
         return True
     
+    def speak_async(self, text: str,
+                    cancel_event: Optional[threading.Event] = None) -> Tuple[Future, float]:
+        """
+        Mulai speak di background (non-blocking)
+        
+        Args:
+            text: Text yang akan di-speak
+            cancel_event: Playback dilewati jika event sudah di-set saat
+                          giliran ucapan ini tiba
+        
+        Returns:
+            (future playback, durasi audio dalam detik)
+        """
+        print(f"💬 Speaking: {text}")
+        
+        wav = self.engine.render(text) if self.engine.available() else None
+        if wav:
+            speak_func = self.engine.say
+            duration = wav_duration(wav)
+        else:
+            # Tanpa WAV durasi hanya bisa diestimasi (~2.5 kata/detik)
+            speak_func = self._subprocess_speak
+            duration = len(text.split()) / 2.5
+        
+        def play() -> bool:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            return speak_func(text)
+        
+        return self._playback.submit(play), duration
+    
+    def stop_speaking(self):
+        """Hentikan playback yang sedang berjalan"""
+        self.engine.stop()
+    
+    def prerender(self, texts: List[str]) -> List[Future]:
+        """Render text ke cache di background agar playback nanti instan"""
+        if not self.engine.renderer.available():
+            return []
+        return self.engine.prerender(texts)
+    
     def _system_speak(self, text: str) -> bool:
         """Gunakan system TTS untuk speak"""
+        if self.engine.available():
+            if self.engine.say(text):
+                return True
+            if self.engine.stopped():
+                # Dihentikan stop_speaking(): jangan diulang lewat fallback
+                return False
+        
+        # Fallback: satu proses TTS per ucapan
+        return self._subprocess_speak(text)
+    
+    def _subprocess_speak(self, text: str) -> bool:
+        """Speak langsung lewat command TTS system (tanpa cache)"""
         system = platform.system()
         
         try:
@@ -160,6 +320,7 @@ Response (keep it natural and conversational):"""
             print(f"✗ Error TTS: {e}")
             return False
     
+    @tracing.traced("llm.emotion")
     def analyze_emotion(self, text: str) -> str:
         """
         Analisis emosi dari text menggunakan Ollama
@@ -189,29 +350,192 @@ Emotion:"""
             
             if response.status_code == 200:
                 result = response.json()
-                emotion = result.get('response', '').strip().lower()
-                
-                # Validasi emotion
-                valid_emotions = ['happy', 'sad', 'neutral', 'excited', 'thinking']
-                if any(e in emotion for e in valid_emotions):
-                    for e in valid_emotions:
-                        if e in emotion:
-                            return e
-                
-                return 'neutral'
+                return parse_emotion(result.get('response', '')) or 'neutral'
             
             return 'neutral'
             
         except Exception as e:
             print(f"⚠ Error analyzing emotion: {e}")
             return 'neutral'
+    
+    @tracing.traced("llm.emotion_batch")
+    def analyze_emotions(self, texts: List[str]) -> List[Optional[str]]:
+        """
+        Analisis emosi beberapa text dalam satu request Ollama
+        
+        Returns:
+            Emotion per text, urut sesuai input; None untuk baris yang tidak
+            terjawab (pemanggil bisa fallback ke analyze_emotion)
+        """
+        numbered = "\n".join(f'{i}. "{text}"' for i, text in enumerate(texts, 1))
+        prompt = f"""Classify the emotion of each numbered line. Answer with one line per input in the form "<number>: <emotion>", where emotion is one of: happy, sad, neutral, excited, thinking.
+
+{numbered}
+
+Emotions:"""
+        
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "temperature": 0.3
+        }
+        
+        try:
+            response = requests.post(self.api_url, json=payload, timeout=10 + 2 * len(texts))
+            if response.status_code != 200:
+                return [None] * len(texts)
+            reply = response.json().get('response', '')
+        except Exception as e:
+            print(f"⚠ Error analyzing emotions: {e}")
+            return [None] * len(texts)
+        
+        emotions: List[Optional[str]] = [None] * len(texts)
+        for number, answer in re.findall(r'^\s*(\d+)\s*[:.)-]\s*(.+)$', reply, re.MULTILINE):
+            index = int(number) - 1
+            if 0 <= index < len(texts):
+                emotions[index] = parse_emotion(answer)
+        return emotions
+
+
+class ConversationSession:
+    """
+    Sesi percakapan multi-turn dengan Ollama
+
+    Menyimpan array `context` yang dikembalikan Ollama sehingga persona dan
+    history yang sudah dievaluasi tidak diproses ulang di setiap turn.
+    History dibatasi `max_turns`; saat penuh (atau context melebihi
+    `max_context_tokens`), turn lama diringkas dan context di-reset ke
+    persona + ringkasan + beberapa turn terakhir.
+    """
+
+    PERSONA = ("You are a friendly humanoid robot having a spoken conversation "
+               "with a human. Reply in one to three short, natural sentences "
+               "in the same language the human uses.")
+
+    def __init__(self,
+                 tts: OllamaTTS,
+                 max_turns: int = 8,
+                 max_context_tokens: int = 3072,
+                 keep_recent: int = 2):
+        """
+        Args:
+            tts: Instance OllamaTTS untuk request ke Ollama
+            max_turns: Jumlah turn maksimal sebelum history diringkas
+            max_context_tokens: Batas panjang context token sebelum diringkas
+            keep_recent: Jumlah turn terakhir yang tetap disimpan utuh
+        """
+        self.tts = tts
+        self.max_turns = max_turns
+        self.max_context_tokens = max_context_tokens
+        self.keep_recent = keep_recent
+
+        self.history: List[Tuple[str, str]] = []  # (user_text, robot_reply)
+        self.summary = ""
+        self.context: Optional[List[int]] = None
+        self.last_prompt_tokens = 0  # Token yang dievaluasi di turn terakhir
+
+    def _build_prompt(self, text: str) -> str:
+        """Prompt untuk turn berikutnya; persona hanya dikirim saat priming"""
+        turn = f"\nHuman: {text}\nRobot:"
+
+        if self.context:
+            return turn
+
+        lines = [self.PERSONA]
+        if self.summary:
+            lines.append(f"\nSummary of the conversation so far: {self.summary}")
+        for user_text, reply in self.history:
+            lines.append(f"\nHuman: {user_text}\nRobot: {reply}")
+
+        return "\n".join(lines) + turn
+
+    @tracing.traced("llm.ask")
+    def ask(self, text: str, temperature: float = 0.7,
+            cancel_event: Optional[threading.Event] = None,
+            on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Kirim satu turn percakapan dan simpan context hasilnya
+
+        Args:
+            text: Input user
+            temperature: Creativity level (0.0 - 1.0)
+            cancel_event: Batalkan generate saat event di-set (turn tidak disimpan)
+            on_token: Callback per token saat streaming
+
+        Returns:
+            Balasan robot, atau None jika Ollama gagal/dibatalkan
+        """
+        result = self.tts.generate_with_context(
+            self._build_prompt(text),
+            context=self.context,
+            temperature=temperature,
+            cancel_event=cancel_event,
+            on_token=on_token
+        )
+
+        if not result:
+            return None
+
+        reply = result.get('response', '').strip()
+        self.context = result.get('context') or None
+        self.last_prompt_tokens = result.get('prompt_eval_count', 0)
+        self.history.append((text, reply))
+
+        if (len(self.history) > self.max_turns or
+                (self.context and len(self.context) > self.max_context_tokens)):
+            self._compact()
+
+        return reply
+
+    def _compact(self):
+        """Ringkas turn lama, simpan turn terakhir, reset context"""
+        if len(self.history) <= self.keep_recent:
+            # Tidak ada turn lama untuk diringkas; cukup priming ulang dari
+            # ringkasan + turn terakhir agar context kembali pendek
+            self.context = None
+            return
+
+        old_turns = self.history[:-self.keep_recent] if self.keep_recent else self.history
+        recent = self.history[-self.keep_recent:] if self.keep_recent else []
+
+        transcript = "\n".join(f"Human: {u}\nRobot: {r}" for u, r in old_turns)
+        prompt = f"""Summarize this conversation in at most three sentences. Keep names, facts and open questions.
+
+Previous summary: {self.summary if self.summary else "-"}
+
+{transcript}
+
+Summary:"""
+
+        result = self.tts.generate_with_context(prompt, temperature=0.2)
+        summary = result.get('response', '').strip() if result else ""
+
+        if not summary:
+            # Fallback: simpan potongan transcript terakhir saja
+            summary = (self.summary + " " + transcript).strip()[-600:]
+
+        self.summary = summary
+        self.history = recent
+        self.context = None  # Turn berikutnya priming ulang dengan ringkasan
+
+        print(f"🗜 History diringkas ({len(old_turns)} turn)")
+
+    def reset(self):
+        """Mulai percakapan baru"""
+        self.history.clear()
+        self.summary = ""
+        self.context = None
+        self.last_prompt_tokens = 0
 
 
 class RobotSpeaker:
     """High-level interface untuk robot berbicara dengan gerakan"""
     
-    def __init__(self, model: str = "llama2"):
-        self.tts = OllamaTTS(model=model)
+    def __init__(self, model: str = "llama2",
+                 ollama_url: str = "http://localhost:11434",
+                 engine: Optional[SpeechEngine] = None):
+        self.tts = OllamaTTS(model=model, ollama_url=ollama_url, engine=engine)
         self.emotion_to_pose = {
             'happy': 'greeting',
             'sad': 'thinking',
@@ -219,6 +543,25 @@ class RobotSpeaker:
             'excited': 'wave_hand',
             'thinking': 'thinking'
         }
+        # Campuran pose per emosi untuk PoseBlender (pose_blend.py);
+        # pose dominan sama dengan emotion_to_pose
+        self.emotion_blends = {
+            'happy': {'greeting': 0.7, 'attention': 0.3},
+            'sad': {'thinking': 0.6, 'listening': 0.4},
+            'neutral': {'attention': 0.8, 'listening': 0.2},
+            'excited': {'wave_hand': 0.6, 'greeting': 0.4},
+            'thinking': {'thinking': 0.8, 'attention': 0.2},
+        }
+    
+    def detect_emotion(self, text: str) -> str:
+        """Analisis emosi text"""
+        emotion = self.tts.analyze_emotion(text)
+        print(f"🎭 Detected emotion: {emotion}")
+        return emotion
+    
+    def detect_pose(self, text: str) -> str:
+        """Analisis emosi text dan kembalikan pose yang sesuai"""
+        return self.emotion_to_pose.get(self.detect_emotion(text), 'attention')
     
     def speak_with_emotion(self, text: str, 
                           auto_detect_emotion: bool = True) -> tuple[str, str]:
@@ -247,17 +590,30 @@ class RobotSpeaker:
         
         return (text, suggested_pose)
     
+    def new_session(self, **kwargs) -> ConversationSession:
+        """Buat sesi percakapan baru (kwargs diteruskan ke ConversationSession)"""
+        return ConversationSession(self.tts, **kwargs)
+
     def generate_and_speak(self, 
                           prompt: str, 
-                          context: str = "") -> tuple[str, str]:
+                          context: str = "",
+                          session: Optional[ConversationSession] = None) -> tuple[str, str]:
         """
         Generate response dengan Ollama dan speak
         
+        Args:
+            prompt: Input untuk Ollama
+            context: Context tambahan (diabaikan jika memakai session)
+            session: Sesi percakapan untuk reuse context antar turn
+
         Returns:
             (generated_text, suggested_pose)
         """
         # Generate dengan Ollama
-        generated = self.tts.generate_speech_response(prompt, context)
+        if session is not None:
+            generated = session.ask(prompt)
+        else:
+            generated = self.tts.generate_speech_response(prompt, context)
         
         if not generated:
             generated = prompt  # Fallback ke original prompt
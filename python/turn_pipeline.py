@@ -0,0 +1,255 @@
+"""
+turn_pipeline.py
+Pipeline asyncio untuk mode interaktif: input -> LLM -> TTS/emotion -> motion
+Input baru membatalkan turn yang sedang berjalan (barge-in)
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+
+from python.speech_sync import keyframe_cues
+
+
+class Turn:
+    """Satu giliran percakapan yang mengalir melewati stage pipeline"""
+
+    _next_id = 1
+
+    def __init__(self, text: str, kind: str = "speech"):
+        self.id = Turn._next_id
+        Turn._next_id += 1
+
+        self.text = text
+        self.kind = kind  # 'speech' atau 'command'
+        self.reply: Optional[str] = None
+        self.pose: Optional[str] = None
+
+        self.cancel_event = threading.Event()
+        self.speech_future = None
+        self.speech_duration = 0.0
+
+        self.t_input = time.time()
+        self.t_speech_start: Optional[float] = None
+        self.t_cancel: Optional[float] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+
+class StageMetrics:
+    """Latency per stage (detik)"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def report(self):
+        print("\n📊 Latency per stage:")
+        width = max([14] + [len(stage) + 2 for stage in self.samples])
+        print(f"   {'stage':<{width}}{'n':>5}{'mean':>9}{'p95':>9}{'max':>9}")
+
+        for stage, values in self.samples.items():
+            ordered = sorted(values)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            mean = sum(ordered) / len(ordered)
+            print(f"   {stage:<{width}}{len(ordered):>5}{mean:>8.2f}s{p95:>8.2f}s{ordered[-1]:>8.2f}s")
+
+
+class TurnPipeline:
+    """
+    Stage pipeline yang terhubung lewat asyncio.Queue
+
+    input ─┬─> llm ─┬─> tts ─────┐
+           │        └─> emotion ─┴─> motion
+           └──────────(command)────> motion
+
+    Input tetap bisa diketik selama turn berjalan. Input baru membatalkan
+    turn aktif: generate di-stop, playback dihentikan, dan command gerakan
+    yang belum terkirim dibuang sehingga servo diam di posisi terakhir.
+    """
+
+    def __init__(self, robot):
+        self.robot = robot
+        self.metrics = StageMetrics()
+
+        self.llm_queue: asyncio.Queue = asyncio.Queue()
+        self.tts_queue: asyncio.Queue = asyncio.Queue()
+        self.emotion_queue: asyncio.Queue = asyncio.Queue()
+        self.motion_queue: asyncio.Queue = asyncio.Queue()
+
+        self.active: Optional[Turn] = None
+        self._speech_started: Dict[int, asyncio.Event] = {}
+
+    async def run(self):
+        """Jalankan pipeline sampai user mengetik 'quit'"""
+        stages = [
+            asyncio.create_task(self._llm_stage()),
+            asyncio.create_task(self._tts_stage()),
+            asyncio.create_task(self._emotion_stage()),
+            asyncio.create_task(self._motion_stage()),
+        ]
+
+        try:
+            await self._input_stage()
+        finally:
+            self.cancel_active()
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            self.robot.controller.resume_motion()
+            self.metrics.report()
+
+    # ---------- Barge-in ----------
+    def cancel_active(self):
+        """Batalkan turn aktif dan hentikan speech + gerakan"""
+        turn = self.active
+        if turn is None or turn.cancelled:
+            return
+
+        turn.t_cancel = time.time()
+        turn.cancel_event.set()
+        self.robot.speaker.tts.stop_speaking()
+        self.robot.controller.stop_motion()
+        print(f"\n⏹ Turn {turn.id} dibatalkan")
+
+    # ---------- Stages ----------
+    async def _input_stage(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                user_input = await loop.run_in_executor(None, input, "You: ")
+            except EOFError:
+                return
+
+            user_input = user_input.strip()
+            if not user_input:
+                continue
+
+            if user_input.lower() == 'quit':
+                print("\n👋 Sampai jumpa!")
+                return
+
+            if user_input.lower() == 'commands':
+                self.robot.show_commands()
+                continue
+
+            self.cancel_active()
+
+            if user_input.startswith('/'):
+                turn = Turn(user_input, kind="command")
+                self.active = turn
+                await self.motion_queue.put(turn)
+            else:
+                turn = Turn(user_input)
+                self.active = turn
+                self._speech_started[turn.id] = asyncio.Event()
+                await self.llm_queue.put(turn)
+
+    async def _llm_stage(self):
+        session = self.robot.session
+        tts = self.robot.speaker.tts
+
+        while True:
+            turn = await self.llm_queue.get()
+            if turn.cancelled:
+                self._finish(turn)
+                continue
+
+            start = time.time()
+            if tts.available:
+                turn.reply = await asyncio.to_thread(
+                    session.ask, turn.text, cancel_event=turn.cancel_event)
+            self.metrics.record("llm", time.time() - start)
+
+            if turn.cancelled:
+                self._finish(turn)
+                continue
+
+            turn.reply = turn.reply or turn.text
+            await self.tts_queue.put(turn)
+            await self.emotion_queue.put(turn)
+
+    async def _tts_stage(self):
+        tts = self.robot.speaker.tts
+
+        while True:
+            turn = await self.tts_queue.get()
+            started = self._speech_started.get(turn.id)
+
+            if not turn.cancelled:
+                start = time.time()
+                turn.speech_future, turn.speech_duration = await asyncio.to_thread(
+                    tts.speak_async, turn.reply, turn.cancel_event)
+                turn.t_speech_start = time.time()
+                self.metrics.record("tts", turn.t_speech_start - start)
+
+            if started is not None:
+                started.set()
+
+    async def _emotion_stage(self):
+        speaker = self.robot.speaker
+
+        while True:
+            turn = await self.emotion_queue.get()
+            if turn.cancelled:
+                self._finish(turn)
+                continue
+
+            start = time.time()
+            turn.pose = await asyncio.to_thread(speaker.detect_pose, turn.reply)
+            self.metrics.record("emotion", time.time() - start)
+
+            await self.motion_queue.put(turn)
+
+    async def _motion_stage(self):
+        controller = self.robot.controller
+
+        while True:
+            turn = await self.motion_queue.get()
+
+            # Stage ini serial: gerakan turn sebelumnya sudah berhenti di sini,
+            # jadi aman membuka kembali command gerakan
+            if turn.cancelled:
+                self._finish(turn)
+                continue
+            controller.resume_motion()
+
+            start = time.time()
+            if turn.kind == "command":
+                await asyncio.to_thread(self.robot.handle_special_command, turn.text)
+            else:
+                await self._speech_stage_ready(turn)
+                if turn.pose and not turn.cancelled:
+                    elapsed = time.time() - (turn.t_speech_start or start)
+                    keyframes = controller.pose_keyframes(turn.pose)
+                    cues = [max(0.0, cue - elapsed) for cue in
+                            keyframe_cues(turn.reply, turn.speech_duration, keyframes)]
+                    await asyncio.to_thread(controller.execute_pose, turn.pose, cues)
+
+                if turn.speech_future is not None:
+                    await asyncio.wrap_future(turn.speech_future)
+
+            self.metrics.record("motion", time.time() - start)
+
+            if turn.t_cancel is not None:
+                # Waktu dari input baru sampai gerakan turn ini benar-benar berhenti
+                self.metrics.record("barge_in_stop", time.time() - turn.t_cancel)
+            self._finish(turn)
+
+    async def _speech_stage_ready(self, turn: Turn):
+        event = self._speech_started.get(turn.id)
+        if event is not None:
+            await event.wait()
+
+    def _finish(self, turn: Turn):
+        self._speech_started.pop(turn.id, None)
+        if not turn.cancelled:
+            self.metrics.record("turn_total", time.time() - turn.t_input)
+        if self.active is turn:
+            self.active = None